@@ -0,0 +1,142 @@
+from cmd_dispatcher import CmdDispatcher
+from concurrent.futures import Future, ThreadPoolExecutor
+from output_format import TEXT, RecordWriter
+from typing import Iterable, Iterator, List, Optional, TextIO, Tuple
+import contextlib
+import sys
+import threading
+
+DEFAULT_WORKERS = 8  # Concurrent read-only commands, they share the Redis connection pool
+
+
+class BatchRunner:
+    """
+    Runs the commands of a batch without the terminal UI.
+
+    Lines are dispatched in order. Consecutive read-only commands (show) run
+    concurrently on a thread pool, any other command waits for them to finish
+    and runs alone, so it sees the effect of the lines before it and the lines
+    after it see its effect. The outputs are written in the order of the lines,
+    each as soon as the ones before it are written.
+
+    With a structured output format the commands run one after the other and
+    their records are streamed to the output as they are produced, nothing is
+    buffered. The records of the whole batch form one output (a single JSON
+    array for JSON), the messages of the commands go to the standard error.
+
+    Unknown commands and commands needing the terminal UI (watches) are
+    rejected before any line runs.
+    """
+
+    def __init__(self, dispatcher: CmdDispatcher, cmds_dir: str, workers: int = DEFAULT_WORKERS) -> None:
+        """
+        Initialize BatchRunner object.
+
+        Args:
+            dispatcher (CmdDispatcher): The dispatcher of the commands.
+            cmds_dir (str): The directory of commands.
+            workers (int): The number of read-only commands run concurrently.
+        """
+        self.dispatcher = dispatcher
+        self.cmds_dir = cmds_dir
+        self.workers = max(1, workers)
+        self.failures = 0
+        self.lock = threading.Lock()
+
+    def run(self, lines: Iterable[str], output: TextIO) -> int:
+        """
+        Run a batch. Empty lines and lines starting with '#' are skipped.
+
+        Args:
+            lines (Iterable[str]): The command lines.
+            output (TextIO): Where the outputs are written.
+
+        Returns:
+            int: The number of commands that failed with an exception, or the number of
+                lines rejected as unknown or needing the terminal.
+        """
+        lines = list(self.command_lines(lines))
+        rejected = 0
+        for line in lines:
+            if not self.dispatcher.is_implemented(line, self.cmds_dir):
+                print(f"Error: {line}: command not implemented", file=sys.stderr)
+            elif self.dispatcher.needs_terminal(line, self.cmds_dir):
+                print(f"Error: {line}: not available in batch mode", file=sys.stderr)
+            else:
+                continue
+            rejected += 1
+        if rejected:
+            return rejected
+
+        self.failures = 0
+        if self.dispatcher.output_format != TEXT:
+            return self.run_records(lines, output)
+        pending: List[Tuple[str, Future]] = []
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='batch') as executor:
+            for line in lines:
+                if self.dispatcher.is_read_only(line, self.cmds_dir):
+                    pending.append((line, executor.submit(self.execute, line)))
+                    self.write_done(pending, output)
+                    continue
+                self.write_all(pending, output)
+                self.echo(line, output)  # Before running it, commands may print themselves
+                self.write_text(self.execute(line), output)
+            self.write_all(pending, output)
+        return self.failures
+
+    def run_records(self, lines: List[str], output: TextIO) -> int:
+        """
+        Run a batch with structured output, streaming the records of every command to the output.
+        """
+        writer = RecordWriter(self.dispatcher.output_format, output)
+        # Messages, printed or returned, go to the standard error so that the output stays parseable
+        with contextlib.redirect_stdout(sys.stderr):
+            for line in lines:
+                self.write_text(self.execute(line, writer), sys.stderr)
+        writer.close()
+        return self.failures
+
+    @staticmethod
+    def command_lines(lines: Iterable[str]) -> Iterator[str]:
+        for line in lines:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield line
+
+    def execute(self, line: str, writer: Optional[RecordWriter] = None) -> Optional[str]:
+        try:
+            return self.dispatcher.dispatch(line, self.cmds_dir, None, writer)
+        except Exception as e:
+            with self.lock:
+                self.failures += 1
+            return f"Error: {line}: {e!r}"
+
+    def echo(self, line: str, output: TextIO) -> None:
+        if self.dispatcher.output_format == TEXT:
+            output.write(f">>> {line}\n")  # Structured output is left parseable
+            output.flush()
+
+    def write_text(self, text: Optional[str], output: TextIO) -> None:
+        if text:
+            output.write(text if text.endswith('\n') else text + '\n')
+        output.flush()
+
+    def write(self, line: str, text: Optional[str], output: TextIO) -> None:
+        self.echo(line, output)
+        self.write_text(text, output)
+
+    def write_done(self, pending: List[Tuple[str, Future]], output: TextIO) -> None:
+        """
+        Write the outputs of the first pending commands that are done.
+        """
+        while pending and pending[0][1].done():
+            line, future = pending.pop(0)
+            self.write(line, future.result(), output)
+
+    def write_all(self, pending: List[Tuple[str, Future]], output: TextIO) -> None:
+        """
+        Wait for the pending commands and write their outputs.
+        """
+        for line, future in pending:
+            self.write(line, future.result(), output)
+        pending.clear()
@@ -0,0 +1,192 @@
+"""
+Benchmarks of the parse and render hot paths.
+
+Run from the repository root:
+
+    python -m benchmarks.bench                   # run and compare with the baseline
+    python -m benchmarks.bench --save            # run and store the results as the new baseline
+    python -m benchmarks.bench --scales 10,100 --stage display
+
+Every stage is timed over several runs (median and min), and the peak memory
+allocated by one run is measured with tracemalloc.
+"""
+from benchmarks import fixtures
+from cgw_config import CgwConfig
+from charging_stations_status import ChargingStationsStatus
+from dnmasq_leases import DnsmasqLeases
+from json_codec import BACKEND, decode
+from scapy_websocket_schema import WebSocket
+from site_status import SiteStatus
+from tabulate import tabulate
+from typing import Callable, Dict, List, Tuple
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+MIN_TIME = 0.2  # Seconds spent timing each stage, at least MIN_RUNS runs
+MIN_RUNS = 3
+MAX_RUNS = 100
+
+
+def measure(func: Callable[[], object]) -> Dict[str, float]:
+    """
+    Time a function and measure the memory it allocates.
+
+    Args:
+        func (Callable[[], object]): The stage to measure.
+
+    Returns:
+        Dict[str, float]: The median and min time in milliseconds, the peak allocation in KiB and the runs.
+    """
+    func()  # Warm up caches and lazy imports
+    times = []
+    started = time.perf_counter()
+    while len(times) < MIN_RUNS or (time.perf_counter() - started < MIN_TIME and len(times) < MAX_RUNS):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'median_ms': 1000 * statistics.median(times),
+        'min_ms': 1000 * min(times),
+        'peak_kib': peak / 1024,
+        'runs': len(times),
+    }
+
+
+def stages(chargers: int, leases_file: str) -> List[Tuple[str, Callable[[], object]]]:
+    """
+    Build the stages of one scale.
+
+    Args:
+        chargers (int): The number of chargers of the generated site.
+        leases_file (str): The generated dnsmasq leases file.
+
+    Returns:
+        List[Tuple[str, Callable[[], object]]]: The stage names and functions.
+    """
+    charging_stations_json = fixtures.charging_stations_status(chargers)
+    site_status_json = fixtures.site_status(chargers)
+    cgw_config_json = fixtures.cgw_config(chargers)
+    charging_stations_raw = json.dumps(charging_stations_json).encode('utf-8')
+    site_status_raw = json.dumps(site_status_json).encode('utf-8')
+    cgw_config_raw = json.dumps(cgw_config_json).encode('utf-8')
+
+    charging_stations_status = ChargingStationsStatus.from_json(charging_stations_json)
+    site_status = SiteStatus.from_json(site_status_json)
+    dnsmasq_leases = DnsmasqLeases(leases_file)
+    dnsmasq_leases.read_leases()
+
+    return [
+        ("ChargingStationsStatus.from_json", lambda: ChargingStationsStatus.from_json(charging_stations_json)),
+        ("ChargingStationsStatus decode", lambda: decode(charging_stations_raw, ChargingStationsStatus)),
+        ("ChargingStationsStatus.display", charging_stations_status.display),
+        ("SiteStatus.from_json", lambda: SiteStatus.from_json(site_status_json)),
+        ("SiteStatus decode", lambda: decode(site_status_raw, SiteStatus)),
+        ("SiteStatus.display", lambda: site_status.display(dnsmasq_leases, charging_stations_status)),
+        ("CgwConfig.from_json", lambda: CgwConfig.from_json(cgw_config_json)),
+        ("CgwConfig decode", lambda: decode(cgw_config_raw, CgwConfig)),
+    ]
+
+
+def leases_stage(leases_file: str) -> Callable[[], object]:
+    dnsmasq_leases = DnsmasqLeases(leases_file)
+
+    def read_leases():
+        dnsmasq_leases.signature = None  # Parse again, as after every change of the file
+        dnsmasq_leases.read_leases()
+
+    return read_leases
+
+
+def websocket_stage(size: int, frames: int = 100) -> Callable[[], object]:
+    # Dissecting the frame runs post_dissection, which unmasks and decodes it
+    frame = fixtures.websocket_frame(fixtures.ocpp_meter_values(size))
+    return lambda: [WebSocket(frame) for _ in range(frames)]
+
+
+def run(scales: List[int], leases: int, stage_filter: str) -> Dict[str, Dict[str, float]]:
+    """
+    Run the benchmarks.
+
+    Args:
+        scales (List[int]): The numbers of chargers of the generated sites.
+        leases (int): The number of leases of the generated leases file.
+        stage_filter (str): Only run the stages whose name contains this.
+
+    Returns:
+        Dict[str, Dict[str, float]]: The measurements keyed by 'scale/stage'.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        leases_file = os.path.join(directory, 'dnsmasq.leases')
+        with open(leases_file, 'w') as file:
+            file.write(fixtures.dnsmasq_leases(max(leases, max(scales, default=0))))
+
+        benchmarks = []
+        for chargers in scales:
+            benchmarks += [(f"{chargers} chargers/{name}", func) for name, func in stages(chargers, leases_file)]
+        benchmarks.append((f"{leases} leases/DnsmasqLeases.read_leases", leases_stage(leases_file)))
+        for size in (256, 65536):
+            benchmarks.append((f"100 frames of {size} B/WebSocket.post_dissection", websocket_stage(size)))
+
+        for key, func in benchmarks:
+            if stage_filter in key:
+                results[key] = measure(func)
+    return results
+
+
+def report(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]]) -> str:
+    """
+    Format the results, with the change of the median time against the baseline.
+    """
+    data = []
+    for key, result in results.items():
+        scale, stage = key.split('/', 1)
+        change = None
+        if key in baseline:
+            change = f"{100 * (result['median_ms'] / baseline[key]['median_ms'] - 1):+.1f}%"
+        data.append([scale, stage, round(result['median_ms'], 3), round(result['min_ms'], 3),
+                     round(result['peak_kib'], 1), result['runs'], change])
+    headers = ["Scale", "Stage", "Median ms", "Min ms", "Peak KiB", "Runs", "vs. baseline"]
+    return tabulate(data, headers=headers, tablefmt="psql")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', default='10,100,1000', help="numbers of chargers, comma separated")
+    parser.add_argument('--leases', type=int, default=10000, help="number of dnsmasq leases")
+    parser.add_argument('--stage', default='', help="only run the stages containing this")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="baseline results file")
+    parser.add_argument('--save', action='store_true', help="store the results as the new baseline")
+    args = parser.parse_args()
+
+    scales = [int(scale) for scale in args.scales.split(',') if scale]
+    results = run(scales, args.leases, args.stage)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r') as file:
+            baseline = json.load(file)
+
+    print(f"JSON backend: {BACKEND}")
+    print(report(results, baseline))
+
+    if args.save:
+        with open(args.baseline, 'w') as file:
+            json.dump({**baseline, **results}, file, indent=4, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
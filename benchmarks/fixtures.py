@@ -0,0 +1,115 @@
+"""
+Synthetic CGW payloads scaled from the sample files checked in at the repository root.
+"""
+import copy
+import json
+import os
+import struct
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_sample(filename: str) -> dict:
+    with open(os.path.join(ROOT, filename), 'r') as file:
+        return json.load(file)
+
+
+def charger_id(i: int) -> str:
+    return f"BENCH{i:06d}"
+
+
+def charger_ip(i: int) -> str:
+    return f"10.{i >> 16 & 0xff}.{i >> 8 & 0xff}.{i & 0xff}"
+
+
+def charger_mac(i: int) -> str:
+    return "02:00:" + ":".join(f"{byte:02x}" for byte in i.to_bytes(4, 'big'))
+
+
+def charging_stations_status(chargers: int) -> dict:
+    """
+    Generate a ChargingStationsStatus payload with the given number of chargers.
+    """
+    templates = load_sample('charging_stations_status.json')['chargers']
+    generated = []
+    for i in range(chargers):
+        charger = copy.deepcopy(templates[i % len(templates)])
+        charger['id'] = charger_id(i)
+        charger['ip_address'] = charger_ip(i)
+        generated.append(charger)
+    return {'chargers': generated}
+
+
+def site_status(chargers: int) -> dict:
+    """
+    Generate a SiteStatus payload with one EV per charger and every 20th charger offline.
+    """
+    sample = load_sample('site_status.json')
+    templates = sample['evs']
+    evs = []
+    for i in range(chargers):
+        ev = copy.deepcopy(templates[i % len(templates)])
+        ev['id'] = str(5000000 + i)
+        ev['charger_id'] = charger_id(i)
+        ev['connector_id'] = 1
+        evs.append(ev)
+    return {
+        'action': sample['action'],
+        'charging_stations': [{'id': charger_id(i)} for i in range(chargers)],
+        'datetime': sample['datetime'],
+        'evs': evs,
+        'offline_chargers': [{'id': charger_id(i)} for i in range(0, chargers, 20)],
+    }
+
+
+def cgw_config(chargers: int) -> dict:
+    """
+    Generate a CgwConfig payload with the given number of charging stations.
+    """
+    config = load_sample('cgw_config.json')
+    templates = config['charging_stations']
+    generated = []
+    for i in range(chargers):
+        station = copy.deepcopy(templates[i % len(templates)])
+        station['id'] = charger_id(i)
+        station['name'] = f"Bench {i} ({charger_id(i)})"
+        generated.append(station)
+    config['charging_stations'] = generated
+    return config
+
+
+def dnsmasq_leases(leases: int) -> str:
+    """
+    Generate a dnsmasq leases file, the first leases belong to the generated chargers.
+    """
+    return "".join(f"{1711017257 + i} {charger_mac(i)} {charger_ip(i)} * *\n" for i in range(leases))
+
+
+def websocket_frame(payload: bytes, mask: int = 0x37fa213d) -> bytes:
+    """
+    Build a masked WebSocket text frame, as sent by a charger.
+    """
+    length = len(payload)
+    if length < 126:
+        header = struct.pack('!BB', 0x81, 0x80 | length)
+    elif length < 1 << 16:
+        header = struct.pack('!BBH', 0x81, 0x80 | 126, length)
+    else:
+        header = struct.pack('!BBQ', 0x81, 0x80 | 127, length)
+    key = mask.to_bytes(4, 'big')
+    masked = bytes(byte ^ key[i % 4] for i, byte in enumerate(payload))
+    return header + key + masked
+
+
+def ocpp_meter_values(size: int) -> bytes:
+    """
+    Generate an OCPP-J MeterValues CALL of about size bytes.
+    """
+    sample = {"timestamp": "2024-03-13T15:02:58.556Z",
+              "sampledValue": [{"value": "16.1", "measurand": "Current.Import", "phase": "L1", "unit": "A"}]}
+    values = [sample]
+    message = json.dumps([2, "1", "MeterValues", {"connectorId": 1, "meterValue": values}])
+    while len(message) < size:
+        values.append(sample)
+        message = json.dumps([2, "1", "MeterValues", {"connectorId": 1, "meterValue": values}])
+    return message.encode('utf-8')
@@ -1,23 +1,26 @@
-from dataclasses import dataclass
-from typing import List, Optional
-from tabulate import tabulate
-from datetime import datetime
-import json
-import csv
+from dataclasses import field
+from models import model
+from perf import timed
+from typing import Dict, Iterator, Optional, Tuple
+from table_renderer import Column, TableRenderer
+from timestamps import format_iso
 from io import StringIO
 
-@dataclass
+CONNECTIONS_TABLE = TableRenderer([Column("Chg ID"), Column("Conn ID"), Column("OCPP Err"),
+                                   Column("OCPP Err Ts"), Column("Info"), Column("Status")])
+
+@model
 class OcppError:
     """
     Represents an OCPP error with its attributes.
     """
     error_code: str
-    info: str
-    timestamp: str
-    vendor_error_code: str
-    vendor_id: str
+    info: Optional[str]
+    timestamp: Optional[str]
+    vendor_error_code: Optional[str]
+    vendor_id: Optional[str]
 
-@dataclass
+@model
 class Connector:
     """
     Represents a connector with its attributes.
@@ -28,26 +31,32 @@ class Connector:
     priority: bool
     status: str
 
-@dataclass
+@model
 class Charger:
     """
     Represents a charger with its connectors and attributes.
     """
-    connectors: List[Connector]
-    firmware_version: str
+    connectors: Tuple[Connector, ...]
+    firmware_version: Optional[str]
     id: str
-    ip_address: str
+    ip_address: Optional[str]
     ocpp_error: OcppError
     ocpp_error_code: str
     status: str
 
-@dataclass
+@model
 class ChargingStationsStatus:
     """
     Represents the status of charging stations.
     """
 
-    chargers: List[Charger]
+    chargers: Tuple[Charger, ...] = ()
+    chargers_by_id: Dict[str, Charger] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # Index chargers by ID once, the first charger with an ID wins
+        for charger in self.chargers:
+            self.chargers_by_id.setdefault(charger.id, charger)
 
     @classmethod
     def from_json(cls, json_dict: Optional[dict]) -> 'ChargingStationsStatus':
@@ -61,7 +70,7 @@ class ChargingStationsStatus:
             ChargingStationsStatus: The created ChargingStationsStatus object.
         """
         if json_dict is None:
-            return cls(chargers=[])  # Return an empty list if json_dict is None
+            return cls(chargers=())  # Return no chargers if json_dict is None
 
         chargers = []
         for charger_data in json_dict.get('chargers', []):
@@ -84,7 +93,7 @@ class ChargingStationsStatus:
                 )
                 connectors.append(connector)
             charger = Charger(
-                connectors=connectors,
+                connectors=tuple(connectors),
                 firmware_version=charger_data['firmware_version'],
                 id=charger_data['id'],
                 ip_address=charger_data['ip_address'],
@@ -99,7 +108,7 @@ class ChargingStationsStatus:
                 status=charger_data['status']
             )
             chargers.append(charger)
-        return cls(chargers=chargers)
+        return cls(chargers=tuple(chargers))
 
     def to_json(self) -> dict:
         """
@@ -152,70 +161,59 @@ class ChargingStationsStatus:
         Returns:
             str: The IP address of the charger.
         """
-        for charger in self.chargers:
-            if charger.id == charger_id:
-                return charger.ip_address
-        return "IP not found"
+        charger = self.chargers_by_id.get(charger_id)
+        return charger.ip_address if charger is not None else "IP not found"
 
+    @timed('render.charging_stations_status')
     def display(self) -> str:
         """
-        Display the charging stations status, compare with the previous status,
-        and write changes to 'status_changes.csv'.
+        Display the charging stations status.
+        Status changes are recorded separately by StatusChangeTracker.
 
         Returns:
             str: The formatted text displaying charging stations status.
         """
         output = StringIO()
 
-        # Read previous status from JSON file if available
-        try:
-            with open('tabledata.json', 'r') as json_file:
-                previous_data = json.load(json_file)
-                self.previous_status = {tuple(entry[:2]): entry[-1] for entry in previous_data}
-        except FileNotFoundError:
-            self.previous_status = {}
-
         table_data = []
-        status_changes = []
 
         for charger in self.chargers:
             for connector in charger.connectors:
-                formatted_time = "UNKNOWN"
-                if connector.ocpp_error.timestamp is not None:
-                    formatted_time = datetime.strptime(connector.ocpp_error.timestamp, "%Y-%m-%dT%H:%M:%S.%f%z").strftime("%y%m%d_%H%M")
                 table_data.append([
                     charger.id,
                     connector.id,
                     connector.ocpp_error.error_code,
-                    formatted_time,
+                    format_iso(connector.ocpp_error.timestamp),
                     connector.ocpp_error.info,
                     connector.status
                 ])
 
-                # Check if status has changed
-                previous_status = self.previous_status.get((charger.id, connector.id))
-                if previous_status and previous_status != connector.status:
-                    status_changes.append([datetime.now().strftime("%Y-%m-%d %H:%M:%S"), charger.id, connector.status])
-
         # Sort table data by charger ID
         sorted_table_data = sorted(table_data, key=lambda x: x[0])
         
-        headers = ["Chg ID", "Conn ID", "OCPP Err", "OCPP Err Ts", "Info", "Status"]
-        table = tabulate(sorted_table_data, headers=headers, tablefmt="psql")
-        print(table, file=output)
-        
-        # Write the data to JSON file
-        with open('tabledata.json', 'w') as json_file:
-            json.dump(sorted_table_data, json_file, indent=4)
-
-        # Write status changes to CSV file
-        if status_changes:
-            with open('status_changes.csv', 'a', newline='') as csv_file:
-                writer = csv.writer(csv_file)
-                writer.writerows(status_changes)
-        
+        print(CONNECTIONS_TABLE.render(sorted_table_data), file=output)
+
         return output.getvalue()
 
+    def records(self) -> Iterator[dict]:
+        """
+        Get the connections as records for the structured output, in the order of display.
+
+        Yields:
+            dict: One 'connection' record per connector, with the raw OCPP error timestamp.
+        """
+        for charger in sorted(self.chargers, key=lambda charger: charger.id):
+            for connector in charger.connectors:
+                yield {
+                    'record': 'connection',
+                    'charger_id': charger.id,
+                    'connector_id': connector.id,
+                    'ocpp_error': connector.ocpp_error.error_code,
+                    'ocpp_error_timestamp': connector.ocpp_error.timestamp,
+                    'info': connector.ocpp_error.info,
+                    'status': connector.status,
+                }
+
 
 # # Define the path to the JSON file
 # json_file_path = "charging_stations_status.json"
@@ -1,12 +1,25 @@
-from typing import Dict, List, Union
+from typing import Dict, List, Optional, Tuple, Union
 from prompt_toolkit.completion import NestedCompleter
 from prompt_toolkit.shortcuts import CompleteStyle
 import os
 import shlex
+import sys
 import importlib
 from terminal_screen import TerminalScreen
+from perf import Perf
+from output_format import TEXT, RecordWriter, format_records, parse_option, write_records
 
 
+class CommandNode:
+    """
+    A node in the command trie, one per directory below the commands directory.
+    """
+
+    def __init__(self) -> None:
+        self.children: Dict[str, 'CommandNode'] = {}
+        self.module_name: Union[None, str] = None
+        self.file_path: Union[None, str] = None
+
 
 class CmdDispatcher:
     """
@@ -15,81 +28,245 @@ class CmdDispatcher:
 
     completer: Union[None, NestedCompleter] = None
     complete_style: CompleteStyle = CompleteStyle.READLINE_LIKE
-    cmds_avail: List[os.DirEntry] = []
     cmds_dir: str = ""
     batchfilename: str = "commands.batch"
+    registry: Union[None, CommandNode] = None
+    reload_commands: bool = False  # Re-import command modules whose file changed (development)
+    output_format: str = TEXT  # Of the commands without a --format option
 
-    def __init__(self, cmds_dir: str) -> None:
+    def __init__(self, cmds_dir: str, batch_file: Optional[str] = None) -> None:
         self.cmds_dir = cmds_dir
-        self.read_batch_file()
+        self.command_classes: Dict[str, Tuple[type, float]] = {}
+        self.read_batch_file(batch_file)
 
-    def read_batch_file(self) -> bool:
+    def read_batch_file(self, filename: Optional[str] = None) -> bool:
         """
         Read commands from a batch file.
 
+        Args:
+            filename (Optional[str]): The batch file, '-' for the standard input,
+                batchfilename in the directory of commands by default.
+
         Returns:
             bool: True if the batch file is successfully read, False otherwise.
         """
+        if filename == '-':
+            self.batch = [line.rstrip() for line in sys.stdin.readlines()]
+            return True
+        if filename is None:
+            filename = os.path.join(self.cmds_dir, self.batchfilename)
         try:
-            with open(os.path.join(self.cmds_dir, self.batchfilename)) as file:
+            with open(filename) as file:
                 self.batch = [line.rstrip() for line in file.readlines()]
             return True
         except FileNotFoundError:
             self.batch = []
-            print("Cannot open batch file:", os.path.join(self.cmds_dir, self.batchfilename))
+            print("Cannot open batch file:", filename)
             return False
 
     
     
-    def dispatch(self, cmd: str, cmds_dir: str, terminal: TerminalScreen, depth: int = 0) -> str:
+    def build_registry(self, cmds_dir: str) -> CommandNode:
         """
-        Dispatch a command.
+        Walk the commands directory once and build the command trie.
 
         Args:
-            cmd (str): The command to dispatch.
             cmds_dir (str): The directory of commands.
-            depth (int): The depth of command recursion.
 
         Returns:
-            str: The output string from command.execute(), or None if execution fails.
+            CommandNode: The root of the command trie.
+        """
+        root = CommandNode()
+        package = os.path.basename(os.path.normpath(cmds_dir))
+        for dirpath, dirnames, filenames in os.walk(cmds_dir):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith('__'))
+            rel_path = os.path.relpath(dirpath, cmds_dir)
+            parts = [] if rel_path == '.' else rel_path.split(os.sep)
+            node = root
+            for part in parts:
+                node = node.children.setdefault(part, CommandNode())
+            if parts and 'command.py' in filenames:
+                node.module_name = '.'.join([package] + parts + ['command'])
+                node.file_path = os.path.join(dirpath, 'command.py')
+        return root
+
+    def get_command_class(self, node: CommandNode) -> type:
+        """
+        Get the Command class of a trie node, importing its module on first use.
+
+        Args:
+            node (CommandNode): The trie node of the command.
+
+        Returns:
+            type: The Command class.
+        """
+        cached = self.command_classes.get(node.module_name)
+        if cached is not None and not self.reload_commands:
+            return cached[0]
+
+        mtime = os.path.getmtime(node.file_path) if self.reload_commands else 0.0
+        if cached is not None and cached[1] == mtime:
+            return cached[0]
+
+        module = importlib.import_module(node.module_name)
+        if cached is not None:
+            module = importlib.reload(module)
+        self.command_classes[node.module_name] = (module.Command, mtime)
+        return module.Command
+
+    def find_node(self, cmds: List[str]) -> CommandNode:
+        """
+        Follow the words of a command line down the command trie, the remaining words are arguments.
+
+        Args:
+            cmds (List[str]): The words of the command line.
+
+        Returns:
+            CommandNode: The deepest node reached.
+        """
+        node = self.registry
+        for x in cmds:
+            if x not in node.children:
+                break
+            node = node.children[x]
+        return node
+
+    def is_read_only(self, cmd: str, cmds_dir: str) -> bool:
+        """
+        Tell whether a command only reads, so that it can run concurrently with others.
+        Commands declare it with a read_only class attribute.
+
+        Args:
+            cmd (str): The command line.
+            cmds_dir (str): The directory of commands, scanned on first use.
+
+        Returns:
+            bool: True if the command is known and read-only.
+        """
+        return self.has_flag(cmd, cmds_dir, 'read_only')
+
+    def needs_terminal(self, cmd: str, cmds_dir: str) -> bool:
+        """
+        Tell whether a command needs the terminal UI (watches), so that it cannot run in a batch.
+        Commands declare it with a needs_terminal class attribute.
+
+        Args:
+            cmd (str): The command line.
+            cmds_dir (str): The directory of commands, scanned on first use.
+
+        Returns:
+            bool: True if the command is known and needs the terminal.
+        """
+        return self.has_flag(cmd, cmds_dir, 'needs_terminal')
+
+    def is_implemented(self, cmd: str, cmds_dir: str) -> bool:
+        """
+        Tell whether a command line names a command, so that unknown commands are reported as failures.
+        Quitting and listing subcommands with '?' are commands too.
+
+        Args:
+            cmd (str): The command line.
+            cmds_dir (str): The directory of commands, scanned on first use.
+
+        Returns:
+            bool: True if the command line can be dispatched.
+        """
+        cmds = self.parse_words(cmd, cmds_dir)
+        if not cmds:
+            return False
+        if cmds[0] == 'q' or cmds[-1] == '?':
+            return True
+        return self.find_node(cmds).module_name is not None
+
+    def has_flag(self, cmd: str, cmds_dir: str, name: str) -> bool:
+        cmds = self.parse_words(cmd, cmds_dir)
+        if not cmds:
+            return False
+        node = self.find_node(cmds)
+        if node.module_name is None:
+            return False
+        try:
+            return getattr(self.get_command_class(node), name, False)
+        except Exception:
+            return False  # Reported when the command is dispatched
+
+    def parse_words(self, cmd: str, cmds_dir: str) -> List[str]:
+        """
+        The words of a command line without the --format option, empty if it cannot be parsed.
+        """
+        try:
+            cmds, _ = parse_option(shlex.split(cmd))
+        except ValueError:
+            return []
+        if self.registry is None:
+            self.registry = self.build_registry(cmds_dir)
+        return cmds
+
+    def dispatch(self, cmd: str, cmds_dir: str, terminal: TerminalScreen,
+                 writer: Optional[RecordWriter] = None) -> str:
+        """
+        Dispatch a command.
+
+        Args:
+            cmd (str): The command to dispatch, with an optional --format json|ndjson|csv.
+            cmds_dir (str): The directory of commands, scanned on first dispatch.
+            terminal (TerminalScreen): The terminal of the watches, None without the terminal UI.
+            writer (Optional[RecordWriter]): Where structured records are streamed as they are
+                produced, instead of being returned as a string for the terminal.
+
+        Returns:
+            str: The output string from command.execute(), or None if execution fails
+                or the records were written.
         """
         if not cmd:
             return None
-        cmds = shlex.split(cmd)
-        depth -= 1
         try:
-            cmds[depth]
-        except IndexError:
-            print("Command not implemented:", cmd)
-            return None
+            cmds, output_format = parse_option(shlex.split(cmd), self.output_format)
+        except ValueError as e:
+            return f"Error: {e}"
+        if self.registry is None:
+            self.registry = self.build_registry(cmds_dir)
 
-        self.cmds_avail = [f for f in os.scandir(cmds_dir) if f.is_dir()]
-        if cmds[depth] == 'q':
+        if cmds and cmds[0] == 'q':
             exit(0)
-        if cmds[depth] == '?':
-            if not self.cmds_avail:
+        if cmds and cmds[-1] == '?':
+            # List the subcommands of the words before it, '?' as an argument is taken as such
+            node = self.find_node(cmds[:-1])
+            if not node.children:
                 print("No subcommands")
                 return None
-            for x in self.cmds_avail:
-                if not x.name.startswith('__'):
-                    print(x.name)
+            for name in node.children:
+                print(name)
             return None
 
-        for x in self.cmds_avail:
-            if cmds[depth] == x.name:
-                if len(cmds) > depth:
-                    return self.dispatch(cmd, os.path.join(cmds_dir, cmds[depth]), terminal, depth + 1)
-                return None
-
-        module_path = "commands"
-        for x in cmds:
-            module_path = os.path.join(module_path, x)
-            if os.path.exists(os.path.join(module_path, 'command.py')):
-                break
-        module_name = module_path.replace('/', '.') + '.command'
+        node = self.find_node(cmds)
+        if node.module_name is None:
+            print("Command not implemented:", cmd)
+            return None
         try:
-            module = importlib.import_module(module_name)
+            command_class = self.get_command_class(node)
         except Exception as e:
             return str(e)
-        command = module.Command(cmds, terminal)
-        return command.execute()
\ No newline at end of file
+        if terminal is None and getattr(command_class, 'needs_terminal', False):
+            return f"Error: {' '.join(cmds)} is not available without the terminal UI"
+        perf = Perf.get_shared()
+        with perf.timer('dispatch'):
+            command = command_class(cmds, terminal)
+            if output_format == TEXT:
+                return perf.call(command.execute)
+            if getattr(command_class, 'writes_records', False):
+                # A watch, it writes its own records
+                command.output_format = output_format
+                return perf.call(command.execute)
+            if not hasattr(command, 'records'):
+                return f"Error: {' '.join(cmds)} has no {output_format} output"
+            try:
+                if writer is None:
+                    return perf.call(format_records, command.records(), output_format)
+                if writer.output_format == output_format:
+                    perf.call(writer.write, command.records())
+                else:
+                    perf.call(write_records, command.records(), output_format, writer.file)
+                return None
+            except ValueError as e:
+                return f"Error: {e}"
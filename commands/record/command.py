@@ -0,0 +1,56 @@
+from data_sources import DataSources
+from json_codec import DecodeError, loads
+from status_recorder import StatusRecorder
+from terminal_screen import TerminalScreen, parse_interval
+import asyncio
+import time
+
+class Command():
+    needs_terminal = True  # Runs in the terminal UI, rejected in batch mode
+
+    def __init__(self, cmds, terminal_screen: TerminalScreen):
+        self.cmds = cmds
+        self.terminal_screen = terminal_screen
+        self.data_sources = DataSources.get_shared()
+        self.recorder: StatusRecorder = None
+        self.snapshot = None
+
+    def record(self) -> str:
+        snapshot = self.data_sources.get('cgw')
+        if snapshot is not self.snapshot:
+            # A new snapshot object means the payloads changed, unchanged ones are not parsed again
+            self.snapshot = snapshot
+            try:
+                document = {
+                    'site_status': loads(snapshot.payloads[0]) if snapshot.payloads[0] is not None else None,
+                    'charging_stations_status': loads(snapshot.payloads[1]) if snapshot.payloads[1] is not None else None,
+                }
+            except DecodeError as e:
+                return f"Error: {e}"
+            self.recorder.write(time.time(), document)
+        return (f"Recording to {self.recorder.filename}: {self.recorder.records} snapshots, "
+                f"{self.recorder.size()} bytes")
+
+    def execute(self) -> str:
+        # record <file> [seconds]
+        if len(self.cmds) < 2:
+            return "Usage: record <file> [seconds]"
+        try:
+            interval_seconds = parse_interval(self.cmds[2]) if len(self.cmds) > 2 else 2
+        except ValueError as e:
+            return str(e)
+        try:
+            self.recorder = StatusRecorder(self.cmds[1])
+        except (OSError, ValueError) as e:
+            return f"Error: {e}"
+
+        async def record(watch_id: int):
+            try:
+                while True:
+                    self.terminal_screen.display(await self.terminal_screen.run_blocking(self.record), watch_id)
+                    await asyncio.sleep(interval_seconds)
+            finally:
+                self.recorder.close()
+
+        watch_id = self.terminal_screen.start_watch(record, title=f"record {self.cmds[1]}")
+        return f"Started watch {watch_id}"
@@ -0,0 +1,72 @@
+from charging_stations_status import ChargingStationsStatus
+from data_sources import DataSources
+from site_status import SiteStatus
+from status_recorder import StatusLog
+from terminal_screen import TerminalScreen
+from datetime import datetime
+import asyncio
+
+class Command():
+    needs_terminal = True  # Runs in the terminal UI, rejected in batch mode
+
+    def __init__(self, cmds, terminal_screen: TerminalScreen):
+        self.cmds = cmds
+        self.terminal_screen = terminal_screen
+        self.data_sources = DataSources.get_shared()
+
+    def render(self, timestamp: float, document: dict) -> str:
+        site_status = SiteStatus.from_json(document['site_status'])
+        charging_stations_status = ChargingStationsStatus.from_json(document['charging_stations_status'])
+        # The leases are the current ones, they are not recorded
+        dnsmasq_leases = self.data_sources.get('dnsmasq.leases')
+
+        header = f"Replay {self.cmds[1]} at {datetime.fromtimestamp(timestamp).strftime('%y%m%d_%H%M%S')}\n"
+        return header + site_status.display(dnsmasq_leases, charging_stations_status)
+
+    def execute(self) -> str:
+        # replay <file> [--speed N] [--start YYYY-MM-DDTHH:MM:SS]
+        if len(self.cmds) < 2:
+            return "Usage: replay <file> [--speed N] [--start YYYY-MM-DDTHH:MM:SS]"
+        speed, start = 1.0, None
+        try:
+            options = self.cmds[2:]
+            if len(options) % 2:
+                return f"Error: {options[-1]} needs a value"
+            for option, value in zip(options[::2], options[1::2]):
+                if option == '--speed':
+                    speed = float(value)
+                elif option == '--start':
+                    start = datetime.fromisoformat(value).timestamp()
+                else:
+                    return f"Error: unknown option {option}"
+            if speed <= 0:
+                return "Error: the speed must be positive"
+            log = StatusLog(self.cmds[1])
+        except (OSError, ValueError) as e:
+            return f"Error: {e}"
+
+        async def replay(watch_id: int):
+            frames = log.frames(start)
+
+            def next_frame():
+                # Read and render off the event loop
+                frame = next(frames, None)
+                if frame is None:
+                    return None
+                return frame[0], self.render(*frame)
+
+            previous = None
+            while True:
+                frame = await self.terminal_screen.run_blocking(next_frame)
+                if frame is None:
+                    break
+                timestamp, text = frame
+                if previous is not None:
+                    await asyncio.sleep((timestamp - previous) / speed)
+                previous = timestamp
+                self.terminal_screen.display(text, watch_id)
+            self.terminal_screen.display(f"Replay of {self.cmds[1]} finished, 'watch kill {watch_id}' closes it")
+            await asyncio.Future()  # Keep the last snapshot on screen until killed
+
+        watch_id = self.terminal_screen.start_watch(replay, title=f"replay {self.cmds[1]}")
+        return f"Started watch {watch_id}"
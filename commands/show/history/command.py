@@ -0,0 +1,43 @@
+from data_sources import DataSources
+from site_history import SiteHistory
+from terminal_screen import TerminalScreen, parse_interval
+
+USAGE = "Usage: show history <charger> [minutes]"
+
+class Command():
+    read_only = True  # Run concurrently with the other read-only commands of a batch
+
+    def __init__(self, cmds, terminal_screen: TerminalScreen):
+        self.cmds = cmds
+        self.terminal_screen = terminal_screen
+
+    def parse_args(self):
+        # show history <charger> [minutes]
+        if len(self.cmds) < 3:
+            raise ValueError(USAGE)
+        minutes = 10
+        if len(self.cmds) > 3:
+            try:
+                minutes = parse_interval(self.cmds[3])
+            except ValueError:
+                raise ValueError(f"Invalid minutes: {self.cmds[3]}") from None
+        return self.cmds[2], minutes
+
+    def sample(self) -> None:
+        # The history is sampled by the fetches, so that it has the current status at least
+        DataSources.get_shared().get('cgw')
+
+    def execute(self) -> str:
+        if len(self.cmds) < 3:
+            return USAGE
+        try:
+            charger_id, minutes = self.parse_args()
+        except ValueError as e:
+            return str(e)
+        self.sample()
+        return SiteHistory.get_shared().display(charger_id, minutes)
+
+    def records(self):
+        charger_id, minutes = self.parse_args()
+        self.sample()
+        return SiteHistory.get_shared().records(charger_id, minutes)
@@ -0,0 +1,40 @@
+from pcap_analysis import PcapAnalysis
+from ocpp_stream import DEFAULT_OCPP_PORTS
+from terminal_screen import TerminalScreen
+
+USAGE = "Usage: show pcap <file> [port,port,...] [workers]"
+
+class Command():
+    read_only = True  # Run concurrently with the other read-only commands of a batch
+
+    def __init__(self, cmds, terminal_screen: TerminalScreen):
+        self.cmds = cmds
+        self.terminal_screen = terminal_screen
+
+    def analyse(self) -> PcapAnalysis:
+        # show pcap <file> [port,port,...] [workers]
+        if len(self.cmds) < 3:
+            raise ValueError(USAGE)
+        ports = DEFAULT_OCPP_PORTS
+        workers = 1
+        if len(self.cmds) > 3:
+            ports = [int(port) for port in self.cmds[3].split(',')]
+        if len(self.cmds) > 4:
+            workers = int(self.cmds[4])  # Decoder processes, for the large captures
+        return PcapAnalysis.from_file(self.cmds[2], ports, workers)
+
+    def execute(self) -> str:
+        if len(self.cmds) < 3:
+            return USAGE
+        try:
+            analysis = self.analyse()
+        except (OSError, ValueError, RuntimeError) as e:
+            return f"Error: {e}"
+        return analysis.display()
+
+    def records(self):
+        try:
+            analysis = self.analyse()
+        except (OSError, RuntimeError) as e:
+            raise ValueError(str(e)) from e  # Reported by the dispatcher
+        return analysis.records()
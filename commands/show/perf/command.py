@@ -0,0 +1,43 @@
+from perf import Perf
+import timestamps
+from terminal_screen import TerminalScreen
+
+USAGE = "Usage: show perf [on|off|reset|profile start|profile stop|tracemalloc [start|stop]]"
+
+class Command():
+    def __init__(self, cmds, terminal_screen: TerminalScreen):
+        self.cmds = cmds
+        self.terminal_screen = terminal_screen
+        self.perf = Perf.get_shared()
+
+    def execute(self) -> str:
+        # show perf [on|off|reset|profile start|stop|tracemalloc [start|stop]]
+        args = self.cmds[2:]
+        if not args:
+            caches = ", ".join(f"{name} {info.hits} hits, {info.misses} misses"
+                               for name, info in timestamps.cache_info().items())
+            return self.perf.display() + f"\nTimestamp caches: {caches}\n"
+        if args == ['on'] or args == ['off']:
+            self.perf.enabled = args[0] == 'on'
+            return f"Instrumentation {args[0]}"
+        if args == ['reset']:
+            self.perf.reset()
+            return "Instrumentation reset"
+        if args == ['profile', 'start']:
+            self.perf.start_profile()
+            return "Profiling commands and watches, 'show perf profile stop' reports"
+        if args == ['profile', 'stop']:
+            return self.perf.stop_profile()
+        if args == ['tracemalloc', 'start']:
+            self.perf.start_tracemalloc()
+            return "Tracing allocations, 'show perf tracemalloc' reports"
+        if args == ['tracemalloc']:
+            return self.perf.tracemalloc_report()
+        if args == ['tracemalloc', 'stop']:
+            return self.perf.tracemalloc_report(stop=True)
+        return USAGE
+
+    def records(self):
+        if self.cmds[2:]:
+            raise ValueError("show perf has structured output without arguments only")
+        return self.perf.records()
@@ -1,53 +1,21 @@
-from redis_handler import RedisHandler
-from site_status import SiteStatus
-from charging_stations_status import ChargingStationsStatus
-from dnmasq_leases import DnsmasqLeases
-import json
+from data_sources import DataSources
 
 class Command():
-    def __init__(self, cmds):
-        self.redis_handler = RedisHandler()
-        self.key_site_status = 'cgw/SiteStatus'
-        self.key_charging_stations = 'cgw/ChargingStationsStatus'
-        self.dnsmasq_leases = DnsmasqLeases("/data/dnsmasq/dnsmasq.leases")
+    read_only = True  # Run concurrently with the other read-only commands of a batch
 
-    def execute(self) -> str:
-        site_status = None  
-        try:
-            site_status_json = self.redis_handler.get_value(self.key_site_status)
-            if site_status_json is not None:
-                site_status = json.loads(site_status_json)
-        except Exception as e:
-            # If Redis is not reachable, load site status from file
-            try:
-                with open('site_status.json', 'r') as f:
-                    site_status = json.load(f)
-            except FileNotFoundError:
-                print("Warning: site_status.json not found.")
-            except json.JSONDecodeError:
-                print("Error: Unable to decode site_status.json.")
+    def __init__(self, cmds, terminal_screen=None):
+        self.cmds = cmds
+        self.data_sources = DataSources.get_shared()
 
-        charging_stations_status = None
-        try:
-            charging_stations_status_json = self.redis_handler.get_value(self.key_charging_stations)
-            if charging_stations_status_json is not None:
-                charging_stations_status = json.loads(charging_stations_status_json)
-        except Exception as e:
-            # If Redis is not reachable, load charging station status from file
-            try:
-                with open('charging_stations_status.json', 'r') as f:
-                    charging_stations_status = json.load(f)
-            except FileNotFoundError:
-                print("Warning: charging_stations_status.py not found.")
-            except json.JSONDecodeError:
-                print("Error: Unable to decode charging_stations_status.py.")
+    def execute(self) -> str:
+        # Both statuses from one snapshot, they cannot come from two different fetches
+        snapshot = self.data_sources.get('cgw')
+        dnsmasq_leases = self.data_sources.get('dnsmasq.leases')
 
-        try:
-            self.dnsmasq_leases.read_leases()
-        except Exception as e:
-            print(f"Error: {e}")
+        return snapshot.site_status.display(dnsmasq_leases, snapshot.charging_stations_status)
 
-        charging_stations_status = ChargingStationsStatus.from_json(charging_stations_status)
-        site_status = SiteStatus.from_json(site_status)
+    def records(self):
+        snapshot = self.data_sources.get('cgw')
+        dnsmasq_leases = self.data_sources.get('dnsmasq.leases')
 
-        return site_status.display(self.dnsmasq_leases, charging_stations_status)
+        return snapshot.site_status.records(dnsmasq_leases, snapshot.charging_stations_status)
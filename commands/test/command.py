@@ -4,6 +4,8 @@ import time
 
 
 class Command():
+    needs_terminal = True  # Runs in the terminal UI, rejected in batch mode
+
     def __init__(self, cmds, terminal: TerminalScreen):
         self.cmds = cmds
         self.terminal = terminal
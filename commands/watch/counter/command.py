@@ -1,7 +1,9 @@
-from terminal_screen import TerminalScreen
+from terminal_screen import TerminalScreen, parse_interval
 import time 
 
 class Command():
+    needs_terminal = True  # Runs in the terminal UI, rejected in batch mode
+
     def __init__(self, cmds, terminal_screen: TerminalScreen):
         self.cmds = cmds
         self.terminal_screen = terminal_screen
@@ -12,7 +14,11 @@ class Command():
 
 
     def execute(self) -> str:
-        # Start the interval process (execute the function every 2 seconds in this example)
-        self.terminal_screen.start_interval_process(interval_seconds=2, func=self.example_interval_function)
+        # Start the interval process (every 2 seconds unless given: watch counter [seconds])
+        try:
+            interval_seconds = parse_interval(self.cmds[2]) if len(self.cmds) > 2 else 2
+        except ValueError as e:
+            return str(e)
+        self.terminal_screen.start_interval_process(interval_seconds=interval_seconds, func=self.example_interval_function, title="counter")
 
         return str(self.cmds)
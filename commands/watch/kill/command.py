@@ -1,13 +1,23 @@
 from terminal_screen import TerminalScreen
-import time 
 
 class Command():
+    needs_terminal = True  # Runs in the terminal UI, rejected in batch mode
+
     def __init__(self, cmds, terminal_screen: TerminalScreen):
         self.cmds = cmds
         self.terminal_screen = terminal_screen
         
     def execute(self) -> str:
-        # Start the interval process (execute the function every 2 seconds in this example)
-        self.terminal_screen.kill_threads()
+        # watch kill [id]: stop one watch, or all of them without an ID
+        if len(self.cmds) > 2:
+            try:
+                watch_id = int(self.cmds[2])
+            except ValueError:
+                return f"Invalid watch ID: {self.cmds[2]}"
+            if self.terminal_screen.kill_watch(watch_id):
+                return f"Watch {watch_id} Killed"
+            return f"No watch with ID {watch_id}"
+
+        self.terminal_screen.kill_watches()
 
-        return "All Threads Killed"
+        return "All Watches Killed"
@@ -1,61 +1,81 @@
-from redis_handler import RedisHandler
-from site_status import SiteStatus
-from charging_stations_status import ChargingStationsStatus
-from dnmasq_leases import DnsmasqLeases
-import json
-from terminal_screen import TerminalScreen
-from functools import partial
+from data_sources import DataSources, KEY_SITE_STATUS, KEY_CHARGING_STATIONS
+from terminal_screen import SAFETY_REFRESH_SECONDS, TerminalScreen, parse_interval
+from output_format import CSV, TEXT
+from json_codec import dumps
+import time
+
+RECORDS_FILE = "site_status.ndjson"  # Of the structured output, unless given
+
 
 class Command():
+    needs_terminal = True  # Runs in the terminal UI, rejected in batch mode
+    writes_records = True  # Appends its records to a file itself, in the format set by the dispatcher
+
     def __init__(self, cmds, terminal_screen: TerminalScreen):
         self.cmds = cmds
         self.terminal_screen = terminal_screen
-        self.redis_handler = RedisHandler()
-        self.key_site_status = 'cgw/SiteStatus'
-        self.key_charging_stations = 'cgw/ChargingStationsStatus'
-        self.dnsmasq_leases = DnsmasqLeases("/data/dnsmasq/dnsmasq.leases")
+        self.data_sources = DataSources.get_shared()
+        self.redis_handler = self.data_sources.redis_handler
+        self.rendered = (None, None)  # (snapshot key, output) of the last render
+        self.output_format = TEXT  # Set by the dispatcher, JSON and NDJSON both append one line per change
+        self.records_file = self.cmds[3] if len(self.cmds) > 3 else RECORDS_FILE
+        self.changes = 0
+
+    def render(self) -> str:
+        # Shared with all other watches, Redis is read at most once per interval
+        # and the payloads are only parsed again when their bytes changed
+        snapshot = self.data_sources.get('cgw')
+        dnsmasq_leases = self.data_sources.get('dnsmasq.leases')
+
+        key = (snapshot.digest, dnsmasq_leases.signature)
+        if key != self.rendered[0]:
+            if self.output_format == TEXT:
+                output = snapshot.site_status.display(dnsmasq_leases, snapshot.charging_stations_status)
+            else:
+                output = self.append_records(snapshot, dnsmasq_leases)
+            self.rendered = (key, output)
+        return self.rendered[1]
+
+    def append_records(self, snapshot, dnsmasq_leases) -> str:
+        """
+        Append the records of a changed site status to the records file, as one line.
+
+        Returns:
+            str: What the pane shows instead of the records.
+        """
+        now = time.time()
+        records = snapshot.site_status.records(dnsmasq_leases, snapshot.charging_stations_status)
+        with open(self.records_file, 'a') as file:
+            file.write(dumps({'time': now, 'records': list(records)}) + '\n')
+        self.changes += 1
+        return (f"Changes appended to {self.records_file}: {self.changes}, "
+                f"last at {time.strftime('%H:%M:%S', time.localtime(now))}")
+
+    def subscribe(self, callback):
+        def changed(keys):
+            if keys:
+                self.data_sources.invalidate('cgw')  # Fetch the new snapshot on the next render
+            callback(keys)
+
+        return self.redis_handler.subscribe([KEY_SITE_STATUS, KEY_CHARGING_STATIONS], changed)
 
-        
     def execute(self) -> str:
-        site_status = None  
-        try:
-            site_status_json = self.redis_handler.get_value(self.key_site_status)
-            if site_status_json is not None:
-                site_status = json.loads(site_status_json)
-        except Exception as e:
-            # If Redis is not reachable, load site status from file
-            try:
-                with open('site_status.json', 'r') as f:
-                    site_status = json.load(f)
-            except FileNotFoundError:
-                print("Warning: site_status.json not found.")
-            except json.JSONDecodeError:
-                print("Error: Unable to decode site_status.json.")
-
-        charging_stations_status = None
-        try:
-            charging_stations_status_json = self.redis_handler.get_value(self.key_charging_stations)
-            if charging_stations_status_json is not None:
-                charging_stations_status = json.loads(charging_stations_status_json)
-        except Exception as e:
-            # If Redis is not reachable, load charging station status from file
-            try:
-                with open('charging_stations_status.json', 'r') as f:
-                    charging_stations_status = json.load(f)
-            except FileNotFoundError:
-                print("Warning: charging_stations_status.py not found.")
-            except json.JSONDecodeError:
-                print("Error: Unable to decode charging_stations_status.py.")
+        if self.output_format == CSV:
+            return "Error: watch site-status writes json or ndjson, one line per change"
 
+        # Re-render when the CGW writes one of the keys, polling (every 2 seconds unless
+        # given: watch site-status [seconds] [file]) while keyspace notifications are not received.
+        # A given interval is also the longest time between two renders with notifications.
+        # Structured output is appended to the file, the terminal owns the standard output.
         try:
-            self.dnsmasq_leases.read_leases()
-        except Exception as e:
-            print(f"Error: {e}")
-
-        charging_stations_status = ChargingStationsStatus.from_json(charging_stations_status)
-        site_status = SiteStatus.from_json(site_status)
-        
-        partial_func = partial(site_status.display, self.dnsmasq_leases, charging_stations_status)
-        self.terminal_screen.start_interval_process(interval_seconds=2, func=partial_func)
+            interval_seconds = parse_interval(self.cmds[2]) if len(self.cmds) > 2 else 2
+        except ValueError as e:
+            return str(e)
+        refresh_seconds = interval_seconds if len(self.cmds) > 2 else SAFETY_REFRESH_SECONDS
+        watch_id = self.terminal_screen.start_event_process(subscribe=self.subscribe, func=self.render,
+                                                            title="site-status", poll_seconds=interval_seconds,
+                                                            refresh_seconds=refresh_seconds)
 
-        return ""
+        if self.output_format != TEXT:
+            return f"Started watch {watch_id}, appending to {self.records_file}"
+        return f"Started watch {watch_id}"
@@ -0,0 +1,253 @@
+from redis_handler import RedisHandler
+from site_status import SiteStatus
+from charging_stations_status import ChargingStationsStatus
+from dnmasq_leases import DnsmasqLeases
+from status_change_tracker import StatusChangeTracker
+from site_history import SiteHistory
+from json_codec import DecodeError, decode
+from perf import Perf
+from typing import Callable, Dict, NamedTuple, Optional
+import hashlib
+import threading
+import time
+
+KEY_SITE_STATUS = 'cgw/SiteStatus'
+KEY_CHARGING_STATIONS = 'cgw/ChargingStationsStatus'
+LEASES_FILE = "/data/dnsmasq/dnsmasq.leases"
+
+
+class DataSource:
+    """
+    A named piece of data shared by all commands and watches, cached for ttl seconds.
+
+    Concurrent callers of get() wait for a single fetch instead of fetching in
+    parallel. A source with a parent derives its value from the parent's value
+    and is only recomputed when the parent's value changed. A fetch returning
+    the same object as before does not count as a change.
+    """
+
+    def __init__(self, name: str, fetch: Callable, ttl: float = 2.0, parent: 'DataSource' = None) -> None:
+        """
+        Initialize DataSource object.
+
+        Args:
+            name (str): The name of the source.
+            fetch (Callable): Returns the value; called with the parent's value if there is a parent.
+            ttl (float): Seconds a fetched value is reused.
+            parent (DataSource): The source this one is derived from.
+        """
+        self.name = name
+        self.fetch = fetch
+        self.ttl = ttl
+        self.parent = parent
+        self.value = None
+        self.version = 0  # Incremented whenever the value changes
+        self.parent_version: Optional[int] = None
+        self.fetched_at: Optional[float] = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        """
+        Get the value, fetching it if the cached one expired.
+
+        Returns:
+            The value of the source.
+        """
+        with self.lock:
+            if self.parent is not None:
+                parent_value = self.parent.get()
+                if self.parent.version != self.parent_version:
+                    self.set_value(self.fetch(parent_value))
+                    self.parent_version = self.parent.version
+                return self.value
+
+            now = time.monotonic()
+            if self.fetched_at is None or now - self.fetched_at >= self.ttl:
+                self.set_value(self.fetch())
+                self.fetched_at = now
+            return self.value
+
+    def set_value(self, value) -> None:
+        if value is not self.value:
+            self.value = value
+            self.version += 1
+
+    def invalidate(self) -> None:
+        """
+        Drop the cached value, the next get() fetches again.
+        """
+        with self.lock:
+            self.fetched_at = None
+        if self.parent is not None:
+            self.parent.invalidate()
+
+
+class CgwSnapshot(NamedTuple):
+    """
+    The CGW status, parsed once from one pair of raw payloads.
+    """
+    digest: tuple
+    site_status: SiteStatus
+    charging_stations_status: ChargingStationsStatus
+    payloads: tuple  # The raw site status and charging stations status payloads
+
+
+class SnapshotLoader:
+    """
+    Loads the CGW status and parses it only when the raw payloads changed.
+
+    The payloads are compared by length and BLAKE2b digest, so an unchanged
+    snapshot costs one MGET and a hash instead of a JSON decode, and the
+    previous CgwSnapshot object is returned as is.
+    """
+
+    def __init__(self, redis_handler: RedisHandler) -> None:
+        """
+        Initialize SnapshotLoader object.
+
+        Args:
+            redis_handler (RedisHandler): The Redis client to read the CGW status from.
+        """
+        self.redis_handler = redis_handler
+        self.snapshot: Optional[CgwSnapshot] = None
+
+    def load(self) -> CgwSnapshot:
+        """
+        Load the current snapshot.
+
+        Returns:
+            CgwSnapshot: The snapshot, the previous object if the payloads did not change.
+        """
+        site_status_raw, charging_stations_status_raw = self.load_raw()
+        digest = (self.digest(site_status_raw), self.digest(charging_stations_status_raw))
+        if self.snapshot is not None and self.snapshot.digest == digest:
+            Perf.get_shared().count('snapshot.unchanged')
+        else:
+            Perf.get_shared().count('snapshot.parsed')
+            site_status = self.parse(site_status_raw, SiteStatus, 'site status')
+            charging_stations_status = self.parse(charging_stations_status_raw, ChargingStationsStatus,
+                                                  'charging stations status')
+            # Record status transitions once per new snapshot, not once per watch
+            StatusChangeTracker.get_shared().update(charging_stations_status)
+            self.snapshot = CgwSnapshot(digest, site_status, charging_stations_status,
+                                        (site_status_raw, charging_stations_status_raw))
+
+        # Sample every fetch, unchanged snapshots included, so the history has no gaps
+        SiteHistory.get_shared().record(self.snapshot.site_status, self.snapshot.charging_stations_status)
+        return self.snapshot
+
+    def load_raw(self) -> tuple:
+        """
+        Read SiteStatus and ChargingStationsStatus from Redis in one round trip,
+        or from the JSON snapshot files if Redis is not reachable.
+
+        Returns:
+            tuple: The raw site status and charging stations status payloads, None if missing.
+        """
+        try:
+            return tuple(self.redis_handler.get_raw_values([KEY_SITE_STATUS, KEY_CHARGING_STATIONS]))
+        except Exception as e:
+            # If Redis is not reachable, load site and charging station status from file
+            return self.read_file('site_status.json'), self.read_file('charging_stations_status.json')
+
+    @staticmethod
+    def read_file(filename: str) -> Optional[bytes]:
+        try:
+            with open(filename, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            print(f"Warning: {filename} not found.")
+            return None
+
+    @staticmethod
+    def digest(payload: Optional[bytes]) -> Optional[tuple]:
+        if payload is None:
+            return None
+        return len(payload), hashlib.blake2b(payload, digest_size=16).digest()
+
+    @staticmethod
+    def parse(payload: Optional[bytes], model: type, name: str):
+        """
+        Decode a raw payload into a model object, an empty one if it is missing or invalid.
+        """
+        if payload is None:
+            return model.from_json(None)
+        try:
+            return decode(payload, model)
+        except DecodeError:
+            print(f"Error: Unable to decode {name}.")
+            return model.from_json(None)
+
+
+class DataSources:
+    """
+    The registry of data sources, shared by the whole process so that any
+    number of watches on the same data cost one Redis read per interval.
+    """
+
+    _shared: 'DataSources' = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, redis_handler: RedisHandler = None, leases_file: str = LEASES_FILE, ttl: float = 2.0) -> None:
+        """
+        Initialize DataSources object with the CGW status and dnsmasq leases sources.
+
+        Args:
+            redis_handler (RedisHandler): The Redis client to read the CGW status from.
+            leases_file (str): The path to the dnsmasq leases file.
+            ttl (float): Seconds fetched values are reused.
+        """
+        self.redis_handler = redis_handler if redis_handler is not None else RedisHandler()
+        self.dnsmasq_leases = DnsmasqLeases(leases_file)
+        self.snapshot_loader = SnapshotLoader(self.redis_handler)
+        self.sources: Dict[str, DataSource] = {}
+
+        cgw = self.add(DataSource('cgw', self.snapshot_loader.load, ttl))
+        self.add(DataSource(KEY_SITE_STATUS, lambda snapshot: snapshot.site_status, parent=cgw))
+        self.add(DataSource(KEY_CHARGING_STATIONS, lambda snapshot: snapshot.charging_stations_status, parent=cgw))
+        self.add(DataSource('dnsmasq.leases', self.load_leases, ttl))
+
+    @classmethod
+    def get_shared(cls) -> 'DataSources':
+        """
+        Get the process-wide registry, creating it on first use.
+
+        Returns:
+            DataSources: The shared registry.
+        """
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def add(self, source: DataSource) -> DataSource:
+        self.sources[source.name] = source
+        return source
+
+    def get(self, name: str):
+        """
+        Get the value of a source.
+
+        Args:
+            name (str): The name of the source.
+
+        Returns:
+            The value of the source.
+        """
+        return self.sources[name].get()
+
+    def invalidate(self, name: str) -> None:
+        """
+        Drop the cached value of a source, e.g. when Redis notified a change.
+
+        Args:
+            name (str): The name of the source.
+        """
+        self.sources[name].invalidate()
+
+    def load_leases(self) -> DnsmasqLeases:
+        try:
+            self.dnsmasq_leases.read_leases()
+        except Exception as e:
+            print(f"Error: {e}")
+        return self.dnsmasq_leases
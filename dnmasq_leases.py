@@ -1,6 +1,12 @@
-from datetime import datetime
+from perf import timed
+from table_renderer import Column, SIMPLE, TableRenderer
+from timestamps import format_epoch
+from typing import Optional
 import os
 
+LEASES_TABLE = TableRenderer([Column('Lease Time'), Column('MAC Address'), Column('IP Address'),
+                              Column('Hostname'), Column('Client ID')], style=SIMPLE)
+
 class DnsmasqLeases:
     """
     Represents a handler for reading and managing dnsmasq leases.
@@ -15,60 +21,87 @@ class DnsmasqLeases:
         """
         self.filename = filename
         self.entries = []
+        self.entries_by_ip = {}
+        self.entries_by_mac = {}
+        self.signature = None  # (path, inode, size, mtime) of the last parsed file
 
+    @timed('leases.read')
     def read_leases(self) -> None:
         """
         Reads the dnsmasq leases file and populates the entries.
+
+        The file is only parsed again when its inode, size or mtime changed, and
+        the entries are replaced as a whole, so repeated reads keep memory constant.
+        The entries are cleared when the file is missing.
         """
         try:
-            with open(self.filename, 'r') as file:
-                for line in file:
-                    fields = line.split()
-                    if len(fields) >= 5:
-                        lease_time, mac_address, ip_address, hostname, client_id = fields[:5]
-                        lease_time_formatted = self.convert_lease_time(lease_time)
-                        entry = {
-                            'lease_time': lease_time_formatted,
-                            'mac_address': mac_address,
-                            'ip_address': ip_address,
-                            'hostname': hostname,
-                            'client_id': client_id
-                        }
-                        self.entries.append(entry)
+            file = open(self.filename, 'r')
         except FileNotFoundError:
             base_filename = os.path.basename(self.filename)
             cwd = os.getcwd()
             file_path = os.path.join(cwd, base_filename)
             try:
-                with open(file_path, 'r') as file:
-                    for line in file:
-                        fields = line.split()
-                        if len(fields) >= 5:
-                            lease_time, mac_address, ip_address, hostname, client_id = fields[:5]
-                            lease_time_formatted = self.convert_lease_time(lease_time)
-                            entry = {
-                                'lease_time': lease_time_formatted,
-                                'mac_address': mac_address,
-                                'ip_address': ip_address,
-                                'hostname': hostname,
-                                'client_id': client_id
-                            }
-                            self.entries.append(entry)
+                file = open(file_path, 'r')
             except FileNotFoundError:
                 print(f"Error: File {self.filename} not found.")
                 print(f"Error: File {file_path} not found.")
-                
-    def convert_lease_time(self, timestamp: str) -> str:
+                # Leases of a file that is gone are not served, the next read starts over
+                self.entries, self.entries_by_ip, self.entries_by_mac = [], {}, {}
+                self.signature = None
+                return
+
+        with file:
+            stat = os.fstat(file.fileno())
+            signature = (file.name, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+            if signature == self.signature:
+                return
+            entries, entries_by_ip, entries_by_mac = self.parse_leases(file)
+
+        # Swap in the new entries in one step, readers never see a half-read file
+        self.entries, self.entries_by_ip, self.entries_by_mac = entries, entries_by_ip, entries_by_mac
+        self.signature = signature
+
+    def parse_leases(self, file) -> tuple:
+        """
+        Parses lease lines and indexes the entries by IP and MAC address.
+        The first entry for an address wins, as with a linear scan.
+
+        Args:
+            file: The open leases file.
+
+        Returns:
+            tuple: The list of entries, the entries by IP and the entries by MAC address.
+        """
+        entries = []
+        entries_by_ip = {}
+        entries_by_mac = {}
+        for line in file:
+            fields = line.split()
+            if len(fields) >= 5:
+                lease_time, mac_address, ip_address, hostname, client_id = fields[:5]
+                entry = {
+                    'lease_time': int(lease_time),  # Formatted on display
+                    'mac_address': mac_address,
+                    'ip_address': ip_address,
+                    'hostname': hostname,
+                    'client_id': client_id
+                }
+                entries.append(entry)
+                entries_by_ip.setdefault(ip_address, entry)
+                entries_by_mac.setdefault(mac_address, entry)
+        return entries, entries_by_ip, entries_by_mac
+
+    def convert_lease_time(self, timestamp: int) -> str:
         """
         Converts the lease timestamp to a formatted string.
 
         Args:
-            timestamp (str): The timestamp of the lease.
+            timestamp (int): The timestamp of the lease.
 
         Returns:
             str: The formatted lease time string.
         """
-        return datetime.fromtimestamp(int(timestamp)).strftime("%y%m%d_%H%M")
+        return format_epoch(timestamp)
 
     def get_mac_from_ip(self, ip_address: str) -> str:
         """
@@ -80,10 +113,8 @@ class DnsmasqLeases:
         Returns:
             str: The MAC address.
         """
-        for entry in self.entries:
-            if entry['ip_address'] == ip_address:
-                return entry['mac_address']
-        return None
+        entry = self.entries_by_ip.get(ip_address)
+        return entry['mac_address'] if entry is not None else None
 
     def get_lease_time_from_ip(self, ip_address: str) -> str:
         """
@@ -95,17 +126,39 @@ class DnsmasqLeases:
         Returns:
             str: The lease time.
         """
-        for entry in self.entries:
-            if entry['ip_address'] == ip_address:
-                return entry['lease_time']
-        return None
+        entry = self.entries_by_ip.get(ip_address)
+        return self.convert_lease_time(entry['lease_time']) if entry is not None else None
+
+    def get_lease_epoch_from_ip(self, ip_address: str) -> Optional[int]:
+        """
+        Gets the end of the lease of the given IP address, unformatted.
+
+        Args:
+            ip_address (str): The IP address.
+
+        Returns:
+            Optional[int]: The end of the lease in epoch seconds.
+        """
+        entry = self.entries_by_ip.get(ip_address)
+        return entry['lease_time'] if entry is not None else None
+
+    def get_ip_from_mac(self, mac_address: str) -> str:
+        """
+        Gets the IP address associated with the given MAC address.
+
+        Args:
+            mac_address (str): The MAC address.
+
+        Returns:
+            str: The IP address.
+        """
+        entry = self.entries_by_mac.get(mac_address)
+        return entry['ip_address'] if entry is not None else None
 
     def display(self) -> None:
         """
         Displays the dnsmasq leases in a tabular format.
         """
-        from tabulate import tabulate
-        headers = ['Lease Time', 'MAC Address', 'IP Address', 'Hostname', 'Client ID']
-        rows = [[entry['lease_time'], entry['mac_address'], entry['ip_address'], entry['hostname'], entry['client_id']]
+        rows = [[self.convert_lease_time(entry['lease_time']), entry['mac_address'], entry['ip_address'], entry['hostname'], entry['client_id']]
                 for entry in self.entries]
-        print(tabulate(rows, headers=headers))
+        print(LEASES_TABLE.render(rows))
@@ -0,0 +1,121 @@
+"""
+Decoding of the JSON payloads published by the CGW, and encoding of the
+structured output, with the fastest backend installed.
+
+With msgspec, payloads are decoded straight into the model dataclasses
+(SiteStatus, ChargingStationsStatus, CgwConfig), parsing and validating the
+types in one pass. Without it, orjson (or the standard json module) parses the
+raw bytes and the model's from_json builds the objects. A payload msgspec
+rejects for its types (not for its syntax) also goes through from_json, which
+tolerates what the annotations do not declare.
+"""
+from perf import Perf, timed
+from typing import Type, TypeVar, Union
+import functools
+import json
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+T = TypeVar('T')
+
+if msgspec is not None:
+    BACKEND = 'msgspec'
+elif orjson is not None:
+    BACKEND = 'orjson'
+else:
+    BACKEND = 'json'
+
+
+class DecodeError(ValueError):
+    """
+    Raised when a payload is not valid JSON or does not match the model.
+    """
+
+
+@timed('json.loads')
+def loads(data: Union[bytes, str]):
+    """
+    Parse a JSON document into dicts and lists.
+
+    Args:
+        data (Union[bytes, str]): The JSON document, raw bytes are parsed without decoding them first.
+
+    Returns:
+        The parsed document.
+
+    Raises:
+        DecodeError: If the document is not valid JSON.
+    """
+    try:
+        if orjson is not None:
+            return orjson.loads(data)
+        if msgspec is not None:
+            return msgspec.json.decode(data)
+        return json.loads(data)
+    except ValueError as e:
+        raise DecodeError(str(e)) from e
+
+
+@functools.lru_cache(maxsize=None)
+def get_decoder(model: type):
+    """
+    Get the msgspec decoder for a model, built once per model.
+    """
+    return msgspec.json.Decoder(model)
+
+
+@timed('json.decode')
+def decode(data: Union[bytes, str], model: Type[T]) -> T:
+    """
+    Decode a JSON document into a model object.
+
+    Args:
+        data (Union[bytes, str]): The JSON document.
+        model (Type[T]): The model dataclass, it must provide from_json for the fallback backends.
+
+    Returns:
+        T: The model object.
+
+    Raises:
+        DecodeError: If the document is not valid JSON or does not match the model.
+    """
+    if msgspec is not None:
+        try:
+            return get_decoder(model).decode(data)
+        except msgspec.ValidationError:
+            # Valid JSON not matching the annotations, e.g. a null the CGW rarely sends:
+            # from_json tolerates it, one odd field must not blank the whole payload
+            Perf.get_shared().count('decode.fallback')
+        except msgspec.DecodeError as e:
+            raise DecodeError(str(e)) from e
+
+    json_data = loads(data)
+    try:
+        return model.from_json(json_data)
+    except (KeyError, TypeError, AttributeError) as e:
+        raise DecodeError(f"Unexpected {model.__name__} payload: {e!r}") from e
+
+
+def dumps(document) -> str:
+    """
+    Serialize a document as compact JSON on one line.
+
+    Args:
+        document: Dicts, lists, tuples, strings, numbers and None.
+
+    Returns:
+        str: The JSON text.
+    """
+    if orjson is not None:
+        return orjson.dumps(document).decode('utf-8')
+    if msgspec is not None:
+        return msgspec.json.encode(document).decode('utf-8')
+    return json.dumps(document, separators=(',', ':'))
@@ -1,8 +1,32 @@
 from cmd_dispatcher import CmdDispatcher  
 from terminal_screen import TerminalScreen
+from batch_runner import BatchRunner, DEFAULT_WORKERS
+from output_format import FORMATS, TEXT
+import argparse
+import os
+import sys
 
 if __name__ == '__main__':
-    cmd_dispatcher = CmdDispatcher('commands/') 
+    parser = argparse.ArgumentParser(description="Diagnostics of the CGW and its chargers.")
+    parser.add_argument('--batch', nargs='?', const='', metavar='FILE',
+                        help="run the commands of a batch file ('-' for stdin) without the terminal UI, "
+                             "commands/commands.batch if no file is given")
+    parser.add_argument('--format', choices=FORMATS, default=TEXT, help="output format of the commands")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help="read-only commands of a batch run concurrently")
+    args = parser.parse_args()
+    batch_file = None
+    if args.batch is not None:
+        batch_file = args.batch or os.path.join('commands', CmdDispatcher.batchfilename)
+        if batch_file != '-' and not os.path.isfile(batch_file):
+            parser.error(f"cannot open batch file {batch_file}")
+
+    cmd_dispatcher = CmdDispatcher('commands/', batch_file) 
+    cmd_dispatcher.output_format = args.format
+
+    if args.batch is not None:
+        runner = BatchRunner(cmd_dispatcher, "commands", args.workers)
+        sys.exit(1 if runner.run(cmd_dispatcher.batch, sys.stdout) else 0)
 
     def command_handler(command, dispatcher, terminal: TerminalScreen): 
         return(dispatcher.dispatch(command, "commands", terminal))
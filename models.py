@@ -0,0 +1,9 @@
+"""
+The dataclass configuration shared by the CGW data models.
+"""
+from dataclasses import dataclass
+import functools
+
+# Slotted to keep the footprint of every charger, connector and EV object small,
+# frozen so that a decoded snapshot can be shared by all watches and kept in history
+model = functools.partial(dataclass, frozen=True, slots=True)
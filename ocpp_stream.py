@@ -0,0 +1,687 @@
+from scapy_websocket_schema import WebSocket
+from json_codec import loads
+from typing import BinaryIO, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+import heapq
+import itertools
+import multiprocessing
+import os
+import queue
+import struct
+import threading
+import traceback
+
+# Ports the central system listens on for OCPP-J over plain WebSocket
+DEFAULT_OCPP_PORTS = (80, 8080, 8180, 9000)
+
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+
+# pcap magic numbers mapped to (struct byte order, timestamp resolution)
+PCAP_MAGIC = {
+    b'\xd4\xc3\xb2\xa1': ('<', 1e-6),
+    b'\xa1\xb2\xc3\xd4': ('>', 1e-6),
+    b'\x4d\x3c\xb2\xa1': ('<', 1e-9),
+    b'\xa1\xb2\x3c\x4d': ('>', 1e-9),
+}
+
+TCP_FIN = 0x01
+TCP_SYN = 0x02
+TCP_RST = 0x04
+
+MAX_PENDING_SEGMENTS = 256  # Out-of-order segments buffered per direction before giving up
+MAX_PENDING_CALLS = 1024  # Unanswered CALLs remembered per connection
+MAX_HANDSHAKE_SIZE = 65536
+
+DECODE_BATCH_SIZE = 64  # Segments sent to a worker at once
+DECODE_FLUSH_INTERVAL = 0.05  # Seconds before a partial batch is sent anyway
+
+
+class PcapRecord(NamedTuple):
+    """
+    A captured packet: capture time and raw link-layer bytes.
+    """
+    timestamp: float
+    data: bytes
+
+
+class TcpSegment(NamedTuple):
+    """
+    The fields of a TCP segment needed for stream reassembly.
+    """
+    src: str
+    sport: int
+    dst: str
+    dport: int
+    seq: int
+    flags: int
+    payload: bytes
+
+
+class OcppMessage(NamedTuple):
+    """
+    An OCPP-J message: [message_type, unique_id, action, payload] plus where it was seen.
+    The action of CALLRESULT/CALLERROR messages is taken from the matching CALL.
+    """
+    timestamp: float
+    charger: str
+    src: str
+    dst: str
+    message_type: int
+    unique_id: str
+    action: Optional[str]
+    payload: object
+
+
+def ocpp_bpf_filter(ports: Iterable[int] = DEFAULT_OCPP_PORTS) -> str:
+    """
+    Build a tcpdump filter that only captures TCP traffic on the OCPP ports.
+
+    Args:
+        ports (Iterable[int]): The OCPP ports.
+
+    Returns:
+        str: The BPF filter expression.
+    """
+    return "tcp and (" + " or ".join(f"port {port}" for port in ports) + ")"
+
+
+def parse_pcap_header(header: bytes) -> Tuple[str, float, int]:
+    """
+    Parse the 24 byte pcap global header.
+
+    Args:
+        header (bytes): The global header.
+
+    Returns:
+        Tuple[str, float, int]: The struct byte order, the timestamp resolution and the link type.
+    """
+    if len(header) < 24 or header[:4] not in PCAP_MAGIC:
+        raise ValueError("Not a pcap stream (pcapng is not supported)")
+    byte_order, resolution = PCAP_MAGIC[header[:4]]
+    linktype = struct.unpack_from(byte_order + 'I', header, 20)[0] & 0x0fffffff
+    return byte_order, resolution, linktype
+
+
+def read_pcap_records(stream: BinaryIO) -> Tuple[int, Iterator[PcapRecord]]:
+    """
+    Read pcap records from a stream without dissecting them.
+
+    Args:
+        stream (BinaryIO): A pcap file or FIFO opened in binary mode.
+
+    Returns:
+        Tuple[int, Iterator[PcapRecord]]: The link type and an iterator over the records.
+    """
+    byte_order, resolution, linktype = parse_pcap_header(stream.read(24))
+    record_header = struct.Struct(byte_order + 'IIII')
+
+    def records() -> Iterator[PcapRecord]:
+        while True:
+            header = stream.read(record_header.size)
+            if len(header) < record_header.size:
+                return
+            seconds, fraction, caplen, _ = record_header.unpack(header)
+            data = stream.read(caplen)
+            if len(data) < caplen:
+                return
+            yield PcapRecord(seconds + fraction * resolution, data)
+
+    return linktype, records()
+
+
+def read_mapped_records(buffer) -> Iterator[Tuple[int, PcapRecord]]:
+    """
+    Walk the records of a memory-mapped pcap or pcapng capture without copying them.
+
+    Args:
+        buffer: The capture contents, e.g. an mmap.
+
+    Yields:
+        Tuple[int, PcapRecord]: The link type and the record, whose data is a memoryview.
+    """
+    view = memoryview(buffer)
+    if bytes(view[:4]) == b'\x0a\x0d\x0d\x0a':
+        yield from read_mapped_pcapng_records(view)
+        return
+
+    byte_order, resolution, linktype = parse_pcap_header(bytes(view[:24]))
+    record_header = struct.Struct(byte_order + 'IIII')
+    offset = 24
+    end = len(view)
+    while offset + record_header.size <= end:
+        seconds, fraction, caplen, _ = record_header.unpack_from(view, offset)
+        offset += record_header.size
+        if offset + caplen > end:
+            return  # Truncated capture
+        yield linktype, PcapRecord(seconds + fraction * resolution, view[offset:offset + caplen])
+        offset += caplen
+
+
+def read_mapped_pcapng_records(view: memoryview) -> Iterator[Tuple[int, PcapRecord]]:
+    """
+    Walk the packet blocks of a memory-mapped pcapng capture.
+
+    Args:
+        view (memoryview): The capture contents.
+
+    Yields:
+        Tuple[int, PcapRecord]: The link type of the capturing interface and the record.
+    """
+    byte_order = '<'
+    interfaces = []  # (link type, timestamp resolution) per interface ID
+    offset = 0
+    end = len(view)
+    while offset + 12 <= end:
+        block_type = struct.unpack_from(byte_order + 'I', view, offset)[0]
+        if block_type == 0x0a0d0d0a:  # Section header, sets the byte order of the section
+            byte_order = '<' if bytes(view[offset + 8:offset + 12]) == b'\x4d\x3c\x2b\x1a' else '>'
+            interfaces = []
+        block_length = struct.unpack_from(byte_order + 'I', view, offset + 4)[0]
+        if block_length < 12 or offset + block_length > end:
+            return  # Truncated or corrupt capture
+        if block_type == 1:  # Interface description
+            linktype = struct.unpack_from(byte_order + 'H', view, offset + 8)[0]
+            resolution = 1e-6
+            option = offset + 16
+            while option + 4 <= offset + block_length - 4:
+                code, length = struct.unpack_from(byte_order + 'HH', view, option)
+                if code == 0:
+                    break
+                if code == 9 and length >= 1:  # if_tsresol
+                    value = view[option + 4]
+                    resolution = 2.0 ** -(value & 0x7f) if value & 0x80 else 10.0 ** -value
+                option += 4 + (length + 3) // 4 * 4
+            interfaces.append((linktype, resolution))
+        elif block_type == 6:  # Enhanced packet
+            interface_id, high, low, caplen = struct.unpack_from(byte_order + 'IIII', view, offset + 8)
+            if interface_id < len(interfaces):
+                linktype, resolution = interfaces[interface_id]
+                data = view[offset + 28:offset + 28 + caplen]
+                yield linktype, PcapRecord(((high << 32) | low) * resolution, data)
+        elif block_type == 3 and interfaces:  # Simple packet, no timestamp
+            linktype, _ = interfaces[0]
+            length = min(struct.unpack_from(byte_order + 'I', view, offset + 8)[0], block_length - 16)
+            yield linktype, PcapRecord(0.0, view[offset + 12:offset + 12 + length])
+        offset += block_length
+
+
+def parse_tcp_segment(linktype: int, data: bytes) -> Optional[TcpSegment]:
+    """
+    Decode the Ethernet/SLL, IPv4/IPv6 and TCP headers of a packet by hand.
+
+    Args:
+        linktype (int): The pcap link type.
+        data (bytes): The raw packet.
+
+    Returns:
+        Optional[TcpSegment]: The TCP segment, or None for anything that is not TCP.
+    """
+    if linktype == LINKTYPE_ETHERNET:
+        if len(data) < 14:
+            return None
+        ethertype = struct.unpack_from('!H', data, 12)[0]
+        offset = 14
+        while ethertype in (0x8100, 0x88a8) and len(data) >= offset + 4:  # VLAN tags
+            ethertype = struct.unpack_from('!H', data, offset + 2)[0]
+            offset += 4
+    elif linktype == LINKTYPE_LINUX_SLL:
+        if len(data) < 16:
+            return None
+        ethertype = struct.unpack_from('!H', data, 14)[0]
+        offset = 16
+    elif linktype == LINKTYPE_RAW:
+        if not data:
+            return None
+        ethertype = 0x0800 if data[0] >> 4 == 4 else 0x86dd
+        offset = 0
+    else:
+        return None
+
+    if ethertype == 0x0800:
+        if len(data) < offset + 20 or data[offset + 9] != 6:
+            return None
+        ip_header_length = (data[offset] & 0x0f) * 4
+        total_length = struct.unpack_from('!H', data, offset + 2)[0]
+        src = '.'.join(map(str, data[offset + 12:offset + 16]))
+        dst = '.'.join(map(str, data[offset + 16:offset + 20]))
+        end = offset + total_length
+        offset += ip_header_length
+    elif ethertype == 0x86dd:
+        # Extension headers are not followed, OCPP traffic does not use them
+        if len(data) < offset + 40 or data[offset + 6] != 6:
+            return None
+        payload_length = struct.unpack_from('!H', data, offset + 4)[0]
+        src = data[offset + 8:offset + 24].hex()
+        dst = data[offset + 24:offset + 40].hex()
+        end = offset + 40 + payload_length
+        offset += 40
+    else:
+        return None
+
+    if len(data) < offset + 20:
+        return None
+    sport, dport, seq = struct.unpack_from('!HHI', data, offset)
+    tcp_header_length = (data[offset + 12] >> 4) * 4
+    flags = data[offset + 13]
+    return TcpSegment(src, sport, dst, dport, seq, flags, data[offset + tcp_header_length:end])
+
+
+class TcpStream:
+    """
+    Reassembles one direction of a TCP connection and splits it into WebSocket frames.
+    """
+
+    def __init__(self) -> None:
+        self.next_seq: Optional[int] = None
+        self.pending: Dict[int, bytes] = {}
+        self.buffer = bytearray()
+        self.handshake_done = False
+        self.fragments = []
+
+    def add(self, seq: int, flags: int, payload: bytes) -> None:
+        """
+        Add a segment, in order or not. Retransmitted data is dropped.
+
+        Args:
+            seq (int): The sequence number of the segment.
+            flags (int): The TCP flags.
+            payload (bytes): The segment payload.
+        """
+        if flags & TCP_SYN:
+            self.next_seq = (seq + 1) & 0xffffffff
+            return
+        if not payload:
+            return
+        if self.next_seq is None:
+            self.next_seq = seq  # Capture started in the middle of the connection
+
+        ahead = (seq - self.next_seq) & 0xffffffff
+        if ahead == 0:
+            self.append(payload)
+        elif ahead < 0x80000000:
+            self.pending[seq] = bytes(payload)  # Payloads may be views into a mapped capture
+            if len(self.pending) > MAX_PENDING_SEGMENTS:
+                # The gap will not be filled, skip it and resynchronise on the next frame
+                self.pending.clear()
+                self.buffer.clear()
+                self.next_seq = None
+        else:
+            overlap = (self.next_seq - seq) & 0xffffffff
+            if overlap < len(payload):
+                self.append(payload[overlap:])
+
+    def append(self, payload: bytes) -> None:
+        self.buffer += payload
+        self.next_seq = (self.next_seq + len(payload)) & 0xffffffff
+        while self.pending:
+            # Buffered segments that start at or before the new end, possibly overlapping it
+            ready = [seq for seq in self.pending if (self.next_seq - seq) & 0xffffffff < 0x80000000]
+            if not ready:
+                return
+            for seq in ready:
+                payload = self.pending.pop(seq)
+                overlap = (self.next_seq - seq) & 0xffffffff
+                if overlap < len(payload):
+                    self.buffer += payload[overlap:]
+                    self.next_seq = (self.next_seq + len(payload) - overlap) & 0xffffffff
+
+    def frames(self) -> Iterator[WebSocket]:
+        """
+        Take the complete WebSocket frames off the buffer.
+
+        Yields:
+            WebSocket: The dissected (and unmasked) frames.
+        """
+        buffer = self.buffer
+        if not self.handshake_done:
+            if buffer[:4] == b'GET ' or buffer[:5] == b'HTTP/':
+                end = buffer.find(b'\r\n\r\n')
+                if end < 0:
+                    if len(buffer) > MAX_HANDSHAKE_SIZE:
+                        buffer.clear()
+                    return
+                del buffer[:end + 4]
+            self.handshake_done = True
+
+        while len(buffer) >= 2:
+            length = buffer[1] & 0x7f
+            offset = 2
+            if length == 126:
+                if len(buffer) < 4:
+                    return
+                length = struct.unpack_from('!H', buffer, 2)[0]
+                offset = 4
+            elif length == 127:
+                if len(buffer) < 10:
+                    return
+                length = struct.unpack_from('!Q', buffer, 2)[0]
+                offset = 10
+            if buffer[1] & 0x80:
+                offset += 4
+            if len(buffer) < offset + length:
+                return
+            frame = bytes(buffer[:offset + length])
+            del buffer[:offset + length]
+            yield WebSocket(frame)
+
+    def messages(self) -> Iterator[bytes]:
+        """
+        Reassemble fragmented data frames into complete messages.
+
+        Yields:
+            bytes: The payload of each complete text or binary message.
+        """
+        for frame in self.frames():
+            if frame.opcode >= 8:
+                continue  # Control frames (close, ping, pong)
+            data = frame.frame_data or b''
+            if isinstance(data, str):
+                data = data.encode('utf-8')
+            if frame.opcode != 0:
+                self.fragments = []
+            self.fragments.append(data)
+            if int(frame.flags) & 0x8:  # FIN
+                message = b''.join(self.fragments)
+                self.fragments = []
+                yield message
+
+
+def parse_ocpp_message(data: bytes) -> Optional[Tuple[int, str, Optional[str], object]]:
+    """
+    Parse an OCPP-J message.
+
+    Args:
+        data (bytes): The WebSocket message payload.
+
+    Returns:
+        Optional[Tuple[int, str, Optional[str], object]]: (message_type, unique_id, action, payload),
+            or None if the data is not an OCPP-J message.
+    """
+    try:
+        message = loads(data)
+    except ValueError:
+        return None
+    if not isinstance(message, list) or len(message) < 3:
+        return None
+    message_type = message[0]
+    if message_type == 2 and len(message) >= 4:
+        return 2, message[1], message[2], message[3]
+    if message_type == 3:
+        return 3, message[1], None, message[2]
+    if message_type == 4:
+        error = {
+            'errorCode': message[2],
+            'errorDescription': message[3] if len(message) > 3 else '',
+            'errorDetails': message[4] if len(message) > 4 else {},
+        }
+        return 4, message[1], None, error
+    return None
+
+
+class OcppStreamDecoder:
+    """
+    Turns captured packets into OCPP-J messages, one TCP stream per charger connection.
+
+    Packets are filtered on their raw headers first, so only segments on the
+    OCPP ports reach TCP reassembly and the scapy WebSocket layer.
+    """
+
+    def __init__(self, ports: Iterable[int] = DEFAULT_OCPP_PORTS) -> None:
+        """
+        Initialize OcppStreamDecoder object.
+
+        Args:
+            ports (Iterable[int]): The ports the central system listens on.
+        """
+        self.ports = frozenset(ports)
+        self.streams: Dict[tuple, TcpStream] = {}
+        self.pending_calls: Dict[tuple, Dict[str, str]] = {}
+
+    def feed(self, linktype: int, record: PcapRecord) -> Iterator[OcppMessage]:
+        """
+        Process one captured packet.
+
+        Args:
+            linktype (int): The pcap link type.
+            record (PcapRecord): The captured packet.
+
+        Yields:
+            OcppMessage: The messages completed by this packet.
+        """
+        segment = parse_tcp_segment(linktype, record.data)
+        if segment is None or (segment.sport not in self.ports and segment.dport not in self.ports):
+            return
+        yield from self.feed_segment(record.timestamp, segment)
+
+    def feed_segment(self, timestamp: float, segment: TcpSegment) -> Iterator[OcppMessage]:
+        """
+        Process one TCP segment that already passed the port filter.
+
+        Args:
+            timestamp (float): The capture time of the segment.
+            segment (TcpSegment): The TCP segment.
+
+        Yields:
+            OcppMessage: The messages completed by this segment.
+        """
+        src = f"{segment.src}:{segment.sport}"
+        dst = f"{segment.dst}:{segment.dport}"
+        flow = (src, dst)
+        connection = (src, dst) if src < dst else (dst, src)
+        charger = segment.dst if segment.sport in self.ports else segment.src
+
+        stream = self.streams.get(flow)
+        if stream is None:
+            stream = self.streams[flow] = TcpStream()
+        stream.add(segment.seq, segment.flags, segment.payload)
+
+        calls = self.pending_calls.setdefault(connection, {})
+        for data in stream.messages():
+            message = parse_ocpp_message(data)
+            if message is None:
+                continue
+            message_type, unique_id, action, payload = message
+            if message_type == 2:
+                if len(calls) >= MAX_PENDING_CALLS:
+                    calls.pop(next(iter(calls)))
+                calls[unique_id] = action
+            else:
+                action = calls.pop(unique_id, None)
+            yield OcppMessage(timestamp, charger, src, dst, message_type, unique_id, action, payload)
+
+        if segment.flags & (TCP_FIN | TCP_RST):
+            self.streams.pop(flow, None)
+            if segment.flags & TCP_RST or (dst, src) not in self.streams:
+                self.pending_calls.pop(connection, None)
+
+    def decode(self, linktype: int, records: Iterable[PcapRecord]) -> Iterator[OcppMessage]:
+        """
+        Process a sequence of captured packets.
+
+        Args:
+            linktype (int): The pcap link type.
+            records (Iterable[PcapRecord]): The captured packets.
+
+        Yields:
+            OcppMessage: The decoded messages in capture order.
+        """
+        for record in records:
+            yield from self.feed(linktype, record)
+
+
+def decode_ocpp_stream(stream: BinaryIO, ports: Iterable[int] = DEFAULT_OCPP_PORTS) -> Iterator[OcppMessage]:
+    """
+    Decode the OCPP-J messages of a pcap stream as the packets arrive.
+
+    Args:
+        stream (BinaryIO): A pcap file or FIFO opened in binary mode.
+        ports (Iterable[int]): The ports the central system listens on.
+
+    Yields:
+        OcppMessage: The decoded messages.
+    """
+    linktype, records = read_pcap_records(stream)
+    yield from OcppStreamDecoder(ports).decode(linktype, records)
+
+
+# Worker process: decodes the segments of the connections sharded to it.
+# Batches come with the capture time read so far, the watermark, and are answered with
+# (index, message tuples, watermark) even when empty, a traceback string if decoding failed,
+# then (index, None, inf) when done.
+def decode_worker(index: int, segments, results, ports) -> None:
+    try:
+        decoder = OcppStreamDecoder(ports)
+        while True:
+            item = segments.get()
+            if item is None:
+                break
+            watermark, batch = item
+            messages = []
+            for timestamp, segment in batch:
+                messages.extend(tuple(message) for message in decoder.feed_segment(timestamp, segment))
+            results.put((index, messages, watermark))
+    except Exception:
+        results.put((index, traceback.format_exc(), float('inf')))
+    finally:
+        results.put((index, None, float('inf')))  # The parent counts these, it must always be sent
+
+
+def merge_by_timestamp(results: Iterable[Tuple[int, Optional[List[tuple]], float]],
+                       workers: int) -> Iterator[OcppMessage]:
+    """
+    Merge the messages decoded by the workers into capture order.
+
+    A worker that answered a batch with a watermark has decoded every segment
+    captured up to it, so its later messages are not older. A message is
+    released once every worker is past its timestamp.
+
+    Args:
+        results (Iterable[Tuple[int, Optional[List[tuple]], float]]): (worker index,
+            message tuples, watermark) as the workers answer, None messages when a worker is done.
+        workers (int): The number of workers.
+
+    Yields:
+        OcppMessage: The messages by capture time, in arrival order for equal times.
+    """
+    watermarks = [float('-inf')] * workers
+    pending = []
+    order = itertools.count()
+    for index, messages, watermark in results:
+        for message in messages or ():
+            heapq.heappush(pending, (message[0], next(order), message))
+        watermarks[index] = max(watermarks[index], watermark)
+        low = min(watermarks)
+        while pending and pending[0][0] <= low:
+            yield OcppMessage(*heapq.heappop(pending)[2])
+    while pending:
+        yield OcppMessage(*heapq.heappop(pending)[2])
+
+
+def decode_parallel(records: Iterable[Tuple[int, PcapRecord]], workers: Optional[int] = None,
+                    ports: Iterable[int] = DEFAULT_OCPP_PORTS) -> Iterator[OcppMessage]:
+    """
+    Decode the OCPP-J messages of captured packets with a pool of decoder processes.
+
+    Segments are sharded by connection, so each TCP stream is decoded in order by
+    one worker, and the messages of the workers are merged back into capture order.
+    The records are read in a thread of their own, they may block (a live FIFO).
+
+    Args:
+        records (Iterable[Tuple[int, PcapRecord]]): The link type and the record of each packet.
+        workers (Optional[int]): The number of decoder processes, one per core but one by default.
+        ports (Iterable[int]): The ports the central system listens on.
+
+    Yields:
+        OcppMessage: The decoded messages in capture order.
+
+    Raises:
+        RuntimeError: If a decoder process fails. Errors reading the records are raised as such.
+    """
+    workers = workers or max(1, os.cpu_count() - 1)
+    ports = frozenset(ports)
+    results = multiprocessing.Queue()
+    inboxes = [multiprocessing.Queue() for _ in range(workers)]
+    processes = [multiprocessing.Process(target=decode_worker, args=(index, inbox, results, ports), daemon=True)
+                 for index, inbox in enumerate(inboxes)]
+    for process in processes:
+        process.start()
+
+    # The records are read in their own thread, so partial batches can be flushed while it blocks
+    segments = queue.Queue(maxsize=10000)
+    errors = []  # Exceptions of the reader and dispatcher threads, raised in the caller
+
+    def read_segments():
+        try:
+            for linktype, record in records:
+                segment = parse_tcp_segment(linktype, record.data)
+                if segment is not None and (segment.sport in ports or segment.dport in ports):
+                    if not isinstance(segment.payload, bytes):
+                        segment = segment._replace(payload=bytes(segment.payload))  # Views are not picklable
+                    segments.put((record.timestamp, segment))
+                else:
+                    segments.put((record.timestamp, None))  # Still moves the watermark on
+        except Exception as e:
+            errors.append(e)
+        finally:
+            segments.put(None)
+
+    def dispatch_segments():
+        batches = [[] for _ in range(workers)]
+        latest = float('-inf')
+        sent = [latest] * workers
+        try:
+            while True:
+                try:
+                    item = segments.get(timeout=DECODE_FLUSH_INTERVAL)
+                except queue.Empty:
+                    item = False
+                if item:
+                    timestamp, segment = item
+                    latest = max(latest, timestamp)
+                    if segment is None:
+                        continue
+                    connection = tuple(sorted([(segment.src, segment.sport), (segment.dst, segment.dport)]))
+                    batch = batches[hash(connection) % workers]
+                    batch.append((timestamp, segment))
+                    if len(batch) < DECODE_BATCH_SIZE:
+                        continue
+                for i, (inbox, batch) in enumerate(zip(inboxes, batches)):
+                    if batch or sent[i] < latest:
+                        inbox.put((latest, batch))
+                        sent[i] = latest
+                batches = [[] for _ in range(workers)]
+                if item is None:
+                    return
+        except Exception as e:
+            errors.append(e)
+        finally:
+            for inbox in inboxes:
+                inbox.put(None)  # The workers finish, so the caller is not left waiting
+
+    def worker_results():
+        finished = 0
+        while finished < workers:
+            try:
+                index, messages, watermark = results.get(timeout=1.0)
+            except queue.Empty:
+                if any(process.exitcode not in (None, 0) for process in processes):
+                    raise RuntimeError("An OCPP decoder process died")
+                continue
+            if isinstance(messages, str):
+                raise RuntimeError(f"OCPP decoder process failed:\n{messages}")
+            if messages is None:
+                finished += 1
+            yield index, messages, watermark
+
+    threading.Thread(target=read_segments, daemon=True).start()
+    threading.Thread(target=dispatch_segments, daemon=True).start()
+
+    try:
+        yield from merge_by_timestamp(worker_results(), workers)
+        if errors:
+            raise errors[0]
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
@@ -0,0 +1,149 @@
+"""
+Structured output of the commands, for scripts: JSON, NDJSON or CSV records
+written straight from the model objects instead of rendered tables.
+
+A command supports it by providing records(), an iterator of flat dicts with a
+'record' field naming the kind of record ('charger', 'connection', 'ev', ...).
+Records are written as they are produced, the full output is never built as a
+table first.
+"""
+from io import StringIO
+from json_codec import dumps
+from typing import Iterable, List, Optional, TextIO, Tuple
+import csv
+
+TEXT = 'text'  # The tables, as shown in the terminal
+JSON = 'json'  # One array of records
+NDJSON = 'ndjson'  # One record per line
+CSV = 'csv'  # A header line before each run of records of the same kind
+FORMATS = (TEXT, JSON, NDJSON, CSV)
+
+OPTION = '--format'
+
+
+def parse_option(cmds: List[str], default: str = TEXT) -> Tuple[List[str], str]:
+    """
+    Take the --format option out of the words of a command line.
+
+    Args:
+        cmds (List[str]): The words of the command line, '--format json' or '--format=json' anywhere.
+        default (str): The format if the option is not given.
+
+    Returns:
+        Tuple[List[str], str]: The words without the option and the format.
+
+    Raises:
+        ValueError: If the format is missing or unknown.
+    """
+    words = []
+    output_format = default
+    i = 0
+    while i < len(cmds):
+        word = cmds[i]
+        if word == OPTION:
+            if i + 1 >= len(cmds):
+                raise ValueError(f"{OPTION} needs one of {', '.join(FORMATS)}")
+            output_format = cmds[i + 1]
+            i += 2
+            continue
+        if word.startswith(OPTION + '='):
+            output_format = word[len(OPTION) + 1:]
+        else:
+            words.append(word)
+        i += 1
+    if output_format not in FORMATS:
+        raise ValueError(f"Unknown format {output_format}, use one of {', '.join(FORMATS)}")
+    return words, output_format
+
+
+class RecordWriter:
+    """
+    Writes records as they are produced, over one or several calls of write.
+
+    The records of all the calls form one output: a single JSON array, NDJSON
+    lines, or CSV tables whose header is only repeated when the kind of record
+    changes. close() ends the output.
+    """
+
+    def __init__(self, output_format: str, file: TextIO) -> None:
+        """
+        Initialize RecordWriter object.
+
+        Args:
+            output_format (str): JSON, NDJSON or CSV.
+            file (TextIO): Where to write.
+
+        Raises:
+            ValueError: If the format is not one of records.
+        """
+        if output_format not in (JSON, NDJSON, CSV):
+            raise ValueError(f"Records cannot be written as {output_format}")
+        self.output_format = output_format
+        self.file = file
+        self.count = 0
+        self.fields: Optional[tuple] = None
+        self.writer = csv.writer(file, lineterminator='\n') if output_format == CSV else None
+
+    def write(self, records: Iterable[dict]) -> int:
+        """
+        Write records, each as soon as it is produced.
+
+        Args:
+            records (Iterable[dict]): The records.
+
+        Returns:
+            int: The number of records written.
+        """
+        start = self.count
+        file = self.file
+        for record in records:
+            if self.output_format == CSV:
+                keys = tuple(record)
+                if keys != self.fields:
+                    if self.fields is not None:
+                        file.write('\n')  # A blank line between the tables of different kinds
+                    self.writer.writerow(keys)
+                    self.fields = keys
+                self.writer.writerow(record.values())
+            elif self.output_format == NDJSON:
+                file.write(dumps(record) + '\n')
+            else:
+                file.write((',\n' if self.count else '[\n') + dumps(record))
+            self.count += 1
+        file.flush()
+        return self.count - start
+
+    def close(self) -> None:
+        """
+        End the output: close the JSON array.
+        """
+        if self.output_format == JSON:
+            self.file.write('\n]\n' if self.count else '[]\n')
+        self.file.flush()
+
+
+def write_records(records: Iterable[dict], output_format: str, file: TextIO) -> int:
+    """
+    Write records as they are produced.
+
+    Args:
+        records (Iterable[dict]): The records.
+        output_format (str): JSON, NDJSON or CSV.
+        file (TextIO): Where to write.
+
+    Returns:
+        int: The number of records written.
+    """
+    writer = RecordWriter(output_format, file)
+    count = writer.write(records)
+    writer.close()
+    return count
+
+
+def format_records(records: Iterable[dict], output_format: str) -> str:
+    """
+    Write records into a string, for the command output shown in the terminal.
+    """
+    output = StringIO()
+    write_records(records, output_format, output)
+    return output.getvalue()
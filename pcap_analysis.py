@@ -0,0 +1,262 @@
+from ocpp_stream import (DEFAULT_OCPP_PORTS, OcppMessage, OcppStreamDecoder, PcapRecord, decode_parallel,
+                         read_mapped_records)
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+from io import StringIO
+from tabulate import tabulate
+from typing import Dict, Iterable, Iterator, Tuple
+from timestamps import SECONDS, format_epoch
+import mmap
+
+MAX_OPEN_CALLS = 100000  # Unanswered CALLs kept for latency measurement
+
+
+class ChargerIndex:
+    """
+    The OCPP messages of one charger, indexed by action and time.
+    """
+
+    def __init__(self) -> None:
+        self.call_times: Dict[str, array] = defaultdict(lambda: array('d'))
+        self.latencies: Dict[str, array] = defaultdict(lambda: array('d'))
+        self.errors: Counter = Counter()  # Keyed by (action, error code)
+        self.results = 0
+        self.first_seen = None
+        self.last_seen = None
+
+
+class PcapAnalysis:
+    """
+    Statistics of the OCPP traffic in a capture file: message rates,
+    CALL to CALLRESULT/CALLERROR latency and errors per charger and action.
+    """
+
+    def __init__(self, filename: str) -> None:
+        """
+        Initialize PcapAnalysis object.
+
+        Args:
+            filename (str): The path to the capture file.
+        """
+        self.filename = filename
+        self.packets = 0
+        self.messages = 0
+        self.chargers: Dict[str, ChargerIndex] = defaultdict(ChargerIndex)
+        self.open_calls: Dict[Tuple[str, str], float] = {}
+
+    @classmethod
+    def from_file(cls, filename: str, ports: Iterable[int] = DEFAULT_OCPP_PORTS, workers: int = 1) -> 'PcapAnalysis':
+        """
+        Analyse a pcap or pcapng file. The file is memory-mapped and walked
+        record by record, so it is never loaded into memory as a whole.
+
+        Args:
+            filename (str): The path to the capture file.
+            ports (Iterable[int]): The ports the central system listens on.
+            workers (int): The number of decoder processes, the capture is decoded in this process if 1.
+
+        Returns:
+            PcapAnalysis: The analysis of the capture.
+        """
+        analysis = cls(filename)
+        with open(filename, 'rb') as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            analysis.add_capture(mapped, ports, workers)
+        finally:
+            try:
+                mapped.close()
+            except BufferError:
+                # A record still referenced by the traceback of an error being raised,
+                # it is unmapped once the last view is released
+                pass
+        return analysis
+
+    def add_capture(self, buffer, ports: Iterable[int] = DEFAULT_OCPP_PORTS, workers: int = 1) -> None:
+        """
+        Decode the OCPP messages of a capture and add them to the index.
+
+        Args:
+            buffer: The capture contents, e.g. an mmap.
+            ports (Iterable[int]): The ports the central system listens on.
+            workers (int): The number of decoder processes, the capture is decoded in this process if 1.
+        """
+        records = self.count_packets(read_mapped_records(buffer))
+        if workers > 1:
+            messages = decode_parallel(records, workers, ports)  # Merged back into capture order
+        else:
+            decoder = OcppStreamDecoder(ports)
+            messages = (message for linktype, record in records for message in decoder.feed(linktype, record))
+        for message in messages:
+            self.add(message)
+
+    def count_packets(self, records: Iterable[Tuple[int, PcapRecord]]) -> Iterator[Tuple[int, PcapRecord]]:
+        for item in records:
+            self.packets += 1
+            yield item
+
+    def add(self, message: OcppMessage) -> None:
+        """
+        Add a decoded message to the index.
+
+        Args:
+            message (OcppMessage): The decoded message.
+        """
+        self.messages += 1
+        charger = self.chargers[message.charger]
+        if charger.first_seen is None:
+            charger.first_seen = message.timestamp
+        charger.last_seen = message.timestamp
+
+        key = (message.charger, message.unique_id)
+        if message.message_type == 2:
+            charger.call_times[message.action].append(message.timestamp)
+            if len(self.open_calls) >= MAX_OPEN_CALLS:
+                self.open_calls.pop(next(iter(self.open_calls)))
+            self.open_calls[key] = message.timestamp
+            return
+
+        action = message.action or "UNKNOWN"
+        call_time = self.open_calls.pop(key, None)
+        if call_time is not None:
+            charger.latencies[action].append(message.timestamp - call_time)
+        if message.message_type == 3:
+            charger.results += 1
+        else:
+            charger.errors[(action, message.payload.get('errorCode'))] += 1
+
+    def count_calls(self, charger_id: str, action: str, start: float, end: float) -> int:
+        """
+        Count the CALLs of an action sent by or to a charger in a time range.
+
+        Args:
+            charger_id (str): The charger address.
+            action (str): The OCPP action.
+            start (float): Start of the range (epoch seconds, inclusive).
+            end (float): End of the range (epoch seconds, inclusive).
+
+        Returns:
+            int: The number of CALLs.
+        """
+        charger = self.chargers.get(charger_id)
+        if charger is None or action not in charger.call_times:
+            return 0
+        times = charger.call_times[action]
+        return bisect_right(times, end) - bisect_left(times, start)
+
+    def display(self) -> str:
+        """
+        Display the capture statistics per charger, per action and the OCPP errors.
+
+        Returns:
+            str: The formatted text displaying the statistics.
+        """
+        output = StringIO()
+
+        print("Capture Analysis:", file=output)
+        print(f"File: {self.filename}", file=output)
+        print(f"Packets: {self.packets}", file=output)
+        print(f"OCPP messages: {self.messages}", file=output)
+
+        data = []
+        for charger_id, charger in sorted(self.chargers.items()):
+            calls = sum(len(times) for times in charger.call_times.values())
+            errors = sum(charger.errors.values())
+            data.append([charger_id, calls, charger.results, errors,
+                         self.rate(calls, charger.first_seen, charger.last_seen),
+                         self.format_time(charger.first_seen), self.format_time(charger.last_seen)])
+        print("\nChargers:", file=output)
+        headers = ["Charger", "Calls", "Results", "Errors", "Calls/min", "First", "Last"]
+        print(tabulate(data, headers=headers, tablefmt="psql"), file=output)
+
+        data = []
+        for action, calls, rate, latencies, errors in self.actions():
+            row = [action, calls, rate]
+            if latencies:
+                row += [round(1000 * latency, 1) for latency in latencies]
+            else:
+                row += [None, None, None]
+            data.append(row + [errors])
+        print("\nActions:", file=output)
+        headers = ["Action", "Calls", "Calls/min", "Lat. avg ms", "Lat. p95 ms", "Lat. max ms", "Errors"]
+        print(tabulate(data, headers=headers, tablefmt="psql"), file=output)
+
+        data = [[charger_id, action, error_code, count]
+                for charger_id, charger in sorted(self.chargers.items())
+                for (action, error_code), count in sorted(charger.errors.items(), key=str)]
+        if data:
+            print("\nErrors:", file=output)
+            headers = ["Charger", "Action", "Error code", "Count"]
+            print(tabulate(data, headers=headers, tablefmt="psql"), file=output)
+
+        return output.getvalue()
+
+    def actions(self) -> Iterator[Tuple[str, int, float, Tuple[float, float, float], int]]:
+        """
+        The statistics of each action over all chargers.
+
+        Yields:
+            Tuple[str, int, float, Tuple[float, float, float], int]: The action, its CALLs, CALLs per
+                minute, the average, 95th percentile and maximum latency in seconds (None without
+                answers) and its errors.
+        """
+        call_times = defaultdict(list)
+        latencies = defaultdict(list)
+        errors = Counter()
+        for charger in self.chargers.values():
+            for action, times in charger.call_times.items():
+                call_times[action].extend(times)
+            for action, values in charger.latencies.items():
+                latencies[action].extend(values)
+            for (action, _), count in charger.errors.items():
+                errors[action] += count
+
+        for action in sorted(call_times.keys() | latencies.keys()):
+            times = call_times.get(action, [])
+            values = sorted(latencies.get(action, []))
+            rate = self.rate(len(times), min(times, default=None), max(times, default=None))
+            latency = None
+            if values:
+                latency = (sum(values) / len(values), values[int(0.95 * (len(values) - 1))], values[-1])
+            yield action, len(times), rate, latency, errors[action]
+
+    def records(self) -> Iterator[dict]:
+        """
+        Get the capture statistics as records for the structured output, in the order of display.
+
+        Yields:
+            dict: A 'capture' record, then the 'charger', 'action' and 'error' records.
+                Times are epoch seconds, latencies seconds.
+        """
+        yield {'record': 'capture', 'file': self.filename, 'packets': self.packets, 'messages': self.messages}
+        for charger_id, charger in sorted(self.chargers.items()):
+            calls = sum(len(times) for times in charger.call_times.values())
+            yield {'record': 'charger', 'charger': charger_id, 'calls': calls, 'results': charger.results,
+                   'errors': sum(charger.errors.values()),
+                   'calls_per_minute': self.rate(calls, charger.first_seen, charger.last_seen),
+                   'first_seen': charger.first_seen, 'last_seen': charger.last_seen}
+        for action, calls, rate, latency, errors in self.actions():
+            average, p95, maximum = latency or (None, None, None)
+            yield {'record': 'action', 'action': action, 'calls': calls, 'calls_per_minute': rate,
+                   'latency_avg': average, 'latency_p95': p95, 'latency_max': maximum, 'errors': errors}
+        for charger_id, charger in sorted(self.chargers.items()):
+            for (action, error_code), count in sorted(charger.errors.items(), key=str):
+                yield {'record': 'error', 'charger': charger_id, 'action': action, 'error_code': error_code,
+                       'count': count}
+
+    @staticmethod
+    def rate(count: int, first: float, last: float) -> float:
+        """
+        Messages per minute between two timestamps.
+        """
+        if not count or first is None or last is None or last <= first:
+            return None
+        return round(60 * count / (last - first), 2)
+
+    @staticmethod
+    def format_time(timestamp: float) -> str:
+        """
+        Format an epoch timestamp for the tables.
+        """
+        return format_epoch(timestamp, SECONDS)
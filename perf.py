@@ -0,0 +1,281 @@
+from array import array
+from io import StringIO
+from tabulate import tabulate
+from typing import Callable, Dict, Iterator, Optional
+import cProfile
+import functools
+import pstats
+import threading
+import time
+import tracemalloc
+
+SAMPLES = 1024  # Recent durations kept per stage for the percentiles
+
+
+class Timings:
+    """
+    The durations of one stage: totals since the start and the most recent
+    SAMPLES durations in a ring buffer, from which the percentiles are taken.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = array('d')
+        self.lock = threading.Lock()
+
+    def add(self, duration: float) -> None:
+        with self.lock:
+            if len(self.samples) < SAMPLES:
+                self.samples.append(duration)
+            else:
+                self.samples[self.count % SAMPLES] = duration
+            self.count += 1
+            self.total += duration
+            if duration > self.max:
+                self.max = duration
+
+    def percentile(self, fraction: float) -> float:
+        with self.lock:
+            samples = sorted(self.samples)
+        if not samples:
+            return 0.0
+        return samples[min(int(fraction * len(samples)), len(samples) - 1)]
+
+
+class Timer:
+    """
+    Context manager adding the time spent in its block to a stage.
+    """
+
+    __slots__ = ('timings', 'start')
+
+    def __init__(self, timings: Timings) -> None:
+        self.timings = timings
+
+    def __enter__(self) -> 'Timer':
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.timings.add(time.perf_counter() - self.start)
+
+
+class NullTimer:
+    """
+    Does nothing, returned by Perf.timer while instrumentation is disabled.
+    """
+
+    __slots__ = ()
+
+    def __enter__(self) -> 'NullTimer':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+class Perf:
+    """
+    Lightweight instrumentation of the hot paths: timers and counters per stage,
+    plus optional cProfile and tracemalloc captures.
+
+    While disabled, timer() returns a shared no-op context manager and the
+    timed decorator calls straight through, so the cost is one attribute check.
+    """
+
+    _shared: 'Perf' = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, enabled: bool = True) -> None:
+        """
+        Initialize Perf object.
+
+        Args:
+            enabled (bool): Whether timers and counters record anything.
+        """
+        self.enabled = enabled
+        self.timings: Dict[str, Timings] = {}
+        self.counters: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        self.profiling = False
+        self.profile_stats: Optional[pstats.Stats] = None
+        self.profile_lock = threading.Lock()  # One profiled call at a time
+
+    @classmethod
+    def get_shared(cls) -> 'Perf':
+        """
+        Get the process-wide instrumentation, creating it on first use.
+
+        Returns:
+            Perf: The shared instrumentation.
+        """
+        if cls._shared is None:  # Checked without the lock first, this is called on every timed call
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls()
+        return cls._shared
+
+    def timer(self, name: str):
+        """
+        Time a block: with perf.timer('redis.get'): ...
+
+        Args:
+            name (str): The stage.
+
+        Returns:
+            The context manager.
+        """
+        if not self.enabled:
+            return NULL_TIMER
+        timings = self.timings.get(name)
+        if timings is None:
+            with self.lock:
+                timings = self.timings.setdefault(name, Timings())
+        return Timer(timings)
+
+    def count(self, name: str, n: int = 1) -> None:
+        if self.enabled:
+            with self.lock:
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def reset(self) -> None:
+        with self.lock:
+            self.timings = {}
+            self.counters = {}
+
+    def call(self, func: Callable, *args, **kwargs):
+        """
+        Call a function, under cProfile while profiling is on.
+
+        Only one profiler may be active at a time (since Python 3.12 a second one
+        raises), so a call made while another one is being profiled, on another
+        thread, runs unprofiled and is counted as 'profile.skipped'.
+        """
+        if not self.profiling:
+            return func(*args, **kwargs)
+        if not self.profile_lock.acquire(blocking=False):
+            self.count('profile.skipped')
+            return func(*args, **kwargs)
+        try:
+            profiler = cProfile.Profile()
+            try:
+                return profiler.runcall(func, *args, **kwargs)
+            finally:
+                with self.lock:
+                    if self.profile_stats is None:
+                        self.profile_stats = pstats.Stats(profiler)
+                    else:
+                        self.profile_stats.add(profiler)
+        finally:
+            self.profile_lock.release()
+
+    def start_profile(self) -> None:
+        with self.lock:
+            self.profile_stats = None
+        self.profiling = True
+
+    def stop_profile(self, limit: int = 20) -> str:
+        """
+        Stop profiling and report the functions with the most cumulative time.
+        """
+        self.profiling = False
+        with self.lock:
+            stats, self.profile_stats = self.profile_stats, None
+        if stats is None:
+            return "No calls were profiled"
+        output = StringIO()
+        stats.stream = output
+        stats.sort_stats('cumulative').print_stats(limit)
+        return output.getvalue()
+
+    @staticmethod
+    def start_tracemalloc() -> None:
+        tracemalloc.start()
+
+    @staticmethod
+    def tracemalloc_report(stop: bool = False, limit: int = 10) -> str:
+        """
+        Report the source lines holding the most memory allocated since tracemalloc was started.
+        """
+        if not tracemalloc.is_tracing():
+            return "tracemalloc is not running"
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if stop:
+            tracemalloc.stop()
+        data = [[str(stat.traceback), round(stat.size / 1024, 1), stat.count]
+                for stat in snapshot.statistics('lineno')[:limit]]
+        output = StringIO()
+        print(f"Traced memory: {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB", file=output)
+        print(tabulate(data, headers=["Line", "KiB", "Blocks"], tablefmt="psql"), file=output)
+        return output.getvalue()
+
+    def display(self) -> str:
+        """
+        Display the timings and counters.
+
+        Returns:
+            str: The formatted text displaying p50/p95/max per stage.
+        """
+        output = StringIO()
+        with self.lock:
+            timings = list(self.timings.items())
+            counters = sorted(self.counters.items())
+
+        print(f"Instrumentation: {'on' if self.enabled else 'off'}"
+              f"{', profiling' if self.profiling else ''}"
+              f"{', tracing allocations' if tracemalloc.is_tracing() else ''}", file=output)
+
+        data = [[name, stage.count, round(1000 * stage.percentile(0.5), 3), round(1000 * stage.percentile(0.95), 3),
+                 round(1000 * stage.max, 3), round(stage.total, 3)]
+                for name, stage in sorted(timings, key=lambda item: item[1].total, reverse=True)]
+        print("\nStages:", file=output)
+        headers = ["Stage", "Count", "p50 ms", "p95 ms", "Max ms", "Total s"]
+        print(tabulate(data, headers=headers, tablefmt="psql"), file=output)
+
+        if counters:
+            print("\nCounters:", file=output)
+            print(tabulate(counters, headers=["Counter", "Count"], tablefmt="psql"), file=output)
+
+        return output.getvalue()
+
+    def records(self) -> Iterator[dict]:
+        """
+        Get the timings and counters as records for the structured output.
+
+        Yields:
+            dict: One 'stage' record per stage, then one 'counter' record per counter.
+        """
+        with self.lock:
+            timings = sorted(self.timings.items())
+            counters = sorted(self.counters.items())
+        for name, stage in timings:
+            yield {'record': 'stage', 'stage': name, 'count': stage.count,
+                   'p50_ms': 1000 * stage.percentile(0.5), 'p95_ms': 1000 * stage.percentile(0.95),
+                   'max_ms': 1000 * stage.max, 'total_s': stage.total}
+        for name, count in counters:
+            yield {'record': 'counter', 'counter': name, 'count': count}
+
+
+def timed(name: str) -> Callable:
+    """
+    Decorator timing every call of a function as a stage.
+
+    Args:
+        name (str): The stage.
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            perf = Perf.get_shared()
+            if not perf.enabled:
+                return func(*args, **kwargs)
+            with perf.timer(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
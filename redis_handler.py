@@ -1,16 +1,237 @@
+from perf import Perf, timed
+from typing import Callable, Dict, Optional, Tuple
 import redis
+import threading
+import time
 
 class RedisHandler:
+    # Connection pools shared by all handlers in the process, keyed by server
+    _pools = {}
+    _pools_lock = threading.Lock()
+
     def __init__(self, host='localhost', port=6379, db=0, password=None):
         self.host = host
         self.port = port
         self.db = db
         self.password = password
-        self.redis_client = redis.StrictRedis(host=host, port=port, db=db)
+        self.redis_client = redis.StrictRedis(connection_pool=self.get_pool(host, port, db, password))
+        self.subscriber = KeyspaceSubscriber(self)
+
+    @classmethod
+    def get_pool(cls, host, port, db, password) -> redis.ConnectionPool:
+        """
+        Get the process-wide connection pool for a server, creating it on first use.
 
+        Returns:
+            redis.ConnectionPool: The shared connection pool.
+        """
+        key = (host, port, db, password)
+        with cls._pools_lock:
+            if key not in cls._pools:
+                cls._pools[key] = redis.ConnectionPool(host=host, port=port, db=db, password=password)
+            return cls._pools[key]
+
+    @timed('redis.get')
     def get_value(self, key):
+        Perf.get_shared().count('redis.fetch')
         value = self.redis_client.get(key)
         return value.decode('utf-8') if value is not None else None
 
+    def get_values(self, keys):
+        """
+        Get several keys in a single round trip.
+
+        Args:
+            keys (list): The keys to fetch.
+
+        Returns:
+            list: The decoded values in the order of keys, None for missing keys.
+        """
+        values = self.get_raw_values(keys)
+        return [value.decode('utf-8') if value is not None else None for value in values]
+
+    @timed('redis.get')
+    def get_raw_values(self, keys):
+        """
+        Get several keys in a single round trip, without decoding them.
+
+        Args:
+            keys (list): The keys to fetch.
+
+        Returns:
+            list: The raw bytes in the order of keys, None for missing keys.
+        """
+        Perf.get_shared().count('redis.fetch')
+        return self.redis_client.mget(keys)
+
+    def keyspace_notifications_enabled(self) -> bool:
+        """
+        Check whether the server publishes keyspace events for string commands.
+
+        Returns:
+            bool: True if 'notify-keyspace-events' contains K and $ (or A), False otherwise.
+        """
+        try:
+            config = self.redis_client.config_get('notify-keyspace-events')
+        except redis.exceptions.ResponseError:
+            # CONFIG is often renamed or disabled on production servers
+            return False
+        flags = ''.join(v.decode('utf-8') if isinstance(v, bytes) else str(v) for v in config.values())
+        return 'K' in flags and ('$' in flags or 'A' in flags)
+
+    def subscribe(self, keys, callback) -> Callable[[], None]:
+        """
+        Call a function whenever one of the keys changes, based on keyspace notifications.
+
+        Args:
+            keys (list): The keys to watch.
+            callback (Callable[[Optional[set]], None]): Called from the subscriber thread with the
+                changed keys, with an empty set when notifications are (again) received and with
+                None when they are not, the keys must then be polled.
+
+        Returns:
+            Callable[[], None]: Stops the calls.
+        """
+        return self.subscriber.subscribe(keys, callback)
+
+
+class NotificationsUnavailable(Exception):
+    """
+    Raised when the server does not publish keyspace events for string commands.
+    """
+
+
+class KeyspaceSubscriber:
+    """
+    Subscribes to the keyspace notifications of the keys wanted by all watches,
+    on a single thread, and calls each watch back when one of its keys changes.
+
+    Watches wait for the call on the event loop, so they do not hold a thread
+    each. The thread runs while there are subscribers.
+
+    When the connection fails or the server stops publishing the events (the
+    configuration is checked again every check_seconds), the watches are told
+    to poll, and the subscriber retries every retry_seconds until it can tell
+    them that notifications are back.
+    """
+
+    def __init__(self, redis_handler: RedisHandler, timeout: float = 1.0,
+                 check_seconds: float = 30.0, retry_seconds: float = 5.0) -> None:
+        """
+        Initialize KeyspaceSubscriber object.
+
+        Args:
+            redis_handler (RedisHandler): The server to subscribe to.
+            timeout (float): Seconds to block waiting for a message before picking up new subscribers.
+            check_seconds (float): Seconds between two checks of the notifications configuration.
+            retry_seconds (float): Seconds between two attempts to subscribe after a failure.
+        """
+        self.redis_handler = redis_handler
+        self.timeout = timeout
+        self.check_seconds = check_seconds
+        self.retry_seconds = retry_seconds
+        self.prefix = f"__keyspace@{redis_handler.db}__:"
+        self.listeners: Dict[int, Tuple[frozenset, Callable[[Optional[set]], None]]] = {}
+        self.next_listener_id = 0
+        self.available: Optional[bool] = None  # Whether notifications are received, None before the first check
+        self.thread: Optional[threading.Thread] = None
+        self.wakeup = threading.Event()  # Cuts a retry wait short when the last listener leaves
+        self.lock = threading.Lock()
+
+    def subscribe(self, keys, callback: Callable[[Optional[set]], None]) -> Callable[[], None]:
+        with self.lock:
+            listener_id = self.next_listener_id
+            self.next_listener_id += 1
+            self.listeners[listener_id] = (frozenset(keys), callback)
+            available = self.available
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="keyspace-subscriber", daemon=True)
+                self.thread.start()
+        if available is not None:
+            callback(set() if available else None)
+
+        def unsubscribe() -> None:
+            with self.lock:
+                self.listeners.pop(listener_id, None)
+                if not self.listeners:
+                    self.wakeup.set()
+
+        return unsubscribe
+
+    def run(self) -> None:
+        pubsub = None
+        subscribed = set()
+        checked_at = 0.0
+        try:
+            while True:
+                with self.lock:
+                    if not self.listeners:
+                        self.thread = None  # A later subscribe() starts a new thread
+                        self.available = None
+                        return
+                    wanted = {self.prefix + key for keys, _ in self.listeners.values() for key in keys}
+                try:
+                    if pubsub is None or time.monotonic() - checked_at >= self.check_seconds:
+                        # Turning the events off does not break the subscription, it goes silent
+                        if not self.redis_handler.keyspace_notifications_enabled():
+                            raise NotificationsUnavailable()
+                        checked_at = time.monotonic()
+                        if pubsub is None:
+                            pubsub = self.redis_handler.redis_client.pubsub(ignore_subscribe_messages=True)
+                            subscribed = set()
+                    if wanted - subscribed:
+                        pubsub.subscribe(*(wanted - subscribed))
+                    if subscribed - wanted:
+                        pubsub.unsubscribe(*(subscribed - wanted))
+                    subscribed = wanted
+                    self.set_available(True)
+
+                    message = pubsub.get_message(timeout=self.timeout)
+                    if message is None:
+                        continue
+                    # Notifications arriving close together are coalesced into one call,
+                    # so a CGW update touching several keys triggers a single refresh
+                    changed = set()
+                    while message is not None:
+                        changed.add(message['channel'].decode('utf-8')[len(self.prefix):])
+                        message = pubsub.get_message(timeout=0.05)
+                    self.publish(changed)
+                except (redis.exceptions.RedisError, NotificationsUnavailable):
+                    # Any server error, not only a lost connection, must not end the watches' notifications
+                    if pubsub is not None:
+                        self.close(pubsub)
+                        pubsub = None
+                    self.set_available(False)
+                    self.wakeup.wait(self.retry_seconds)
+                    self.wakeup.clear()
+        finally:
+            if pubsub is not None:
+                self.close(pubsub)
+            with self.lock:
+                if self.thread is threading.current_thread():
+                    # Ended by an unexpected error, a later subscribe() starts a new thread
+                    self.thread = None
+                    self.available = None
+
+    def set_available(self, available: bool) -> None:
+        with self.lock:
+            if available == self.available:
+                return
+            self.available = available
+            listeners = list(self.listeners.values())
+        for _, callback in listeners:
+            callback(set() if available else None)
 
+    def publish(self, changed: set) -> None:
+        with self.lock:
+            listeners = list(self.listeners.values())
+        for keys, callback in listeners:
+            if keys & changed:
+                callback(changed & keys)
 
+    @staticmethod
+    def close(pubsub) -> None:
+        try:
+            pubsub.close()
+        except redis.exceptions.RedisError:
+            pass  # The connection is already broken
@@ -20,7 +20,14 @@ GNU General Public License for more details.
 from scapy.packet import *
 from scapy.fields import *
 from scapy.layers.inet import TCP
-import array
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+# Frames at least this long are unmasked with numpy when it is installed
+_NUMPY_UNMASK_THRESHOLD = 4096
 
 # RFC6455 section 5.2
 _ws_opcode_names = {
@@ -42,6 +49,34 @@ _ws_opcode_names = {
   0xf : "reserved_controlF"
 }
 
+def unmask(data, mask):
+  """
+  XOR a frame payload with its repeated 4-byte masking key (RFC6455 section 5.3).
+
+  The whole payload is XORed in one operation, either as a numpy uint32 array
+  or as one big integer, instead of byte by byte.
+
+  Args:
+      data (bytes): The masked payload.
+      mask (int): The 32 bit masking key.
+
+  Returns:
+      bytes: The unmasked payload.
+  """
+  length = len(data)
+  if length == 0:
+    return b''
+  key = mask.to_bytes(4, 'big')
+  if numpy is not None and length >= _NUMPY_UNMASK_THRESHOLD:
+    padded = bytearray(data)
+    padded.extend(b'\x00' * (-length % 4))
+    words = numpy.frombuffer(padded, dtype=numpy.uint32)
+    words ^= numpy.frombuffer(key, dtype=numpy.uint32)[0]
+    return words.tobytes()[:length]
+  key_stream = key * (length // 4) + key[:length % 4]
+  return (int.from_bytes(data, 'big') ^ int.from_bytes(key_stream, 'big')).to_bytes(length, 'big')
+
+
 class WebSocket(Packet):
   name = "WebSocket"
   fields_desc = [ FlagsField("flags", 0, 4, ["RSV3", "RSV2", "RSV1", "FIN"]),
@@ -78,13 +113,15 @@ class WebSocket(Packet):
     
     
   def post_dissection(self, pkt):
-    if pkt.mask_flag == 1 and pkt.frame_data is not None:
-        demask = array.array('I', [pkt.mask >> 24 & 0xff, pkt.mask >> 16 & 0xff, pkt.mask >> 8 & 0xff, pkt.mask & 0xff])
-        unmasked = b''  # Change to bytes
-        for i, c in enumerate(pkt.frame_data):
-            unmasked += bytes([c ^ (demask[i % 4])])  # Convert integer to bytes
-
-        pkt.frame_data = unmasked.decode('utf-8')  # Assuming UTF-8 encoding, adjust as needed
+    if self.mask_flag == 1 and self.frame_data is not None:
+        unmasked = unmask(bytes(self.frame_data), self.mask)
+        if self.opcode == 1:
+            # Text frames carry UTF-8, binary and fragmented frames stay bytes
+            try:
+                unmasked = unmasked.decode('utf-8')
+            except UnicodeDecodeError:
+                pass
+        self.frame_data = unmasked
         return pkt
     else:
         pass
@@ -0,0 +1,287 @@
+from charging_stations_status import ChargingStationsStatus
+from site_status import SiteStatus
+from array import array
+from datetime import datetime
+from io import StringIO
+from tabulate import tabulate
+from typing import Dict, Iterator, List, Optional, Tuple
+import math
+import threading
+import time
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+NO_DATA = "·"
+OFFLINE = "OFFLINE"
+
+
+class ConnectorHistory:
+    """
+    The recent samples of one connector, kept in fixed-size ring buffers.
+
+    Each sample holds the connector status (as an index into the status names
+    of SiteHistory) and the charge current, offer and power of the EV plugged
+    in, NaN when there is none. The current and offer are the maximum over the
+    phases. Appending is O(1) and the memory is bounded by the capacity.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        """
+        Initialize ConnectorHistory object.
+
+        Args:
+            capacity (int): The number of samples kept, older ones are overwritten.
+        """
+        self.capacity = capacity
+        self.head = 0  # Index the next sample is written to
+        self.count = 0
+        self.times = array('d', bytes(8 * capacity))
+        self.statuses = array('B', bytes(capacity))
+        # Single precision is plenty for amps and watts and halves the footprint
+        self.currents = array('f', bytes(4 * capacity))
+        self.offers = array('f', bytes(4 * capacity))
+        self.powers = array('f', bytes(4 * capacity))
+
+    def append(self, timestamp: float, status: int, current: float, offer: float, power: float) -> None:
+        head = self.head
+        self.times[head] = timestamp
+        self.statuses[head] = status
+        self.currents[head] = current
+        self.offers[head] = offer
+        self.powers[head] = power
+        self.head = (head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def index(self, position: int) -> int:
+        """
+        Map the position of a sample, 0 being the oldest, to its index in the buffers.
+        """
+        return (self.head - self.count + position) % self.capacity
+
+    def window(self, since: float) -> List[int]:
+        """
+        Get the buffer indexes of the samples taken at or after a time, oldest first.
+
+        Args:
+            since (float): Epoch seconds.
+
+        Returns:
+            List[int]: The indexes into the buffers.
+        """
+        # Samples are appended in time order, bisect over the positions
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.times[self.index(middle)] < since:
+                low = middle + 1
+            else:
+                high = middle
+        return [self.index(position) for position in range(low, self.count)]
+
+
+class SiteHistory:
+    """
+    An in-memory time series of the site status, sampled each time a snapshot is fetched.
+    Nothing samples it in the background: a fresh process only has the samples of
+    its own fetches, the watches keep it filled.
+    """
+
+    _shared: 'SiteHistory' = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, capacity: int = 3600) -> None:
+        """
+        Initialize SiteHistory object.
+
+        Args:
+            capacity (int): Samples kept per connector, one hour at one sample per second by default.
+        """
+        self.capacity = capacity
+        self.connectors: Dict[Tuple[str, int], ConnectorHistory] = {}
+        self.status_names: List[str] = []
+        self.status_codes: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def get_shared(cls) -> 'SiteHistory':
+        """
+        Get the process-wide history, creating it on first use.
+
+        Returns:
+            SiteHistory: The shared history.
+        """
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def status_code(self, status: str) -> int:
+        code = self.status_codes.get(status)
+        if code is None:
+            code = min(len(self.status_names), 255)  # Beyond 255 distinct statuses, share the last code
+            if code == len(self.status_names):
+                self.status_names.append(status)
+            self.status_codes[status] = code
+        return code
+
+    def record(self, site_status: SiteStatus, charging_stations_status: ChargingStationsStatus,
+               timestamp: Optional[float] = None) -> None:
+        """
+        Append a sample for every connector.
+
+        Args:
+            site_status (SiteStatus): The current site status.
+            charging_stations_status (ChargingStationsStatus): The current charging stations status.
+            timestamp (float): Epoch seconds of the sample, now by default.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        evs = {(ev.charger_id, ev.connector_id): ev for ev in site_status.evs}
+        offline = {charger['id'] for charger in site_status.offline_chargers}
+
+        with self.lock:
+            for charger in charging_stations_status.chargers:
+                charger_offline = charger.id in offline
+                for connector in charger.connectors:
+                    key = (charger.id, connector.id)
+                    history = self.connectors.get(key)
+                    if history is None:
+                        history = self.connectors[key] = ConnectorHistory(self.capacity)
+                    status = self.status_code(OFFLINE if charger_offline else connector.status)
+                    ev = evs.get(key)
+                    if ev is None:
+                        history.append(timestamp, status, math.nan, math.nan, math.nan)
+                    else:
+                        history.append(timestamp, status, max(ev.charge_current, default=math.nan),
+                                       max(ev.charge_offer, default=math.nan),
+                                       math.nan if ev.charge_power is None else ev.charge_power)
+
+    def display(self, charger_id: str, minutes: float = 10, width: int = 40) -> str:
+        """
+        Display the history of the connectors of a charger.
+
+        Args:
+            charger_id (str): The ID of the charger.
+            minutes (float): How far back to look.
+            width (int): The number of characters of the sparklines.
+
+        Returns:
+            str: The formatted text displaying the history.
+        """
+        output = StringIO()
+        now = time.time()
+        since = now - 60 * minutes
+
+        with self.lock:
+            keys = sorted(key for key in self.connectors if key[0] == charger_id)
+            if not keys:
+                # Samples are only taken when the status is fetched, by this command or a watch
+                return (f"No history for charger {charger_id}, the site status is sampled each time "
+                        f"lcdiags fetches it: keep 'watch site-status' running to collect it")
+
+            print(f"History of {charger_id}:", file=output)
+            print(f"From {datetime.fromtimestamp(since).strftime('%y%m%d_%H%M%S')} "
+                  f"to {datetime.fromtimestamp(now).strftime('%y%m%d_%H%M%S')} ({minutes:g} min)", file=output)
+
+            data = []
+            for key in keys:
+                history = self.connectors[key]
+                indexes = history.window(since)
+                times = [history.times[i] for i in indexes]
+                statuses = [history.statuses[i] for i in indexes]
+                changes = sum(1 for previous, current in zip(statuses, statuses[1:]) if previous != current)
+                seen = sorted({self.status_names[code] for code in statuses})
+                data.append([key[1], "status", len(indexes), None, None, None,
+                             f"{changes} changes: {', '.join(seen)}"])
+                data.append([None, "", None, None, None, None,
+                             self.status_line(times, statuses, since, now, width)])
+                for name, values in (("current A", history.currents),
+                                     ("offer A", history.offers),
+                                     ("power W", history.powers)):
+                    samples = [values[i] for i in indexes]
+                    known = [value for value in samples if not math.isnan(value)]
+                    if known:
+                        data.append([None, name, len(known), round(min(known), 1),
+                                     round(sum(known) / len(known), 1), round(max(known), 1),
+                                     self.sparkline(times, samples, since, now, width)])
+                    else:
+                        data.append([None, name, 0, None, None, None, ""])
+
+        headers = ["Conn", "Series", "Samples", "Min", "Avg", "Max", "Trend"]
+        print(tabulate(data, headers=headers, tablefmt="psql", stralign="left"), file=output)
+        return output.getvalue()
+
+    def records(self, charger_id: str, minutes: float = 10) -> Iterator[dict]:
+        """
+        Get the samples of the connectors of a charger as records for the structured output.
+
+        Args:
+            charger_id (str): The ID of the charger.
+            minutes (float): How far back to look.
+
+        Yields:
+            dict: One 'sample' record per connector and sample, in time order per connector.
+        """
+        since = time.time() - 60 * minutes
+        with self.lock:
+            keys = sorted(key for key in self.connectors if key[0] == charger_id)
+            samples = []
+            for key in keys:
+                history = self.connectors[key]
+                for i in history.window(since):
+                    samples.append((key, history.times[i], self.status_names[history.statuses[i]],
+                                    history.currents[i], history.offers[i], history.powers[i]))
+        # Yielded outside of the lock, record() must not wait for a slow reader
+        for (charger, connector), timestamp, status, current, offer, power in samples:
+            yield {'record': 'sample', 'charger_id': charger, 'connector_id': connector, 'time': timestamp,
+                   'status': status, 'current': self.known(current), 'offer': self.known(offer),
+                   'power': self.known(power)}
+
+    @staticmethod
+    def known(value: float) -> Optional[float]:
+        """
+        Get a sampled value, None if it was unknown. The float32 storage adds noise
+        beyond a few decimals, so it is rounded to 3.
+        """
+        return None if math.isnan(value) else round(value, 3)
+
+    @staticmethod
+    def buckets(times: List[float], values: list, since: float, now: float, width: int) -> List[list]:
+        """
+        Split the samples of a window into width buckets of equal duration.
+        """
+        buckets = [[] for _ in range(width)]
+        span = max(now - since, 1e-9)
+        for timestamp, value in zip(times, values):
+            buckets[min(int((timestamp - since) / span * width), width - 1)].append(value)
+        return buckets
+
+    @classmethod
+    def sparkline(cls, times: List[float], values: List[float], since: float, now: float, width: int) -> str:
+        """
+        Draw the average of each bucket with block characters scaled to the window's min and max.
+        """
+        averages = []
+        for bucket in cls.buckets(times, values, since, now, width):
+            known = [value for value in bucket if not math.isnan(value)]
+            averages.append(sum(known) / len(known) if known else None)
+        known = [value for value in averages if value is not None]
+        if not known:
+            return ""
+        low, high = min(known), max(known)
+        # Averages of a constant series may differ in the last bits, draw them flat
+        scale = (len(SPARK_CHARS) - 1) / (high - low) if high - low > 1e-9 * max(abs(high), 1) else 0
+        return "".join(NO_DATA if value is None else SPARK_CHARS[int((value - low) * scale)] for value in averages)
+
+    def status_line(self, times: List[float], statuses: List[int], since: float, now: float, width: int) -> str:
+        """
+        Draw the first letter of the last status of each bucket, lower case
+        if the status changed within the bucket.
+        """
+        line = []
+        for bucket in self.buckets(times, statuses, since, now, width):
+            if not bucket:
+                line.append(NO_DATA)
+                continue
+            letter = self.status_names[bucket[-1]][:1] or "?"
+            line.append(letter.lower() if len(set(bucket)) > 1 else letter.upper())
+        return "".join(line)
@@ -1,30 +1,30 @@
-from tabulate import tabulate
-from datetime import datetime
+from models import model
+from perf import timed
+from typing import Iterator, List, Optional, Tuple
+from table_renderer import Column, TableRenderer
+from timestamps import format_iso
 from dnmasq_leases import DnsmasqLeases
 from charging_stations_status import ChargingStationsStatus
 from io import StringIO
 
+CHARGERS_TABLE = TableRenderer([Column("ID"), Column("Status"), Column("IP"), Column("MAC"),
+                                Column("Leased until")])
+EVS_TABLE = TableRenderer([Column("ID"), Column("Chg-ID"), Column("Status"), Column("Chg-Current"),
+                           Column("Chg-Offer"), Column("Chg-Fw."), Column("Sess.E"),
+                           Column("Start Chg.")])
 
+
+@model
 class SiteStatus:
     """
     Represents the status of a site including charging stations, electric vehicles, and offline chargers.
     """
 
-    def __init__(self, charging_stations: list, datetime: str, evs: list, offline_chargers: list) -> None:
-        """
-        Initialize SiteStatus object.
-
-        Args:
-            charging_stations (list): List of charging stations.
-            datetime (str): Datetime of the status.
-            evs (list): List of electric vehicles.
-            offline_chargers (list): List of offline chargers.
-        """
-        self.action = "response"
-        self.charging_stations = charging_stations
-        self.datetime = datetime
-        self.evs = evs
-        self.offline_chargers = offline_chargers
+    charging_stations: Tuple[dict, ...] = ()
+    datetime: str = ''
+    evs: Tuple['EV', ...] = ()
+    offline_chargers: Tuple[dict, ...] = ()
+    action: str = "response"
 
     @classmethod
     def from_json(cls, json_data: dict) -> 'SiteStatus':
@@ -39,15 +39,16 @@ class SiteStatus:
         """
         if json_data is None:
             # Return an empty SiteStatus if json_data is None
-            return cls([], '', [], [])
+            return cls((), '', (), ())
         
-        charging_stations = json_data.get('charging_stations', [])
+        charging_stations = tuple(json_data.get('charging_stations') or ())
         datetime = json_data.get('datetime', '')
-        evs = json_data.get('evs', [])
-        offline_chargers = json_data.get('offline_chargers', [])
+        evs = tuple(EV.from_json(ev) for ev in json_data.get('evs') or ())
+        offline_chargers = tuple(json_data.get('offline_chargers') or ())
         return cls(charging_stations, datetime, evs, offline_chargers)
 
 
+    @timed('render.site_status')
     def display(self, dnsmasq_leases: DnsmasqLeases, charging_stations_status: ChargingStationsStatus) -> str:
         """
         Display the site status including chargers, connections, and electric vehicles.
@@ -65,97 +66,120 @@ class SiteStatus:
         print(f"Action: {self.action}", file=output)
         print(f"DateTime: {self.datetime}", file=output)
 
-        online_chargers = {charger['id']: 'Online' for charger in self.charging_stations}
-        offline_chargers = {charger['id']: 'OFFLINE' for charger in self.offline_chargers}
-
-        # Update status for online chargers if they exist in offline chargers
-        for charger_id in online_chargers.keys() & offline_chargers.keys():
-            online_chargers[charger_id] = 'OFFLINE'
-
-        all_chargers = sorted({**online_chargers, **offline_chargers}.items())
-
-        if all_chargers:
-            chargers_with_ip = []
-            for charger_id, status in all_chargers:
-                ip_address = charging_stations_status.get_ip_from_charger_id(charger_id)
-                mac_address = dnsmasq_leases.get_mac_from_ip(ip_address)
-                lease = dnsmasq_leases.get_lease_time_from_ip(ip_address)
-                chargers_with_ip.append((charger_id, status, ip_address, mac_address, lease))
-
+        chargers_with_ip = self.chargers(dnsmasq_leases, charging_stations_status)
+        if chargers_with_ip:
             print("\nChargers:", file=output)
-            headers = ["ID", "Status", "IP", "MAC", "Leased until"]
-            print(tabulate(chargers_with_ip, headers=headers, tablefmt="psql"), file=output)
+            print(CHARGERS_TABLE.render(chargers_with_ip), file=output)
 
         print("\nConnections:", file=output)
         print(charging_stations_status.display(), file=output)
 
         if self.evs:
             print("\nElectric Vehicles:", file=output)
-            headers = ["ID", "Chg-ID", "Status", "Chg-Current", "Chg-Offer", "Chg-Fw.", "Sess.E", "Start Chg."]
             data = []
             for ev in self.evs:
-                start_charging_time = ev.get('start_charging_time')
-                formatted_time = "UNKNOWN"
-                if start_charging_time is not None:
-                    formatted_time = datetime.strptime(start_charging_time, "%Y-%m-%dT%H:%M:%S.%f%z").strftime("%y%m%d_%H%M")
                 data.append([
-                    ev.get('id'),
-                    ev.get('charger_id'),
-                    ev.get('status'),
-                    ev.get('charge_current'),
-                    ev.get('charge_offer'),
-                    ev.get('charger_firmware'),
-                    ev.get('session_energy_consumed'),
-                    formatted_time
+                    ev.id,
+                    ev.charger_id,
+                    ev.status,
+                    ev.charge_current,
+                    ev.charge_offer,
+                    ev.charger_firmware,
+                    ev.session_energy_consumed,
+                    format_iso(ev.start_charging_time)
                 ])
-            print(tabulate(data, headers=headers, tablefmt="psql", stralign="left"), file=output)
+            print(EVS_TABLE.render(data), file=output)
 
         return output.getvalue()
 
+    def chargers(self, dnsmasq_leases: DnsmasqLeases,
+                 charging_stations_status: ChargingStationsStatus) -> List[Tuple[str, str, str, str, str]]:
+        """
+        Get the chargers sorted by ID, with their network details.
 
-class EV:
-    """
-    Represents an electric vehicle (EV) with its attributes and status.
-    """
+        Returns:
+            List[Tuple[str, str, str, str, str]]: (ID, status, IP, MAC, leased until) of every charger.
+        """
+        online_chargers = {charger['id']: 'Online' for charger in self.charging_stations}
+        offline_chargers = {charger['id']: 'OFFLINE' for charger in self.offline_chargers}
+
+        # Update status for online chargers if they exist in offline chargers
+        for charger_id in online_chargers.keys() & offline_chargers.keys():
+            online_chargers[charger_id] = 'OFFLINE'
 
-    def __init__(self, action, apd_state, charge_capability, charge_current, charge_offer,
-                 charge_power, charger_firmware, charger_id, connector_id, discharge_capability,
-                 discharge_current, discharge_offer, discharge_power, ev_suspended, ev_id,
-                 meter_values_timestamp, plugin_time, rfid, session_energy_consumed,
-                 session_energy_produced, soc, start_charging_time, status, total_energy_consumed,
-                 total_energy_produced, transaction_ongoing) -> None:
+        chargers_with_ip = []
+        for charger_id, status in sorted({**online_chargers, **offline_chargers}.items()):
+            ip_address = charging_stations_status.get_ip_from_charger_id(charger_id)
+            mac_address = dnsmasq_leases.get_mac_from_ip(ip_address)
+            lease = dnsmasq_leases.get_lease_time_from_ip(ip_address)
+            chargers_with_ip.append((charger_id, status, ip_address, mac_address, lease))
+        return chargers_with_ip
+
+    def records(self, dnsmasq_leases: DnsmasqLeases,
+                charging_stations_status: ChargingStationsStatus) -> Iterator[dict]:
         """
-        Initialize EV object.
+        Get the site status as records for the structured output, in the order of display.
 
         Args:
-            # Add type hints and descriptions here...
+            dnsmasq_leases (DnsmasqLeases): Instance of DnsmasqLeases containing lease information.
+            charging_stations_status (ChargingStationsStatus): Instance of ChargingStationsStatus containing charging station status.
+
+        Yields:
+            dict: A 'site' record, then the 'charger', 'connection' and 'ev' records.
         """
-        self.action = action
-        self.apd_state = apd_state
-        self.charge_capability = charge_capability
-        self.charge_current = charge_current
-        self.charge_offer = charge_offer
-        self.charge_power = charge_power
-        self.charger_firmware = charger_firmware
-        self.charger_id = charger_id
-        self.connector_id = connector_id
-        self.discharge_capability = discharge_capability
-        self.discharge_current = discharge_current
-        self.discharge_offer = discharge_offer
-        self.discharge_power = discharge_power
-        self.ev_suspended = ev_suspended
-        self.ev_id = ev_id
-        self.meter_values_timestamp = meter_values_timestamp
-        self.plugin_time = plugin_time
-        self.rfid = rfid
-        self.session_energy_consumed = session_energy_consumed
-        self.session_energy_produced = session_energy_produced
-        self.soc = soc
-        self.start_charging_time = start_charging_time
-        self.status = status
-        self.total_energy_consumed = total_energy_consumed
-        self.total_energy_produced = total_energy_produced
-        self.transaction_ongoing = transaction_ongoing
+        yield {'record': 'site', 'action': self.action, 'datetime': self.datetime}
+        for charger_id, status, ip_address, mac_address, _ in self.chargers(dnsmasq_leases, charging_stations_status):
+            yield {'record': 'charger', 'id': charger_id, 'status': status, 'ip_address': ip_address,
+                   'mac_address': mac_address,
+                   'leased_until': dnsmasq_leases.get_lease_epoch_from_ip(ip_address)}  # Epoch seconds
+        yield from charging_stations_status.records()
+        for ev in self.evs:
+            yield {
+                'record': 'ev',
+                'id': ev.id,
+                'charger_id': ev.charger_id,
+                'connector_id': ev.connector_id,
+                'status': ev.status,
+                'charge_current': list(ev.charge_current),
+                'charge_offer': list(ev.charge_offer),
+                'charger_firmware': ev.charger_firmware,
+                'session_energy_consumed': ev.session_energy_consumed,
+                'start_charging_time': ev.start_charging_time,
+            }
+
+
+@model
+class EV:
+    """
+    Represents an electric vehicle (EV) with its attributes and status.
+    """
+
+    id: Optional[str]
+    charger_id: Optional[str]
+    connector_id: Optional[int]
+    action: str = "response"
+    apd_state: Optional[str] = None
+    charge_capability: Tuple[float, ...] = ()
+    charge_current: Tuple[float, ...] = ()
+    charge_offer: Tuple[float, ...] = ()
+    charge_power: Optional[float] = None
+    charger_firmware: Optional[str] = None
+    discharge_capability: Tuple[float, ...] = ()
+    discharge_current: Tuple[float, ...] = ()
+    discharge_offer: Tuple[float, ...] = ()
+    discharge_power: Optional[float] = None
+    ev_suspended: Optional[bool] = None
+    meter_values_timestamp: Optional[str] = None
+    plugin_time: Optional[str] = None
+    rfid: Optional[str] = None
+    session_energy_consumed: Optional[float] = None
+    session_energy_produced: Optional[float] = None
+    soc: Optional[float] = None
+    start_charging_time: Optional[str] = None
+    status: Optional[str] = None
+    total_energy_consumed: Optional[float] = None
+    total_energy_produced: Optional[float] = None
+    transaction_ongoing: Optional[bool] = None
 
     @classmethod
     def from_json(cls, json_data: dict) -> 'EV':
@@ -168,5 +192,31 @@ class EV:
         Returns:
             EV: The created EV object.
         """
-        # Implement logic to create EV object from JSON data here...
-        pass
+        return cls(
+            id=json_data.get('id'),
+            charger_id=json_data.get('charger_id'),
+            connector_id=json_data.get('connector_id'),
+            action=json_data.get('action', "response"),
+            apd_state=json_data.get('apd_state'),
+            charge_capability=tuple(json_data.get('charge_capability') or ()),
+            charge_current=tuple(json_data.get('charge_current') or ()),
+            charge_offer=tuple(json_data.get('charge_offer') or ()),
+            charge_power=json_data.get('charge_power'),
+            charger_firmware=json_data.get('charger_firmware'),
+            discharge_capability=tuple(json_data.get('discharge_capability') or ()),
+            discharge_current=tuple(json_data.get('discharge_current') or ()),
+            discharge_offer=tuple(json_data.get('discharge_offer') or ()),
+            discharge_power=json_data.get('discharge_power'),
+            ev_suspended=json_data.get('ev_suspended'),
+            meter_values_timestamp=json_data.get('meter_values_timestamp'),
+            plugin_time=json_data.get('plugin_time'),
+            rfid=json_data.get('rfid'),
+            session_energy_consumed=json_data.get('session_energy_consumed'),
+            session_energy_produced=json_data.get('session_energy_produced'),
+            soc=json_data.get('soc'),
+            start_charging_time=json_data.get('start_charging_time'),
+            status=json_data.get('status'),
+            total_energy_consumed=json_data.get('total_energy_consumed'),
+            total_energy_produced=json_data.get('total_energy_produced'),
+            transaction_ongoing=json_data.get('transaction_ongoing')
+        )
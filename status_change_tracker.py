@@ -0,0 +1,139 @@
+from charging_stations_status import ChargingStationsStatus
+from datetime import datetime
+from typing import Dict, List, Tuple
+import atexit
+import csv
+import json
+import threading
+
+
+class StatusChangeTracker:
+    """
+    Tracks connector status transitions in memory and persists them in batches.
+
+    The last known status of every connector is kept in memory, so detecting
+    transitions costs no disk I/O. The snapshot ('tabledata.json') and the change
+    log ('status_changes.csv') are written by a background thread every
+    flush_interval seconds and once more when the process exits.
+    """
+
+    _shared: 'StatusChangeTracker' = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, snapshot_file: str = 'tabledata.json', changes_file: str = 'status_changes.csv',
+                 flush_interval: float = 30.0) -> None:
+        """
+        Initialize StatusChangeTracker object.
+
+        Args:
+            snapshot_file (str): JSON file holding the last known status per connector.
+            changes_file (str): CSV file the status changes are appended to.
+            flush_interval (float): Seconds between two writes to disk.
+        """
+        self.snapshot_file = snapshot_file
+        self.changes_file = changes_file
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()  # Guards the in-memory state
+        self.flush_lock = threading.Lock()  # Serializes writes to disk
+        self.previous_status: Dict[Tuple[str, int], str] = self.load_snapshot()
+        self.pending_changes: List[list] = []
+        self.dirty = False
+        self.stop_event = threading.Event()
+        self.flush_thread: threading.Thread = None
+
+    @classmethod
+    def get_shared(cls) -> 'StatusChangeTracker':
+        """
+        Get the process-wide tracker, creating it on first use.
+
+        Returns:
+            StatusChangeTracker: The shared tracker.
+        """
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def load_snapshot(self) -> Dict[Tuple[str, int], str]:
+        """
+        Load the last known status per connector from the snapshot file.
+
+        Returns:
+            Dict[Tuple[str, int], str]: The status keyed by (charger ID, connector ID).
+        """
+        try:
+            with open(self.snapshot_file, 'r') as json_file:
+                previous_data = json.load(json_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        return {tuple(entry[:2]): entry[-1] for entry in previous_data}
+
+    def update(self, charging_stations_status: ChargingStationsStatus) -> List[list]:
+        """
+        Compare the connector status with the previous one and record the transitions.
+
+        Args:
+            charging_stations_status (ChargingStationsStatus): The current charging stations status.
+
+        Returns:
+            List[list]: The detected changes as [timestamp, charger ID, new status] rows.
+        """
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        changes = []
+        with self.lock:
+            for charger in charging_stations_status.chargers:
+                for connector in charger.connectors:
+                    key = (charger.id, connector.id)
+                    previous_status = self.previous_status.get(key)
+                    if previous_status == connector.status:
+                        continue
+                    if previous_status:
+                        changes.append([now, charger.id, connector.status])
+                    self.previous_status[key] = connector.status
+                    self.dirty = True
+            self.pending_changes.extend(changes)
+        self.start()
+        return changes
+
+    def start(self) -> None:
+        """
+        Start the background flush thread if it is not running yet.
+        """
+        def flush_periodically():
+            while not self.stop_event.wait(self.flush_interval):
+                self.flush()
+
+        with self.lock:  # Concurrent first updates must not start two threads writing the same files
+            if self.flush_thread is not None:
+                return
+            self.flush_thread = threading.Thread(target=flush_periodically)
+            self.flush_thread.daemon = True  # Set as a daemon thread to exit with the main thread
+            self.flush_thread.start()
+        atexit.register(self.stop)
+
+    def stop(self) -> None:
+        """
+        Stop the background flush thread and write the remaining state to disk.
+        """
+        self.stop_event.set()
+        self.flush()
+
+    def flush(self) -> None:
+        """
+        Write the snapshot and the pending status changes to disk.
+        """
+        with self.flush_lock:
+            with self.lock:
+                if not self.dirty:
+                    return
+                snapshot = sorted([*key, status] for key, status in self.previous_status.items())
+                changes, self.pending_changes = self.pending_changes, []
+                self.dirty = False
+
+            with open(self.snapshot_file, 'w') as json_file:
+                json.dump(snapshot, json_file)
+
+            if changes:
+                with open(self.changes_file, 'a', newline='') as csv_file:
+                    writer = csv.writer(csv_file)
+                    writer.writerows(changes)
@@ -0,0 +1,283 @@
+from json_codec import loads
+from bisect import bisect_right
+from typing import Iterator, List, Optional, Tuple
+import json
+import os
+import struct
+import threading
+import zlib
+
+MAGIC = b'LCDREC1\n'
+RECORD_HEADER = struct.Struct('<dBI')  # timestamp, kind, payload length
+INDEX_ENTRY = struct.Struct('<dQ')  # timestamp, file offset of a keyframe
+KEYFRAME = 0
+DELTA = 1
+KEYFRAME_INTERVAL = 100  # Deltas between two keyframes
+
+# Delta operators
+REPLACE = '='
+DICT = '{'
+LIST = '['
+REMOVED = '-'
+LENGTH = 'n'
+
+
+def diff(old, new) -> Optional[dict]:
+    """
+    Compute the delta turning one JSON document into another.
+
+    Dicts are compared key by key and lists element by element, anything else
+    that changed is replaced as a whole.
+
+    Args:
+        old: The previous document.
+        new: The current document.
+
+    Returns:
+        Optional[dict]: The delta, None if the documents are equal.
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        changed = {}
+        for key, value in new.items():
+            if key in old:
+                delta = diff(old[key], value)
+                if delta is not None:
+                    changed[key] = delta
+            else:
+                changed[key] = {REPLACE: value}
+        removed = [key for key in old if key not in new]
+        if not changed and not removed:
+            return None
+        delta = {DICT: changed}
+        if removed:
+            delta[REMOVED] = removed
+        return delta
+
+    if isinstance(old, list) and isinstance(new, list):
+        changed = {}
+        for i, value in enumerate(new):
+            if i < len(old):
+                delta = diff(old[i], value)
+                if delta is not None:
+                    changed[str(i)] = delta
+            else:
+                changed[str(i)] = {REPLACE: value}
+        if not changed and len(old) == len(new):
+            return None
+        return {LIST: changed, LENGTH: len(new)}
+
+    # 1 == 1.0 == True, a change of type is a change
+    if type(old) is type(new) and old == new:
+        return None
+    return {REPLACE: new}
+
+
+def patch(old, delta: Optional[dict]):
+    """
+    Apply a delta computed by diff.
+
+    Args:
+        old: The previous document, it is not modified.
+        delta (Optional[dict]): The delta.
+
+    Returns:
+        The current document.
+    """
+    if delta is None:
+        return old
+    if REPLACE in delta:
+        return delta[REPLACE]
+    if DICT in delta:
+        new = {key: value for key, value in old.items() if key not in delta.get(REMOVED, ())}
+        for key, value in delta[DICT].items():
+            new[key] = patch(old.get(key), value)
+        return new
+    new = old[:delta[LENGTH]]
+    for i, value in delta[LIST].items():
+        i = int(i)
+        if i < len(new):
+            new[i] = patch(new[i], value)
+        else:
+            new.append(patch(None, value))
+    return new
+
+
+class StatusRecorder:
+    """
+    Appends distinct snapshots to a recording as deltas against the previous one.
+
+    Every KEYFRAME_INTERVAL deltas, and at the start of each recording session,
+    the full snapshot is written instead, and its offset is appended to the sparse
+    time index ('<file>.idx') so that replay can start anywhere without reading
+    the recording from the beginning. Payloads are zlib-compressed JSON.
+    """
+
+    def __init__(self, filename: str, keyframe_interval: int = KEYFRAME_INTERVAL) -> None:
+        """
+        Initialize StatusRecorder object.
+
+        Args:
+            filename (str): The path to the recording, appended to if it exists.
+            keyframe_interval (int): Deltas between two full snapshots.
+        """
+        self.filename = filename
+        self.keyframe_interval = keyframe_interval
+        # Validated before opening, a refused file leaves no handle behind
+        length = self.complete_length(filename) if os.path.exists(filename) and os.path.getsize(filename) else 0
+        self.file = open(filename, 'ab')
+        if length == 0:
+            self.file.write(MAGIC)
+        else:
+            self.file.truncate(length)
+        try:
+            self.index_file = open(filename + '.idx', 'ab')
+        except OSError:
+            self.file.close()
+            raise
+        self.index_file.truncate(self.index_file.tell() - self.index_file.tell() % INDEX_ENTRY.size)
+        self.previous = None
+        self.deltas = 0
+        self.records = 0
+        self.lock = threading.Lock()
+
+    def write(self, timestamp: float, document) -> bool:
+        """
+        Append a snapshot unless it equals the previous one.
+
+        Args:
+            timestamp (float): Epoch seconds of the snapshot.
+            document: The snapshot as a JSON document.
+
+        Returns:
+            bool: True if the snapshot was written, False if it did not change.
+        """
+        with self.lock:
+            if self.file.closed:
+                return False
+            if self.previous is None or self.deltas >= self.keyframe_interval:
+                kind, payload = KEYFRAME, document
+            else:
+                kind, payload = DELTA, diff(self.previous, document)
+                if payload is None:
+                    return False
+
+            data = zlib.compress(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+            offset = self.file.tell()
+            self.file.write(RECORD_HEADER.pack(timestamp, kind, len(data)) + data)
+            self.file.flush()
+            if kind == KEYFRAME:
+                self.index_file.write(INDEX_ENTRY.pack(timestamp, offset))
+                self.index_file.flush()
+                self.deltas = 0
+            else:
+                self.deltas += 1
+            self.previous = document
+            self.records += 1
+            return True
+
+    @staticmethod
+    def complete_length(filename: str) -> int:
+        """
+        Get the length of the complete records of a recording, so that a record
+        torn by an interrupted recorder is dropped before appending.
+
+        Raises:
+            ValueError: If the file is not a recording.
+        """
+        with open(filename, 'rb') as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{filename} is not a status recording")
+            end = file.seek(0, os.SEEK_END)
+            offset = len(MAGIC)
+            while offset + RECORD_HEADER.size <= end:
+                file.seek(offset)
+                _, _, length = RECORD_HEADER.unpack(file.read(RECORD_HEADER.size))
+                if offset + RECORD_HEADER.size + length > end:
+                    break
+                offset += RECORD_HEADER.size + length
+            return offset
+
+    def size(self) -> int:
+        with self.lock:
+            return self.file.tell() if not self.file.closed else 0
+
+    def close(self) -> None:
+        with self.lock:
+            self.file.close()
+            self.index_file.close()
+
+
+class StatusLog:
+    """
+    Reads the snapshots of a recording written by StatusRecorder.
+    """
+
+    def __init__(self, filename: str) -> None:
+        """
+        Initialize StatusLog object.
+
+        Args:
+            filename (str): The path to the recording.
+
+        Raises:
+            ValueError: If the file is not a recording.
+        """
+        self.filename = filename
+        with open(filename, 'rb') as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{filename} is not a status recording")
+        self.index = self.read_index()
+
+    def read_index(self) -> List[Tuple[float, int]]:
+        """
+        Read the sparse time index, an empty one if it is missing.
+
+        Returns:
+            List[Tuple[float, int]]: (timestamp, offset) of the keyframes, in time order.
+        """
+        try:
+            with open(self.filename + '.idx', 'rb') as file:
+                data = file.read()
+        except FileNotFoundError:
+            return []
+        data = data[:len(data) - len(data) % INDEX_ENTRY.size]  # Drop a torn last entry
+        return sorted(INDEX_ENTRY.iter_unpack(data))
+
+    def seek_offset(self, start: Optional[float]) -> int:
+        """
+        Get the offset of the last keyframe at or before a time.
+        """
+        if start is None or not self.index:
+            return len(MAGIC)
+        position = bisect_right(self.index, (start, float('inf')))
+        return self.index[position - 1][1] if position else len(MAGIC)
+
+    def frames(self, start: Optional[float] = None) -> Iterator[Tuple[float, object]]:
+        """
+        Iterate over the snapshots of the recording.
+
+        Args:
+            start (Optional[float]): Epoch seconds of the first snapshot wanted, the beginning by default.
+
+        Yields:
+            Tuple[float, object]: The timestamp and the snapshot as a JSON document.
+        """
+        document = None
+        with open(self.filename, 'rb') as file:
+            file.seek(self.seek_offset(start))
+            while True:
+                header = file.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    return
+                timestamp, kind, length = RECORD_HEADER.unpack(header)
+                data = file.read(length)
+                if len(data) < length:
+                    return  # Torn last record, the recorder was interrupted
+                if kind == KEYFRAME:
+                    document = loads(zlib.decompress(data))
+                elif document is None:
+                    continue  # A delta without its keyframe, skip to the next keyframe
+                else:
+                    document = patch(document, loads(zlib.decompress(data)))
+                if start is None or timestamp >= start:
+                    yield timestamp, document
@@ -0,0 +1,267 @@
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+import math
+import re
+import threading
+
+AUTO = None  # Inferred from the values as tabulate does: decimal for numbers, left otherwise
+LEFT = 'left'
+RIGHT = 'right'
+DECIMAL = 'decimal'  # Right-aligned with the decimal points lined up
+FLOATS = 'floats'  # Decimal, with the numbers in tabulate's float format (inferred only)
+
+# Kinds of values, from the least to the most generic: a column takes the most
+# generic kind of its values, as tabulate's column types
+MISSING, BOOL, INT, FLOAT, TEXT = range(5)
+
+THOUSANDS = re.compile(r"^(([+-]?[0-9]{1,3})(?:,([0-9]{3}))*)?(?(1)\.[0-9]*|\.[0-9]+)?$")
+
+PSQL = 'psql'
+SIMPLE = 'simple'
+
+
+def format_value(value) -> str:
+    """
+    Format a cell the way tabulate does outside float columns: None is empty.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, tuple):
+        return str(list(value))
+    return str(value).strip()
+
+
+def value_kind(value) -> int:
+    """
+    Get the kind of a value, by tabulate's rules: numeric strings are numbers,
+    'True' and 'False' are booleans, None and empty strings are missing.
+    """
+    if value is None or (isinstance(value, str) and not value):
+        return MISSING
+    if type(value) is bool or value in ("True", "False"):
+        return BOOL
+    if type(value) is int:
+        return INT
+    if type(value) is float:
+        return FLOAT
+    if not isinstance(value, str):
+        if hasattr(value, 'isoformat'):
+            return TEXT
+        try:
+            float(value)
+        except (TypeError, ValueError):
+            return TEXT
+        return FLOAT
+    try:
+        int(value)
+        return INT
+    except ValueError:
+        pass
+    thousands = THOUSANDS.match(value) is not None
+    if thousands and '.' not in value:
+        return INT
+    try:
+        number = float(value)
+    except ValueError:
+        return FLOAT if thousands else TEXT
+    if not (math.isinf(number) or math.isnan(number)) or value.lower() in ("inf", "-inf", "nan"):
+        return FLOAT
+    return FLOAT if thousands else TEXT
+
+
+def format_float(value) -> Optional[str]:
+    """
+    Format a number of a float column the way tabulate does, None if it cannot be.
+    """
+    if isinstance(value, str):
+        value = value.replace(',', '')  # Thousands separators
+    try:
+        return format(float(value), 'g')
+    except (TypeError, ValueError):
+        return None
+
+
+def after_point(text: str) -> int:
+    """
+    Count the characters after the decimal point (or exponent) of a number, -1 without one.
+    """
+    if value_kind(text) != FLOAT:
+        return -1
+    pos = text.rfind('.')
+    if pos < 0:
+        pos = text.lower().rfind('e')
+    return len(text) - pos - 1 if pos >= 0 else -1
+
+
+class Column(NamedTuple):
+    """
+    A column of a table: its header, alignment and cell formatter.
+    """
+    header: str
+    align: Optional[str] = AUTO
+    format: Callable[[object], str] = format_value
+
+
+class Cell(NamedTuple):
+    lines: Tuple[str, ...]
+    width: int
+    decimals: int  # Characters after the decimal point, -1 without one
+    kind: int
+    number: Optional['Cell'] = None  # The cell in a float column, if it is formatted differently there
+
+
+def make_cell(text: str, kind: int) -> Cell:
+    lines = tuple(text.split('\n'))
+    return Cell(lines, max(len(line) for line in lines), after_point(lines[0]), kind)
+
+
+class TableRenderer:
+    """
+    Renders the rows of a fixed table schema as tabulate's psql (or simple) format.
+
+    Columns are aligned as tabulate aligns them (numbers on their decimal
+    point, anything else left) unless an alignment is declared. Rendering is
+    incremental: the formatted cells of a row and the kinds of its values are
+    cached by the row's values, and its finished lines as long as the column
+    layout does not change. A watch re-rendering a mostly unchanged table only
+    formats the rows that changed. Only the rows of the last render are kept.
+    """
+
+    def __init__(self, columns: List[Column], style: str = PSQL) -> None:
+        """
+        Initialize TableRenderer object.
+
+        Args:
+            columns (List[Column]): The columns of the table.
+            style (str): PSQL or SIMPLE.
+        """
+        self.columns = columns
+        self.style = style
+        self.cells: Dict[tuple, Tuple[Cell, ...]] = {}
+        self.lines: Dict[tuple, List[str]] = {}
+        self.layout: Optional[tuple] = None
+        self.lock = threading.Lock()  # Watches render on several executor threads
+
+    def format_row(self, row: tuple) -> Tuple[Cell, ...]:
+        cells = []
+        for column, value in zip(self.columns, row):
+            kind = value_kind(value)
+            cell = make_cell(column.format(value), kind)
+            if kind in (BOOL, INT, FLOAT):
+                # tabulate writes every number of a float column with the 'g' format
+                text = format_float(value)
+                if text is not None and text != cell.lines[0]:
+                    cell = cell._replace(number=make_cell(text, kind))
+            cells.append(cell)
+        return tuple(cells)
+
+    def render(self, rows: Iterable[tuple]) -> str:
+        """
+        Render a table.
+
+        Args:
+            rows (Iterable[tuple]): The rows, one value per column.
+
+        Returns:
+            str: The table, without a trailing newline.
+        """
+        with self.lock:
+            cells = {}
+            formatted = []
+            for row in rows:
+                row = tuple(row)
+                key = (row, tuple(map(type, row)))  # 1, 1.0 and True are equal but shown differently
+                try:
+                    hash(key)
+                except TypeError:
+                    formatted.append((None, self.format_row(row)))  # Unhashable values, not cached
+                    continue
+                row_cells = cells.get(key) or self.cells.get(key) or self.format_row(row)
+                cells[key] = row_cells
+                formatted.append((key, row_cells))
+            self.cells = cells
+
+            layout = self.compute_layout([row_cells for _, row_cells in formatted])
+            if any(align == FLOATS for _, _, align in layout):
+                formatted = [(key, self.float_cells(row_cells, layout)) for key, row_cells in formatted]
+            if layout != self.layout:
+                self.layout = layout
+                self.lines = {}
+
+            lines = self.frame_top(layout)
+            body = {}
+            for key, row_cells in formatted:
+                row_lines = body.get(key) or self.lines.get(key) or self.format_lines(row_cells, layout)
+                if key is not None:
+                    body[key] = row_lines
+                lines.extend(row_lines)
+            self.lines = body
+            lines.extend(self.frame_bottom(layout))
+            return "\n".join(lines)
+
+    def compute_layout(self, rows: List[Tuple[Cell, ...]]) -> tuple:
+        """
+        Compute the (width, decimals, alignment) of every column.
+
+        An inferred float column is aligned as FLOATS, its numbers are
+        formatted by format_float.
+        """
+        layout = []
+        for i, column in enumerate(self.columns):
+            align = column.align
+            kind = max((row[i].kind for row in rows), default=MISSING)
+            if align is AUTO:
+                align = FLOATS if kind == FLOAT else DECIMAL if kind == INT else LEFT
+            cells = [row[i] for row in rows]
+            if align == FLOATS:
+                cells = [cell.number or cell for cell in cells]
+            width = len(column.header) + 2  # tabulate's minimum padding of headers
+            decimals = -1
+            if align in (DECIMAL, FLOATS) and cells:
+                decimals = max(cell.decimals for cell in cells)
+                width = max(width, max(cell.width + (decimals - cell.decimals) for cell in cells))
+            else:
+                width = max(width, max((cell.width for cell in cells), default=0))
+            layout.append((width, decimals, align))
+        return tuple(layout)
+
+    @staticmethod
+    def float_cells(row_cells: Tuple[Cell, ...], layout: tuple) -> Tuple[Cell, ...]:
+        return tuple(cell.number or cell if align == FLOATS else cell
+                     for cell, (_, _, align) in zip(row_cells, layout))
+
+    @staticmethod
+    def align(text: str, align: str, width: int) -> str:
+        if align == LEFT:
+            return text.ljust(width)
+        return text.rjust(width)
+
+    def format_lines(self, row_cells: Tuple[Cell, ...], layout: tuple) -> List[str]:
+        height = max((len(cell.lines) for cell in row_cells), default=1)
+        lines = []
+        for line in range(height):
+            texts = []
+            for cell, (width, decimals, align) in zip(row_cells, layout):
+                text = cell.lines[line] if line < len(cell.lines) else ""
+                if align in (DECIMAL, FLOATS) and line == 0:
+                    text += " " * (decimals - cell.decimals)
+                texts.append(self.align(text, align, width))
+            lines.append(self.join(texts))
+        return lines
+
+    def join(self, texts: List[str]) -> str:
+        if self.style == PSQL:
+            return "| " + " | ".join(texts) + " |"
+        return "  ".join(texts).rstrip()
+
+    def frame_top(self, layout: tuple) -> List[str]:
+        headers = [self.align(column.header, align, width) for column, (width, _, align) in zip(self.columns, layout)]
+        if self.style == PSQL:
+            return ["+" + "+".join("-" * (width + 2) for width, _, _ in layout) + "+",
+                    self.join(headers),
+                    "|" + "+".join("-" * (width + 2) for width, _, _ in layout) + "|"]
+        return [self.join(headers), "  ".join("-" * width for width, _, _ in layout)]
+
+    def frame_bottom(self, layout: tuple) -> List[str]:
+        if self.style == PSQL:
+            return ["+" + "+".join("-" * (width + 2) for width, _, _ in layout) + "+"]
+        return []
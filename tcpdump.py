@@ -2,7 +2,9 @@ import subprocess
 import multiprocessing
 import os
 import signal
+import sys
 from scapy.all import *
+from ocpp_stream import DEFAULT_OCPP_PORTS, decode_ocpp_stream, decode_parallel, ocpp_bpf_filter, read_pcap_records
 
 class TcpDumpProcess(multiprocessing.Process):
     def __init__(self, interface, pcap_file, filter):
@@ -31,6 +33,24 @@ def read_packets_from_fifo(fifo_path):
             # Process packet as needed
             print(packet.summary())  # Example: Print a summary of the packet
 
+# Function to read OCPP messages from the FIFO, skipping scapy for packets off the OCPP ports.
+# No command consumes a live capture yet, the example below runs it with --ocpp
+def read_ocpp_messages_from_fifo(fifo_path, ports=DEFAULT_OCPP_PORTS):
+    with open(fifo_path, 'rb') as fifo:
+        yield from decode_ocpp_stream(fifo, ports)
+
+# Function to read OCPP messages from the FIFO with a pool of decoder processes,
+# merged back into capture order. The example below runs it with --ocpp --workers N.
+# Raises ValueError if the FIFO cannot be read as pcap, RuntimeError if a worker fails.
+def read_ocpp_messages_parallel(fifo_path, workers=None, ports=DEFAULT_OCPP_PORTS):
+    def records():
+        with open(fifo_path, 'rb') as fifo:
+            linktype, pcap_records = read_pcap_records(fifo)
+            for record in pcap_records:
+                yield linktype, record
+
+    yield from decode_parallel(records(), workers, ports)
+
 # Example usage
 if __name__ == '__main__':
     # Define the path for the FIFO (named pipe)
@@ -43,13 +63,26 @@ if __name__ == '__main__':
     # Create the FIFO
     os.mkfifo(fifo_path)
 
-    # Start tcpdump process to write packets to the pcap file
-    tcpdump_process = TcpDumpProcess('enp5s0', fifo_path, "host 13.107.42.14")
+    # Start tcpdump process to write packets to the pcap file,
+    # only the OCPP traffic is captured when decoding it
+    ocpp = '--ocpp' in sys.argv[1:]
+    tcpdump_process = TcpDumpProcess('enp5s0', fifo_path, ocpp_bpf_filter() if ocpp else "host 13.107.42.14")
     tcpdump_process.start()
 
     try:
-        # Read packets from the FIFO
-        read_packets_from_fifo(fifo_path)
+        if ocpp:
+            # Decode the OCPP-J messages instead of printing every packet,
+            # with a pool of decoder processes with --workers N
+            if '--workers' in sys.argv[1:]:
+                workers = int(sys.argv[sys.argv.index('--workers') + 1])
+                messages = read_ocpp_messages_parallel(fifo_path, workers)
+            else:
+                messages = read_ocpp_messages_from_fifo(fifo_path)
+            for message in messages:
+                print(message)
+        else:
+            # Read packets from the FIFO
+            read_packets_from_fifo(fifo_path)
     except KeyboardInterrupt:
         # Stop the tcpdump process gracefully
         os.killpg(os.getpgid(tcpdump_process.process.pid), signal.SIGTERM)
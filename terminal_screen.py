@@ -1,15 +1,136 @@
 from prompt_toolkit.application import Application
 from prompt_toolkit.document import Document
 from prompt_toolkit.key_binding import KeyBindings
-from prompt_toolkit.layout.containers import HSplit, Window
+from prompt_toolkit.layout.containers import DynamicContainer, HSplit, VSplit, Window
+from prompt_toolkit.layout.controls import FormattedTextControl
+from prompt_toolkit.layout.dimension import Dimension
+from prompt_toolkit.lexers import Lexer
 from prompt_toolkit.layout.layout import Layout
 from prompt_toolkit.styles import Style
 from prompt_toolkit.widgets import TextArea
 from prompt_toolkit.completion import NestedCompleter
-from typing import Callable, Dict
+from perf import Perf
+from typing import Callable, Coroutine, Dict, Optional
+import asyncio
+import difflib
+import math
 import os
-import threading
-import time
+
+SAFETY_REFRESH_SECONDS = 30.0  # Maximum time between two refreshes of an event watch
+
+
+def parse_interval(value: str) -> float:
+    """
+    Parse the interval argument of a watch.
+
+    Args:
+        value (str): Seconds, as typed.
+
+    Returns:
+        float: The interval in seconds.
+
+    Raises:
+        ValueError: If it is not a positive, finite number ("Invalid interval: <value>").
+    """
+    try:
+        interval = float(value)
+    except ValueError:
+        interval = math.nan
+    if not 0 < interval < math.inf:
+        raise ValueError(f"Invalid interval: {value}")
+    return interval
+
+
+class ChangedLinesLexer(Lexer):
+    """
+    Highlights the lines that changed in the last update of a pane.
+    """
+
+    def __init__(self):
+        self.changed_lines: frozenset = frozenset()
+        self.version = 0
+
+    def set_changed_lines(self, changed_lines: frozenset) -> None:
+        self.changed_lines = changed_lines
+        self.version += 1
+
+    def lex_document(self, document: Document) -> Callable[[int], list]:
+        lines = document.lines
+        changed_lines = self.changed_lines
+
+        def get_line(lineno: int) -> list:
+            if lineno >= len(lines):
+                return []
+            return [("class:changed-line" if lineno in changed_lines else "", lines[lineno])]
+
+        return get_line
+
+    def invalidation_hash(self) -> int:
+        return self.version
+
+
+class WatchPane:
+    """
+    The output pane of a running watch: a title line above its own text area.
+    """
+
+    def __init__(self, watch_id: int, title: str):
+        self.title = f" [{watch_id}] {title}"
+        self.lexer = ChangedLinesLexer()
+        self.text_hash: int = None
+        self.text_area = TextArea(style="class:output-field", read_only=True, focusable=False, lexer=self.lexer)
+        self.container = HSplit(
+            [
+                Window(FormattedTextControl(lambda: self.title), height=1, style="class:pane-title"),
+                self.text_area,
+            ]
+        )
+
+    def update(self, text: str) -> bool:
+        """
+        Show new text, keeping the cursor (and so the scroll position) where it was
+        and highlighting the lines that differ from the previous text.
+
+        Args:
+            text (str): The text to show.
+
+        Returns:
+            bool: False if the text is unchanged and nothing was updated.
+        """
+        text_hash = hash(text)
+        if text_hash == self.text_hash:
+            return False
+        self.text_hash = text_hash
+
+        document = self.text_area.document
+        old_lines = document.lines if document.text else []
+        new_document = Document(text=text)
+        self.lexer.set_changed_lines(self.changed_lines(old_lines, new_document.lines) if old_lines else frozenset())
+
+        row = min(document.cursor_position_row, new_document.line_count - 1)
+        cursor_position = new_document.translate_row_col_to_index(row, document.cursor_position_col)
+        self.text_area.buffer.set_document(Document(text=text, cursor_position=cursor_position), bypass_readonly=True)
+        return True
+
+    @staticmethod
+    def changed_lines(old_lines: list, new_lines: list) -> frozenset:
+        """
+        Find the lines of the new text that were changed or inserted.
+
+        Args:
+            old_lines (list): The previous lines.
+            new_lines (list): The new lines.
+
+        Returns:
+            frozenset: The numbers of the changed lines in new_lines.
+        """
+        if len(old_lines) == len(new_lines):
+            # Table rows updated in place, the common case for a watch
+            return frozenset(i for i, (old, new) in enumerate(zip(old_lines, new_lines)) if old != new)
+        matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+        return frozenset(j for tag, _, _, j1, j2 in matcher.get_opcodes() if tag in ('replace', 'insert')
+                         for j in range(j1, j2))
+
 
 class TerminalScreen:
     def __init__(self,cmds_dir: str):
@@ -17,7 +138,9 @@ class TerminalScreen:
         self.command_handler: Callable[[str], str] = None  # Command handler function
         self.cmds_dir = cmds_dir
         self.completer: NestedCompleter = self.init_nested_cmds()
-        self.running_threads: list[threading.Thread] = []  # List to store running threads
+        self.watches: Dict[int, asyncio.Task] = {}  # Running watches by ID
+        self.panes: Dict[int, WatchPane] = {}  # Output panes of the running watches by ID
+        self.next_watch_id = 1
         
         
         
@@ -37,11 +160,18 @@ class TerminalScreen:
                 ("output-field", "bg:#ffffff #000000"),
                 ("input-field", "bg:#ffffff #000000"),
                 ("line", "#004400"),
+                ("pane-title", "bg:#004400 #ffffff"),
+                ("changed-line", "bg:#ffffaa"),
             ]
         )
 
         # Initialize layout
-        self.output_field = TextArea(style="class:output-field", text=self.help_text)
+        # The command output shrinks to a few lines while watch panes are shown
+        self.output_field = TextArea(
+            style="class:output-field",
+            text=self.help_text,
+            height=lambda: Dimension(min=3, preferred=8) if self.panes else Dimension()
+        )
         self.input_field = TextArea(
             height=1,
             prompt=">>> ",
@@ -53,7 +183,7 @@ class TerminalScreen:
 
         container = HSplit(
             [
-                self.output_field,
+                DynamicContainer(self.build_body),
                 Window(height=1, char="-", style="class:line"),
                 self.input_field,
             ]
@@ -77,56 +207,191 @@ class TerminalScreen:
             style=style,
             mouse_support=True,
             full_screen=True,
+            min_redraw_interval=0.05,  # Coalesce redraws of concurrent watches
         )
         
-    def start_interval_process(self, interval_seconds: float, func: Callable[[], str]):
+    def build_body(self):
+        """
+        Build the area above the input line: the watch panes side by side, then the command output.
+        """
+        if not self.panes:
+            return self.output_field
+        panes = []
+        for pane in self.panes.values():
+            if panes:
+                panes.append(Window(width=1, char="|", style="class:line"))
+            panes.append(pane.container)
+        return HSplit(
+            [
+                VSplit(panes),
+                Window(height=1, char="-", style="class:line"),
+                self.output_field,
+            ]
+        )
+
+    def start_interval_process(self, interval_seconds: float, func: Callable[[], str], title: str = "watch") -> int:
         """
-        Start a subprocess executing a function at specified intervals.
+        Start a watch executing a function at specified intervals, in its own pane.
 
         Args:
             interval_seconds (float): Interval in seconds between function executions.
             func (Callable[[], str]): Function to be executed at intervals, returning a string.
+            title (str): The title of the watch pane.
+
+        Returns:
+            int: The ID of the watch.
         """
-        def execute_func(stop_event: threading.Event):
-            while not stop_event.is_set():
-                output_str = func()  # Execute the provided function
-                self.display(output_str)  # Display the output in the terminal
-                stop_event.wait(interval_seconds)  # Wait for the specified interval
+        async def execute_func(watch_id: int):
+            perf = Perf.get_shared()
+            stage = f"watch {title}"  # One stage per kind of watch, not per watch ID
+            while True:
+                with perf.timer(stage):
+                    self.display(await self.run_blocking(func), watch_id)  # Execute the function off the event loop
+                await asyncio.sleep(interval_seconds)  # Wait for the specified interval
 
-        # Create an event to signal the thread to stop
-        stop_event = threading.Event()
+        return self.start_watch(execute_func, title)
 
-        # Start the interval execution in a separate thread
-        interval_thread = threading.Thread(target=execute_func, args=(stop_event,))
-        interval_thread.daemon = True  # Set as a daemon thread to exit with the main thread
-        interval_thread.start()
-        
-        # Store the thread in the list
-        self.running_threads.append((interval_thread, stop_event))
-        
-    def start_counter_process(self):
+    def start_event_process(self, subscribe: Callable[[Callable[[Optional[set]], None]], Callable[[], None]],
+                            func: Callable[[], str], title: str = "watch", poll_seconds: float = 2.0,
+                            refresh_seconds: float = SAFETY_REFRESH_SECONDS) -> int:
+        """
+        Start a watch executing a function whenever an event is received, in its own pane.
+
+        Until events are confirmed to arrive, and whenever they stop arriving, the
+        watch polls instead. While events arrive it still refreshes every
+        refresh_seconds, in case one was missed.
+
+        Args:
+            subscribe (Callable[[Callable[[Optional[set]], None]], Callable[[], None]]): Called with a
+                callback to call from any thread with the changed keys on each change, with an empty
+                set when events arrive and with None when they do not. Returns the function stopping the calls.
+            func (Callable[[], str]): Function to be executed on each event, returning a string.
+            title (str): The title of the watch pane.
+            poll_seconds (float): Interval in seconds between function executions without events.
+            refresh_seconds (float): Maximum interval in seconds between function executions with events.
+
+        Returns:
+            int: The ID of the watch.
+        """
+        async def execute_func(watch_id: int):
+            loop = asyncio.get_running_loop()
+            perf = Perf.get_shared()
+            stage = f"watch {title}"  # One stage per kind of watch, not per watch ID
+            changed = asyncio.Event()  # Changes arriving while rendering are coalesced into one render
+            push = False
+
+            def on_notify(keys: Optional[set]) -> None:
+                nonlocal push
+                push = keys is not None
+                changed.set()  # Also when switching modes, to catch up on what happened meanwhile
+
+            def notify(keys: Optional[set]) -> None:
+                try:
+                    loop.call_soon_threadsafe(on_notify, keys)
+                except RuntimeError:
+                    pass  # The event loop was closed on exit
+
+            unsubscribe = subscribe(notify)
+            try:
+                self.display(await self.run_blocking(func), watch_id)  # Show the current state before the first change arrives
+                # Waiting for a change does not hold a thread, the subscriber thread is shared by all watches
+                while True:
+                    try:
+                        await asyncio.wait_for(changed.wait(), refresh_seconds if push else poll_seconds)
+                    except asyncio.TimeoutError:
+                        pass  # Polling, or the safety refresh
+                    changed.clear()
+                    with perf.timer(stage):
+                        self.display(await self.run_blocking(func), watch_id)
+            finally:
+                unsubscribe()
+
+        return self.start_watch(execute_func, title)
+
+    def start_counter_process(self) -> int:
         """
-        Start a subprocess printing a counter into the output screen.
+        Start a watch printing a counter into its own pane.
+
+        Returns:
+            int: The ID of the watch.
         """
-        def counter():
+        async def counter(watch_id: int):
             count = 1
             while True:
-                self.display(f"Counter: {count}")
+                self.display(f"Counter: {count}", watch_id)
                 count += 1
-                time.sleep(1)  # Wait for 1 second
+                await asyncio.sleep(1)  # Wait for 1 second
 
-        # Start the counter subprocess in a separate thread
-        counter_thread = threading.Thread(target=counter)
-        counter_thread.daemon = True  # Set as a daemon thread to exit with the main thread
-        counter_thread.start()
-        
-    def  kill_threads(self):
+        return self.start_watch(counter, "counter")
+
+    def start_watch(self, watch_func: Callable[[int], Coroutine], title: str) -> int:
+        """
+        Open a pane and run a watch as a task on the application's event loop.
+        Must be called from the event loop, as command handlers are.
+
+        Args:
+            watch_func (Callable[[int], Coroutine]): Called with the watch ID, returns the watch coroutine.
+            title (str): The title of the watch pane.
+
+        Returns:
+            int: The ID of the watch.
         """
-        Stop all running threads.
+        watch_id = self.next_watch_id
+        self.next_watch_id += 1
+        self.panes[watch_id] = WatchPane(watch_id, title)
+
+        async def run_watch():
+            try:
+                await watch_func(watch_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.display(f"Error: watch {watch_id} stopped: {e}")
+            finally:
+                self.watches.pop(watch_id, None)
+                self.panes.pop(watch_id, None)
+                self.application.invalidate()
+
+        self.watches[watch_id] = self.application.create_background_task(run_watch())
+        return watch_id
+
+    async def run_blocking(self, func: Callable[[], str]) -> str:
+        """
+        Run a blocking function (Redis, file I/O, rendering) on the shared executor.
+
+        Args:
+            func (Callable[[], str]): The function to run.
+
+        Returns:
+            str: The result of the function.
+        """
+        # Profiled when 'show perf profile start' is on
+        return await asyncio.get_running_loop().run_in_executor(None, Perf.get_shared().call, func)
+
+    def kill_watch(self, watch_id: int) -> bool:
+        """
+        Stop a running watch.
+
+        Args:
+            watch_id (int): The ID of the watch.
+
+        Returns:
+            bool: True if the watch was running, False otherwise.
+        """
+        task = self.watches.pop(watch_id, None)
+        if task is None:
+            return False
+        task.cancel()
+        self.panes.pop(watch_id, None)
+        self.application.invalidate()
+        return True
+
+    def kill_watches(self) -> None:
+        """
+        Stop all running watches.
         """
-        for thread, stop_event in self.running_threads:
-            stop_event.set()  # Set the event to signal the thread to stop
-            thread.join()  # Wait for the thread to complete (optional)
+        for watch_id in list(self.watches):
+            self.kill_watch(watch_id)
 
     def run(self):
         self.application.run()
@@ -140,12 +405,43 @@ class TerminalScreen:
     def set_command_handler(self, handler: Callable[[str], str]):
         self.command_handler = handler
 
-    def display(self, text: str) -> None:
-        if text is not None:
-            self.output_field.buffer.document = Document(
-                text=text, cursor_position=len(text)
-            )
+    def display(self, text: str, watch_id: int = None) -> None:
+        """
+        Show text in the pane of a watch, or in the command output if no watch ID is given.
+        Unchanged watch output is skipped by hash, so idle panes cause no redraw.
+
+        Args:
+            text (str): The text to show.
+            watch_id (int): The ID of the watch, None for command output.
+        """
+        if text is None:
+            return
+        loop = self.application.loop
+        if loop is not None and loop.is_running() and not self.in_event_loop(loop):
+            # Only the event loop may touch the UI, hand the text over from other threads
+            loop.call_soon_threadsafe(self.display, text, watch_id)
+            return
+        perf = Perf.get_shared()
+        with perf.timer('terminal.display'):
+            if watch_id is None:
+                self.output_field.buffer.document = Document(
+                    text=text, cursor_position=len(text)
+                )
+            elif watch_id not in self.panes:
+                return  # The watch was killed while rendering
+            elif not self.panes[watch_id].update(text):
+                perf.count('frames.skipped')
+                return
+            else:
+                perf.count('frames.updated')
+            self.application.invalidate()
             
+    def in_event_loop(self, loop: asyncio.AbstractEventLoop) -> bool:
+        try:
+            return asyncio.get_running_loop() is loop
+        except RuntimeError:
+            return False
+
     def init_nested_cmds(self) -> None:
         mydict = self.dir_2_dict(self.cmds_dir, d={})
         try:
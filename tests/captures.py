@@ -0,0 +1,112 @@
+"""
+Builders of small OCPP captures for the tests: WebSocket frames, TCP/IPv4
+packets over Ethernet, and pcap and pcapng files holding them.
+"""
+from typing import List, Optional, Tuple
+import json
+import struct
+
+CENTRAL = '172.22.0.1'
+CENTRAL_PORT = 9000
+
+TCP_ACK = 0x10
+TCP_PSH = 0x08
+
+Packet = Tuple[float, bytes]  # Capture time and Ethernet frame
+
+
+def websocket_frame(payload: bytes, mask: Optional[int] = None, opcode: int = 0x1, fin: bool = True) -> bytes:
+    length = len(payload)
+    first = (0x80 if fin else 0) | opcode
+    mask_bit = 0x80 if mask is not None else 0
+    if length < 126:
+        header = struct.pack('!BB', first, mask_bit | length)
+    elif length < 1 << 16:
+        header = struct.pack('!BBH', first, mask_bit | 126, length)
+    else:
+        header = struct.pack('!BBQ', first, mask_bit | 127, length)
+    if mask is None:
+        return header + payload
+    key = mask.to_bytes(4, 'big')
+    return header + key + bytes(byte ^ key[i % 4] for i, byte in enumerate(payload))
+
+
+def tcp_packet(src: str, sport: int, dst: str, dport: int, seq: int, payload: bytes,
+               flags: int = TCP_PSH | TCP_ACK) -> bytes:
+    tcp = struct.pack('!HHIIBBHHH', sport, dport, seq, 0, 5 << 4, flags, 65535, 0, 0) + payload
+    ip = struct.pack('!BBHHHBBH4s4s', 0x45, 0, 20 + len(tcp), 0, 0, 64, 6, 0,
+                     bytes(map(int, src.split('.'))), bytes(map(int, dst.split('.'))))
+    ethernet = b'\x02\x00\x00\x00\x00\x01' + b'\x02\x00\x00\x00\x00\x02' + b'\x08\x00'
+    return ethernet + ip + tcp
+
+
+def ocpp(*message) -> bytes:
+    return json.dumps(list(message)).encode()
+
+
+class Connection:
+    """
+    A charger's connection to the central system, recording the packets sent both ways.
+    """
+
+    def __init__(self, charger: str, port: int, packets: List[Packet], seq: int = 1000) -> None:
+        self.charger = charger
+        self.port = port
+        self.packets = packets
+        self.seq = {True: seq, False: 5000}  # By direction, True from the charger
+
+    def send(self, payload: bytes, from_charger: bool = True, time: float = None, flags: int = TCP_PSH | TCP_ACK,
+             seq: int = None) -> int:
+        """
+        Send a segment, by default in order. Returns its sequence number.
+        """
+        if seq is None:
+            seq = self.seq[from_charger]
+            self.seq[from_charger] = (seq + len(payload)) & 0xffffffff
+        if from_charger:
+            packet = tcp_packet(self.charger, self.port, CENTRAL, CENTRAL_PORT, seq, payload, flags)
+        else:
+            packet = tcp_packet(CENTRAL, CENTRAL_PORT, self.charger, self.port, seq, payload, flags)
+        self.packets.append((time if time is not None else 1000.0 + len(self.packets), packet))
+        return seq
+
+    def handshake(self) -> None:
+        self.send(b'GET /ocpp/CP1 HTTP/1.1\r\nUpgrade: websocket\r\n\r\n')
+        self.send(b'HTTP/1.1 101 Switching Protocols\r\n\r\n', from_charger=False)
+
+    def call(self, unique_id: str, action: str, payload: dict, time: float = None) -> None:
+        self.send(websocket_frame(ocpp(2, unique_id, action, payload), mask=0x12345678), time=time)
+
+    def result(self, unique_id: str, payload: dict, time: float = None) -> None:
+        self.send(websocket_frame(ocpp(3, unique_id, payload)), from_charger=False, time=time)
+
+    def error(self, unique_id: str, code: str, time: float = None) -> None:
+        self.send(websocket_frame(ocpp(4, unique_id, code, "failed", {})), from_charger=False, time=time)
+
+
+def pcap(packets: List[Packet], nanoseconds: bool = False) -> bytes:
+    magic, scale = (0xa1b23c4d, 1e9) if nanoseconds else (0xa1b2c3d4, 1e6)
+    blocks = [struct.pack('<IHHiIII', magic, 2, 4, 0, 0, 65535, 1)]
+    for timestamp, data in packets:
+        seconds = int(timestamp)
+        fraction = round((timestamp - seconds) * scale)
+        blocks.append(struct.pack('<IIII', seconds, fraction, len(data), len(data)) + data)
+    return b''.join(blocks)
+
+
+def pcapng_block(block_type: int, body: bytes) -> bytes:
+    body += b'\x00' * (-len(body) % 4)
+    length = 12 + len(body)
+    return struct.pack('<II', block_type, length) + body + struct.pack('<I', length)
+
+
+def pcapng(packets: List[Packet], tsresol: int = 6) -> bytes:
+    section = pcapng_block(0x0a0d0d0a, struct.pack('<IHHq', 0x1a2b3c4d, 1, 0, -1))
+    options = struct.pack('<HHB', 9, 1, tsresol) + b'\x00' * 3 + struct.pack('<HH', 0, 0)
+    interface = pcapng_block(1, struct.pack('<HHI', 1, 0, 65535) + options)
+    blocks = [section, interface]
+    for timestamp, data in packets:
+        units = round(timestamp * 10 ** tsresol)
+        blocks.append(pcapng_block(6, struct.pack('<IIIII', 0, units >> 32, units & 0xffffffff,
+                                                  len(data), len(data)) + data))
+    return b''.join(blocks)
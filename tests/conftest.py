@@ -0,0 +1,45 @@
+from typing import Callable, Dict
+import itertools
+import os
+import sys
+import pytest
+
+# The modules live at the root of the repository, next to lcdiags.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PACKAGES = itertools.count()
+
+# A watch, refused without the terminal UI
+WATCH = '''
+class Command():
+    needs_terminal = True
+
+    def __init__(self, cmds, terminal_screen):
+        self.terminal_screen = terminal_screen
+
+    def execute(self):
+        return self.terminal_screen.start_watch()
+'''
+
+
+@pytest.fixture
+def command_package(tmp_path, monkeypatch) -> Callable[[Dict[str, str]], str]:
+    """
+    Build a throwaway commands directory: each path gets a command.py with its source,
+    '{package}' in the sources being replaced by the name of the package. The package
+    is fresh, not cached by an earlier test, and watch counter is always there.
+
+    Returns:
+        Callable[[Dict[str, str]], str]: Builds the package and returns its directory.
+    """
+    def build(commands: Dict[str, str]) -> str:
+        package = f"test_commands_{next(PACKAGES)}"
+        cmds_dir = tmp_path / package
+        for path, source in {'watch/counter': WATCH, **commands}.items():
+            directory = cmds_dir / path
+            directory.mkdir(parents=True)
+            (directory / 'command.py').write_text(source.replace('{package}', package))
+        monkeypatch.syspath_prepend(str(tmp_path))
+        return str(cmds_dir)
+
+    return build
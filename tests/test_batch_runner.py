@@ -0,0 +1,182 @@
+from batch_runner import BatchRunner
+from cmd_dispatcher import CmdDispatcher
+from io import StringIO
+import importlib
+import json
+import os
+import subprocess
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STATE = '''
+import threading
+
+events = []
+barrier = threading.Barrier(4)
+'''
+
+SHOW = '''
+import time
+from {package}_state import barrier, events
+
+class Command():
+    read_only = True
+
+    def __init__(self, cmds, terminal_screen=None):
+        self.cmds = cmds
+
+    def execute(self):
+        if self.cmds[2] == 'together':
+            barrier.wait(timeout=10)  # Broken unless four of them run at the same time
+        else:
+            time.sleep(float(self.cmds[2]))
+        events.append(self.cmds[1])
+        return "shown " + self.cmds[1] + " after " + ",".join(events)
+
+    def records(self):
+        events.append(self.cmds[1])
+        yield {'record': 'shown', 'name': self.cmds[1]}
+'''
+
+SET = '''
+from {package}_state import events
+
+class Command():
+    def __init__(self, cmds, terminal_screen=None):
+        self.cmds = cmds
+
+    def execute(self):
+        print("setting " + self.cmds[1])
+        events.append("set " + self.cmds[1])
+        return "set " + self.cmds[1]
+'''
+
+FAIL = '''
+class Command():
+    def __init__(self, cmds, terminal_screen=None):
+        pass
+
+    def execute(self):
+        raise RuntimeError("boom")
+
+    def records(self):
+        raise RuntimeError("boom")
+'''
+
+
+@pytest.fixture
+def batch(command_package, tmp_path):
+    """
+    A runner over the commands show <name> <seconds|together>, set <name>, fail and watch counter,
+    and the list of the events of the commands, in the order they ran.
+    """
+    cmds_dir = command_package({'show': SHOW, 'set': SET, 'fail': FAIL})
+    state = f"{os.path.basename(cmds_dir)}_state"
+    (tmp_path / f"{state}.py").write_text(STATE)
+    return BatchRunner(CmdDispatcher(cmds_dir), cmds_dir, workers=4), importlib.import_module(state).events
+
+
+def test_outputs_are_written_in_line_order(batch):
+    runner, _ = batch
+    output = StringIO()
+
+    failures = runner.run(["show a 0.2", "", "# comment", "show b 0", "show c 0.1"], output)
+
+    assert failures == 0
+    lines = output.getvalue().splitlines()
+    assert lines[0::2] == [">>> show a 0.2", ">>> show b 0", ">>> show c 0.1"]
+    assert [line.split(" after ")[0] for line in lines[1::2]] == ["shown a", "shown b", "shown c"]
+
+
+def test_read_only_commands_run_concurrently(batch):
+    runner, events = batch
+    output = StringIO()
+
+    assert runner.run([f"show {i} together" for i in range(4)], output) == 0
+
+    assert sorted(events) == ['0', '1', '2', '3']
+    assert "Error" not in output.getvalue()
+
+
+def test_other_commands_wait_for_the_lines_before_them(batch, capsys):
+    runner, events = batch
+    output = StringIO()
+
+    runner.run(["show a 0.2", "show b 0.1", "set x", "show c 0"], output)
+
+    assert events[2:] == ["set x", "c"]
+    assert sorted(events[:2]) == ["a", "b"]
+    assert output.getvalue().endswith(">>> set x\nset x\n>>> show c 0\nshown c after " + ",".join(events) + "\n")
+    assert capsys.readouterr().out == "setting x\n"
+
+
+def test_failures_are_reported_and_counted(batch):
+    runner, _ = batch
+    output = StringIO()
+
+    assert runner.run(["fail", "show a 0", "fail"], output) == 2
+    assert output.getvalue().count("Error: fail: RuntimeError('boom')") == 2
+    assert "shown a" in output.getvalue()
+
+
+def test_structured_batches_are_one_document(batch, capsys):
+    runner, events = batch
+    runner.dispatcher.output_format = 'json'
+    output = StringIO()
+
+    failures = runner.run(["show a 0", "set x", "fail", "show b 0"], output)
+
+    assert json.loads(output.getvalue()) == [{'record': 'shown', 'name': 'a'}, {'record': 'shown', 'name': 'b'}]
+    assert failures == 1
+    assert events == ["a", "b"]
+    messages = capsys.readouterr().err
+    assert "Error: set x has no json output" in messages
+    assert "RuntimeError('boom')" in messages
+
+
+def test_terminal_commands_are_rejected_before_anything_runs(batch, capsys):
+    runner, events = batch
+    output = StringIO()
+
+    assert runner.run(["set x", "watch counter 2", "show a 0", "watch counter"], output) == 2
+    assert events == []
+    assert output.getvalue() == ""
+    assert capsys.readouterr().err.splitlines() == ["Error: watch counter 2: not available in batch mode",
+                                                    "Error: watch counter: not available in batch mode"]
+
+
+def test_unknown_commands_are_rejected_before_anything_runs(batch, capsys):
+    runner, events = batch
+    output = StringIO()
+
+    assert runner.run(["set x", "shwo a 0", "show ?", "nothing"], output) == 2
+    assert events == []
+    assert capsys.readouterr().err.splitlines() == ["Error: shwo a 0: command not implemented",
+                                                    "Error: nothing: command not implemented"]
+
+
+def test_lcdiags_exits_with_an_error_for_rejected_batches():
+    result = subprocess.run([sys.executable, 'lcdiags.py', '--batch', '-'], cwd=ROOT, input="watch counter 1\n",
+                            capture_output=True, text=True, timeout=60)
+
+    assert result.returncode == 1
+    assert "watch counter 1: not available in batch mode" in result.stderr
+
+
+@pytest.mark.parametrize('lines', ["shwo site-status\n", "show nothing\n"])
+def test_lcdiags_exits_with_an_error_for_unknown_commands(lines):
+    result = subprocess.run([sys.executable, 'lcdiags.py', '--batch', '-'], cwd=ROOT, input=lines,
+                            capture_output=True, text=True, timeout=60)
+
+    assert result.returncode == 1
+    assert "command not implemented" in result.stderr
+
+
+def test_lcdiags_exits_with_an_error_for_missing_batch_files(tmp_path):
+    result = subprocess.run([sys.executable, 'lcdiags.py', '--batch', str(tmp_path / 'missing.batch')], cwd=ROOT,
+                            capture_output=True, text=True, timeout=60)
+
+    assert result.returncode == 2
+    assert "cannot open batch file" in result.stderr
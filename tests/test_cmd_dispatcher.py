@@ -0,0 +1,108 @@
+from cmd_dispatcher import CmdDispatcher
+import json
+import pytest
+
+ECHO = '''
+class Command():
+    def __init__(self, cmds, terminal_screen=None):
+        self.cmds = cmds
+
+    def execute(self):
+        return " ".join(self.cmds)
+'''
+
+STATUS = '''
+class Command():
+    read_only = True
+
+    def __init__(self, cmds, terminal_screen=None):
+        self.cmds = cmds
+
+    def execute(self):
+        return "status"
+
+    def records(self):
+        yield {'record': 'status', 'args': self.cmds[2:]}
+'''
+
+
+@pytest.fixture
+def commands(command_package):
+    """
+    A commands directory: echo, show status, show broken and watch counter.
+    """
+    return command_package({'echo': ECHO, 'show/status': STATUS, 'show/broken': "raise ImportError('broken')"})
+
+
+@pytest.fixture
+def dispatcher(commands):
+    return CmdDispatcher(commands)
+
+
+def test_find_node_stops_at_the_deepest_command(dispatcher, commands):
+    dispatcher.registry = dispatcher.build_registry(commands)
+
+    node = dispatcher.find_node(['show', 'status', 'extra', 'words'])
+
+    assert node.module_name.endswith('show.status.command')
+    assert sorted(dispatcher.find_node(['show']).children) == ['broken', 'status']
+    assert dispatcher.find_node(['nothing']) is dispatcher.registry
+
+
+def test_dispatch_passes_the_remaining_words_as_arguments(dispatcher, commands):
+    assert dispatcher.dispatch("echo a 'b c'", commands, None) == "echo a b c"
+
+
+def test_q_exits_only_as_the_first_word(dispatcher, commands):
+    assert dispatcher.dispatch("echo q", commands, None) == "echo q"
+    with pytest.raises(SystemExit):
+        dispatcher.dispatch("q", commands, None)
+
+
+def test_question_mark_lists_subcommands_only_as_the_last_word(dispatcher, commands, capsys):
+    assert dispatcher.dispatch("show ?", commands, None) is None
+    assert capsys.readouterr().out.split() == ['broken', 'status']
+
+    assert dispatcher.dispatch("echo ? x", commands, None) == "echo ? x"
+
+    dispatcher.dispatch("echo ?", commands, None)
+    assert capsys.readouterr().out == "No subcommands\n"
+
+
+def test_unknown_commands_are_reported(dispatcher, commands, capsys):
+    assert dispatcher.dispatch("nothing here", commands, None) is None
+    assert "Command not implemented: nothing here" in capsys.readouterr().out
+
+
+def test_import_errors_are_returned(dispatcher, commands):
+    assert dispatcher.dispatch("show broken", commands, None) == "broken"
+
+
+def test_command_classes_are_imported_once(dispatcher, commands):
+    dispatcher.dispatch("echo", commands, None)
+    command_class = dispatcher.get_command_class(dispatcher.find_node(['echo']))
+
+    dispatcher.dispatch("echo again", commands, None)
+
+    assert dispatcher.get_command_class(dispatcher.find_node(['echo'])) is command_class
+
+
+def test_flags_are_read_from_the_command_classes(dispatcher, commands):
+    assert dispatcher.is_read_only("show status --format json", commands)
+    assert not dispatcher.is_read_only("echo", commands)
+    assert not dispatcher.is_read_only("nothing", commands)
+    assert not dispatcher.is_read_only("show broken", commands)
+    assert dispatcher.needs_terminal("watch counter 2", commands)
+    assert not dispatcher.needs_terminal("show status", commands)
+
+
+def test_terminal_commands_are_refused_without_a_terminal(dispatcher, commands):
+    assert dispatcher.dispatch("watch counter", commands, None).startswith("Error: watch counter is not available")
+
+
+def test_structured_output_comes_from_the_records(dispatcher, commands):
+    output = dispatcher.dispatch("show status x --format json", commands, None)
+
+    assert json.loads(output) == [{'record': 'status', 'args': ['x']}]
+    assert dispatcher.dispatch("echo --format csv", commands, None) == "Error: echo has no csv output"
+    assert dispatcher.dispatch("echo --format xml", commands, None).startswith("Error: Unknown format xml")
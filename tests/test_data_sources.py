@@ -0,0 +1,171 @@
+from data_sources import DataSource, SnapshotLoader
+from site_history import SiteHistory
+from status_change_tracker import StatusChangeTracker
+import json
+import os
+import threading
+import time
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # The sample payloads
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Fetch:
+    """
+    Returns the next value on every call, and counts the calls.
+    """
+
+    def __init__(self, *values) -> None:
+        self.values = list(values)
+        self.calls = 0
+
+    def __call__(self, *args):
+        self.calls += 1
+        return self.values[min(self.calls, len(self.values)) - 1]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, 'monotonic', clock)
+    return clock
+
+
+def test_values_are_reused_for_ttl_seconds(clock):
+    fetch = Fetch('a', 'b')
+    source = DataSource('s', fetch, ttl=2.0)
+
+    assert source.get() == 'a'
+    clock.now += 1.9
+    assert source.get() == 'a'
+    assert fetch.calls == 1
+
+    clock.now += 0.1
+    assert source.get() == 'b'
+    assert fetch.calls == 2
+    assert source.version == 2
+
+
+def test_invalidate_fetches_again(clock):
+    fetch = Fetch('a', 'b')
+    source = DataSource('s', fetch, ttl=60.0)
+    source.get()
+
+    source.invalidate()
+
+    assert source.get() == 'b'
+
+
+def test_derived_values_follow_the_parent_version(clock):
+    first, second = ['first'], ['second']
+    parent = DataSource('parent', Fetch(first, first, second), ttl=1.0)
+    derive = Fetch('x', 'y')
+    derived = DataSource('derived', derive, parent=parent)
+
+    assert derived.get() == 'x'
+    clock.now += 1.0
+    assert derived.get() == 'x'  # The parent fetched the same object again
+    assert derive.calls == 1
+
+    clock.now += 1.0
+    assert derived.get() == 'y'
+    assert derive.calls == 2
+
+
+def test_invalidating_a_derived_source_invalidates_its_parent(clock):
+    parent_fetch = Fetch('a', 'b')
+    parent = DataSource('parent', parent_fetch, ttl=60.0)
+    derived = DataSource('derived', lambda value: value.upper(), parent=parent)
+    assert derived.get() == 'A'
+
+    derived.invalidate()
+
+    assert derived.get() == 'B'
+    assert parent_fetch.calls == 2
+
+
+def test_concurrent_callers_share_one_fetch():
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.05)
+        return 'value'
+
+    source = DataSource('s', fetch, ttl=60.0)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(source.get())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ['value'] * 8
+    assert len(calls) == 1
+
+
+class FakeRedis:
+    def __init__(self, site_status: bytes, charging_stations_status: bytes) -> None:
+        self.values = [site_status, charging_stations_status]
+
+    def get_raw_values(self, keys):
+        return list(self.values)
+
+
+class Recorder:
+    def update(self, *args):
+        pass
+
+    def record(self, *args):
+        pass
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    # The shared tracker and history would write files and keep samples
+    monkeypatch.setattr(StatusChangeTracker, 'get_shared', classmethod(lambda cls: Recorder()))
+    monkeypatch.setattr(SiteHistory, 'get_shared', classmethod(lambda cls: Recorder()))
+    with open(os.path.join(ROOT, 'site_status.json'), 'rb') as site_status, \
+            open(os.path.join(ROOT, 'charging_stations_status.json'), 'rb') as stations:
+        return FakeRedis(site_status.read(), stations.read())
+
+
+def test_unchanged_payloads_keep_the_parsed_snapshot(redis):
+    loader = SnapshotLoader(redis)
+    snapshot = loader.load()
+
+    redis.values = [bytes(value) for value in redis.values]  # Equal bytes, other objects
+
+    assert loader.load() is snapshot
+
+
+def test_changed_payloads_are_parsed_again(redis):
+    loader = SnapshotLoader(redis)
+    snapshot = loader.load()
+    site_status = json.loads(redis.values[0])
+    site_status['action'] = 'changed'
+
+    redis.values[0] = json.dumps(site_status).encode()
+
+    assert loader.load() is not snapshot
+    assert loader.load().site_status.action == 'changed'
+    assert loader.load().charging_stations_status == snapshot.charging_stations_status
+
+
+def test_missing_or_invalid_payloads_give_empty_models(redis, capsys):
+    loader = SnapshotLoader(redis)
+    redis.values = [None, b'{not json']
+
+    snapshot = loader.load()
+
+    assert snapshot.site_status.evs == ()
+    assert snapshot.charging_stations_status.chargers == ()
+    assert "Unable to decode charging stations status" in capsys.readouterr().out
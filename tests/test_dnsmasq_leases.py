@@ -0,0 +1,96 @@
+from dnmasq_leases import DnsmasqLeases
+import os
+import pytest
+
+LEASES = """1711017257 3a:67:30:61:1d:26 172.22.0.20 * *
+1711014315 3e:62:72:79:77:4b 172.22.0.139 charger-2 01:3e:62:72:79:77:4b
+1711014277 0e:67:34:61:29:24 172.22.0.106 * *
+1711019999 3a:67:30:61:1d:26 172.22.0.21 * *
+truncated line
+"""
+
+
+@pytest.fixture
+def leases(tmp_path, monkeypatch):
+    """
+    A leases file and its reader, counting the parses.
+    """
+    monkeypatch.chdir(tmp_path)  # Away from the fallback to a leases file in the working directory
+    path = tmp_path / 'leases'
+    path.write_text(LEASES)
+    reader = DnsmasqLeases(str(path))
+    parse_leases = reader.parse_leases
+    reader.parses = 0
+
+    def counted(file):
+        reader.parses += 1
+        return parse_leases(file)
+
+    reader.parse_leases = counted
+    return path, reader
+
+
+def test_entries_are_indexed_by_ip_and_mac(leases):
+    _, reader = leases
+
+    reader.read_leases()
+
+    assert len(reader.entries) == 4
+    assert reader.get_mac_from_ip('172.22.0.139') == '3e:62:72:79:77:4b'
+    assert reader.get_lease_epoch_from_ip('172.22.0.139') == 1711014315
+    assert reader.get_ip_from_mac('3a:67:30:61:1d:26') == '172.22.0.20'  # The first entry wins
+    assert reader.entries_by_ip['172.22.0.139']['hostname'] == 'charger-2'
+    assert reader.get_mac_from_ip('10.0.0.1') is None
+    assert reader.get_lease_epoch_from_ip('10.0.0.1') is None
+    assert reader.get_ip_from_mac('00:00:00:00:00:00') is None
+
+
+def test_the_file_is_only_parsed_again_when_it_changed(leases):
+    path, reader = leases
+    reader.read_leases()
+    reader.read_leases()
+    assert reader.parses == 1
+
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))  # Same size, touched
+    reader.read_leases()
+    assert reader.parses == 2
+
+    path.write_text(LEASES + "1711020000 aa:bb:cc:dd:ee:ff 172.22.0.30 * *\n")  # Grown
+    reader.read_leases()
+    assert reader.parses == 3
+    assert reader.get_ip_from_mac('aa:bb:cc:dd:ee:ff') == '172.22.0.30'
+
+
+def test_a_replaced_file_is_parsed_again(leases, tmp_path):
+    path, reader = leases
+    reader.read_leases()
+    stat = path.stat()
+    replacement = tmp_path / 'leases.new'
+    replacement.write_text(LEASES.replace('172.22.0.139', '172.22.0.140'))
+    os.utime(replacement, ns=(stat.st_atime_ns, stat.st_mtime_ns))  # Same size and mtime, new inode
+
+    os.replace(replacement, path)
+    reader.read_leases()
+
+    assert reader.parses == 2
+    assert reader.get_mac_from_ip('172.22.0.140') == '3e:62:72:79:77:4b'
+    assert reader.get_mac_from_ip('172.22.0.139') is None
+
+
+def test_leases_of_a_removed_file_are_not_served(leases, capsys):
+    path, reader = leases
+    reader.read_leases()
+    signature = reader.signature
+
+    path.unlink()
+    reader.read_leases()
+
+    assert reader.entries == []
+    assert reader.get_mac_from_ip('172.22.0.139') is None
+    assert reader.signature != signature  # Watches see the change
+    assert "not found" in capsys.readouterr().out
+
+    path.write_text(LEASES)
+    reader.read_leases()
+    assert reader.get_mac_from_ip('172.22.0.139') == '3e:62:72:79:77:4b'
@@ -0,0 +1,86 @@
+from benchmarks import fixtures
+from cgw_config import CgwConfig
+from charging_stations_status import ChargingStationsStatus
+from json_codec import DecodeError, decode, dumps, loads
+from site_status import SiteStatus
+import json
+import json_codec
+import os
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+needs_msgspec = pytest.mark.skipif(json_codec.msgspec is None, reason="msgspec is not installed")
+
+
+def read(filename: str) -> bytes:
+    with open(os.path.join(ROOT, filename), 'rb') as file:
+        return file.read()
+
+
+def from_json(data: bytes, model: type):
+    """
+    Decode through the fallback path of the installs without msgspec.
+    """
+    return model.from_json(json.loads(data))
+
+
+@needs_msgspec
+@pytest.mark.parametrize('filename, model', [
+    ('site_status.json', SiteStatus),
+    ('charging_stations_status.json', ChargingStationsStatus),
+    ('cgw_config.json', CgwConfig),
+])
+def test_msgspec_matches_from_json_on_the_samples(filename, model):
+    data = read(filename)
+
+    assert json_codec.get_decoder(model).decode(data) == from_json(data, model)
+
+
+@needs_msgspec
+@pytest.mark.parametrize('payload, model', [
+    (fixtures.site_status(50), SiteStatus),
+    (fixtures.charging_stations_status(50), ChargingStationsStatus),
+    (fixtures.cgw_config(50), CgwConfig),
+])
+def test_msgspec_matches_from_json_on_generated_sites(payload, model):
+    data = json.dumps(payload).encode()
+
+    assert json_codec.get_decoder(model).decode(data) == from_json(data, model)
+
+
+def test_missing_keys_and_nulls_decode_like_from_json():
+    site_status = json.loads(read('site_status.json'))
+    ev = site_status['evs'][0]
+    ev['charge_current'] = None  # Rejected by the msgspec annotations
+    del ev['rfid']
+    site_status['offline_chargers'] = None
+    data = json.dumps(site_status).encode()
+
+    decoded = decode(data, SiteStatus)
+
+    assert decoded == from_json(data, SiteStatus)
+    assert decoded.evs[0].charge_current == ()
+    assert decoded.evs[0].rfid is None
+    assert decoded.offline_chargers == ()
+
+
+@pytest.mark.parametrize('data', [b'{"evs": [', b'', b'nul'])
+def test_invalid_json_raises_decode_error(data):
+    with pytest.raises(DecodeError):
+        decode(data, SiteStatus)
+
+
+def test_payloads_of_the_wrong_shape_raise_decode_error():
+    with pytest.raises(DecodeError):
+        decode(b'[1, 2]', ChargingStationsStatus)
+
+
+def test_dumps_round_trips_through_loads():
+    document = {'record': 'ev', 'id': None, 'current': [16.0, 0.5], 'name': "Grün", 'ok': True}
+
+    text = dumps(document)
+
+    assert isinstance(text, str)
+    assert '\n' not in text
+    assert loads(text) == document
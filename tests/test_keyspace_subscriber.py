@@ -0,0 +1,161 @@
+from redis_handler import KeyspaceSubscriber
+import queue
+import redis
+import time
+import pytest
+
+PREFIX = "__keyspace@0__:"
+
+
+class FakePubSub:
+    """
+    The pubsub of FakeHandler: messages, or exceptions to raise, are queued by the test.
+    """
+
+    def __init__(self, handler: 'FakeHandler') -> None:
+        self.handler = handler
+        self.channels = set()
+        self.closed = False
+
+    def subscribe(self, *channels) -> None:
+        self.channels.update(channels)
+
+    def unsubscribe(self, *channels) -> None:
+        self.channels.difference_update(channels)
+
+    def get_message(self, timeout: float):
+        try:
+            item = self.handler.messages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if isinstance(item, Exception):
+            raise item
+        return {'channel': (PREFIX + item).encode()}
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class FakeHandler:
+    db = 0
+
+    def __init__(self) -> None:
+        self.enabled = True
+        self.messages = queue.Queue()
+        self.pubsubs = []
+        self.redis_client = self
+
+    def keyspace_notifications_enabled(self) -> bool:
+        return self.enabled
+
+    def pubsub(self, ignore_subscribe_messages: bool) -> FakePubSub:
+        self.pubsubs.append(FakePubSub(self))
+        return self.pubsubs[-1]
+
+
+class Listener:
+    """
+    A watch's callback, recording what it is called with.
+    """
+
+    def __init__(self) -> None:
+        self.calls = queue.Queue()
+
+    def __call__(self, keys) -> None:
+        self.calls.put(keys)
+
+    def next(self):
+        return self.calls.get(timeout=5)
+
+
+def wait_for(condition) -> None:
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def handler():
+    return FakeHandler()
+
+
+@pytest.fixture
+def subscriber(handler):
+    subscriber = KeyspaceSubscriber(handler, timeout=0.01, check_seconds=3600, retry_seconds=0.01)
+    yield subscriber
+    subscriber.listeners.clear()  # The thread ends
+    subscriber.wakeup.set()
+
+
+def test_listeners_are_told_about_their_keys_only(handler, subscriber):
+    site, both = Listener(), Listener()
+    subscriber.subscribe(['SiteStatus'], site)
+    subscriber.subscribe(['SiteStatus', 'ChargingStationsStatus'], both)
+    assert site.next() == set() and both.next() == set()  # Notifications are received
+    wait_for(lambda: len(handler.pubsubs[0].channels) == 2)
+
+    handler.messages.put('ChargingStationsStatus')
+    handler.messages.put('SiteStatus')  # Coalesced with the first one
+
+    assert both.next() == {'ChargingStationsStatus', 'SiteStatus'}
+    assert site.next() == {'SiteStatus'}
+
+
+def test_listeners_poll_while_notifications_are_off(handler, subscriber):
+    handler.enabled = False
+    listener = Listener()
+
+    subscriber.subscribe(['SiteStatus'], listener)
+    assert listener.next() is None
+    handler.enabled = True
+
+    assert listener.next() == set()
+
+
+@pytest.mark.parametrize('error', [redis.exceptions.ConnectionError("lost"),
+                                   redis.exceptions.ResponseError("LOADING Redis is loading the dataset")])
+def test_server_errors_switch_to_polling_and_back(handler, subscriber, error):
+    listener = Listener()
+    subscriber.subscribe(['SiteStatus'], listener)
+    assert listener.next() == set()
+
+    handler.messages.put(error)
+
+    assert listener.next() is None
+    assert listener.next() == set()  # Subscribed again
+    assert handler.pubsubs[0].closed and len(handler.pubsubs) == 2
+    handler.messages.put('SiteStatus')
+    assert listener.next() == {'SiteStatus'}
+
+
+@pytest.mark.filterwarnings('ignore::pytest.PytestUnhandledThreadExceptionWarning')
+def test_a_thread_ended_by_an_unexpected_error_is_restarted(handler, subscriber):
+    listener = Listener()
+    subscriber.subscribe(['SiteStatus'], listener)
+    assert listener.next() == set()
+    thread = subscriber.thread
+
+    handler.messages.put(ValueError("unexpected"))
+    thread.join(5)
+
+    assert subscriber.thread is None
+    subscriber.subscribe(['SiteStatus'], Listener())
+    assert subscriber.thread is not None and subscriber.thread is not thread
+    handler.messages.put('SiteStatus')
+    assert listener.next() == set()  # Told again that notifications are received
+    assert listener.next() == {'SiteStatus'}
+
+
+def test_the_thread_stops_with_the_last_listener(handler, subscriber):
+    listener = Listener()
+    unsubscribe = subscriber.subscribe(['SiteStatus'], listener)
+    assert listener.next() == set()
+    thread = subscriber.thread
+
+    unsubscribe()
+    thread.join(5)
+
+    assert not thread.is_alive()
+    assert subscriber.thread is None
+    assert handler.pubsubs[0].closed
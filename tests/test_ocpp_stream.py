@@ -0,0 +1,226 @@
+from captures import CENTRAL, CENTRAL_PORT, Connection, ocpp, pcap, tcp_packet, websocket_frame
+from io import BytesIO
+from ocpp_stream import (LINKTYPE_ETHERNET, OcppMessage, OcppStreamDecoder, PcapRecord, TCP_SYN, TcpStream,
+                         decode_ocpp_stream, decode_parallel, merge_by_timestamp, ocpp_bpf_filter, parse_tcp_segment,
+                         read_mapped_records, read_pcap_records)
+import random
+import pytest
+
+
+def messages(stream: TcpStream) -> list:
+    return list(stream.messages())
+
+
+def test_tcp_segments_are_parsed_from_ethernet_frames():
+    packet = tcp_packet('172.22.0.10', 40000, CENTRAL, CENTRAL_PORT, 4242, b'payload')
+
+    segment = parse_tcp_segment(LINKTYPE_ETHERNET, packet)
+
+    assert segment == ('172.22.0.10', 40000, CENTRAL, CENTRAL_PORT, 4242, 0x18, b'payload')
+    assert parse_tcp_segment(LINKTYPE_ETHERNET, packet[:30]) is None
+    assert parse_tcp_segment(12345, packet) is None
+
+
+def test_in_order_segments_are_split_into_messages():
+    stream = TcpStream()
+    data = websocket_frame(b'first', mask=0x01020304) + websocket_frame(b'second')
+
+    stream.add(100, 0, data[:4])
+    assert messages(stream) == []
+    stream.add(104, 0, data[4:])
+
+    assert messages(stream) == [b'first', b'second']
+
+
+def test_out_of_order_segments_wait_for_the_gap():
+    stream = TcpStream()
+    frame = websocket_frame(b'x' * 300)
+    stream.add(99, TCP_SYN, b'')
+
+    stream.add(200, 0, frame[100:200])
+    stream.add(300, 0, frame[200:])
+    assert messages(stream) == []
+    stream.add(100, 0, frame[:100])
+
+    assert messages(stream) == [b'x' * 300]
+    assert stream.pending == {}
+
+
+def test_retransmitted_and_overlapping_data_is_dropped():
+    stream = TcpStream()
+    frame = websocket_frame(b'abcdefgh')
+    stream.add(1, 0, frame[:6])
+
+    stream.add(1, 0, frame[:6])  # Retransmission
+    stream.add(4, 0, frame[3:])  # Overlaps the received data
+
+    assert messages(stream) == [b'abcdefgh']
+
+
+def test_sequence_numbers_wrap_around():
+    stream = TcpStream()
+    frame = websocket_frame(b'wrapped')
+
+    stream.add(0xfffffffc, 0, frame[:4])
+    stream.add(0, 0, frame[4:])
+
+    assert messages(stream) == [b'wrapped']
+
+
+def test_fragmented_messages_are_joined_and_control_frames_skipped():
+    stream = TcpStream()
+    stream.add(1, 0, websocket_frame(b'hello ', opcode=0x1, fin=False)
+               + websocket_frame(b'', opcode=0x9)  # Ping between fragments
+               + websocket_frame(b'world', opcode=0x0, fin=True))
+
+    assert messages(stream) == [b'hello world']
+
+
+def test_the_http_handshake_is_skipped():
+    stream = TcpStream()
+    stream.add(1, 0, b'GET /ocpp/CP1 HTTP/1.1\r\nUpgrade: websocket\r\n')
+    assert messages(stream) == []
+
+    stream.add(45, 0, b'\r\n' + websocket_frame(b'after'))
+
+    assert messages(stream) == [b'after']
+
+
+def test_results_and_errors_take_the_action_of_their_call():
+    packets = []
+    connection = Connection('172.22.0.10', 40000, packets)
+    connection.handshake()
+    connection.call('1', 'Heartbeat', {})
+    connection.result('1', {'currentTime': 'now'})
+    connection.call('2', 'MeterValues', {'connectorId': 1})
+    connection.error('2', 'InternalError')
+    decoder = OcppStreamDecoder()
+
+    decoded = [message for timestamp, data in packets
+               for message in decoder.feed(LINKTYPE_ETHERNET, PcapRecord(timestamp, data))]
+
+    assert [(m.charger, m.message_type, m.unique_id, m.action) for m in decoded] == [
+        ('172.22.0.10', 2, '1', 'Heartbeat'),
+        ('172.22.0.10', 3, '1', 'Heartbeat'),
+        ('172.22.0.10', 2, '2', 'MeterValues'),
+        ('172.22.0.10', 4, '2', 'MeterValues'),
+    ]
+    assert decoded[1].payload == {'currentTime': 'now'}
+    assert decoded[3].payload['errorCode'] == 'InternalError'
+    assert decoded[0].src == '172.22.0.10:40000'
+
+
+def test_the_capture_filter_keeps_the_ocpp_ports():
+    assert ocpp_bpf_filter((9000,)) == "tcp and (port 9000)"
+    assert ocpp_bpf_filter() == "tcp and (port 80 or port 8080 or port 8180 or port 9000)"
+
+
+def test_traffic_on_other_ports_is_ignored():
+    decoder = OcppStreamDecoder(ports=(9000,))
+    payload = websocket_frame(ocpp(2, '1', 'Heartbeat', {}))
+
+    other = tcp_packet('10.0.0.1', 1234, '10.0.0.2', 22, 1, payload)
+
+    assert list(decoder.feed(LINKTYPE_ETHERNET, PcapRecord(0.0, other))) == []
+    assert decoder.streams == {}
+
+
+@pytest.mark.parametrize('nanoseconds', [False, True])
+def test_pcap_streams_are_decoded_as_they_are_read(nanoseconds):
+    packets = []
+    connection = Connection('172.22.0.11', 40001, packets)
+    connection.handshake()
+    connection.call('7', 'BootNotification', {'chargePointModel': 'X'}, time=1700000000.25)
+    stream = BytesIO(pcap(packets, nanoseconds=nanoseconds))
+
+    decoded = list(decode_ocpp_stream(stream))
+
+    assert [(m.unique_id, m.action) for m in decoded] == [('7', 'BootNotification')]
+    assert decoded[0].timestamp == pytest.approx(1700000000.25)
+
+
+def test_truncated_pcap_streams_end_cleanly():
+    packets = []
+    Connection('172.22.0.12', 40002, packets).call('1', 'Heartbeat', {})
+    data = pcap(packets)
+
+    linktype, records = read_pcap_records(BytesIO(data[:-3]))
+
+    assert linktype == LINKTYPE_ETHERNET
+    assert list(records) == []
+    with pytest.raises(ValueError):
+        read_pcap_records(BytesIO(b'not a capture' * 4))
+
+
+def message(timestamp: float) -> tuple:
+    return tuple(OcppMessage(timestamp, 'charger', 'src', 'dst', 2, str(timestamp), 'Heartbeat', {}))
+
+
+def test_worker_results_are_merged_by_timestamp():
+    results = [
+        (0, [message(1.0), message(4.0)], 4.0),  # Worker 1 has not answered, nothing is released
+        (1, [], 2.0),
+        (1, [message(3.0), message(5.0)], 5.0),
+        (0, None, float('inf')),
+        (1, [message(6.0)], 6.0),
+        (1, None, float('inf')),
+    ]
+    merged = []
+    released = []  # What was merged when each result was taken
+
+    def answers():
+        for result in results:
+            released.append([m.timestamp for m in merged])
+            yield result
+
+    merged.extend(merge_by_timestamp(answers(), workers=2))
+
+    assert [m.timestamp for m in merged] == [1.0, 3.0, 4.0, 5.0, 6.0]
+    assert released == [[], [], [1.0], [1.0, 3.0, 4.0], [1.0, 3.0, 4.0, 5.0], [1.0, 3.0, 4.0, 5.0, 6.0]]
+
+
+@pytest.fixture
+def busy_site():
+    """
+    Twenty chargers calling in random interleaving, answered after a random delay.
+    """
+    rng = random.Random(9)
+    events = []
+    connections = []
+    packets = []
+    for i in range(20):
+        connection = Connection(f'172.22.0.{10 + i}', 40000 + i, [])
+        connection.handshake()
+        connections.append(connection)
+        for n in range(15):
+            time = 1700000000.0 + rng.uniform(0, 60)
+            events.append((time, connection, f'{i}-{n}', True))
+            events.append((time + rng.uniform(0.01, 2), connection, f'{i}-{n}', False))
+    for connection in connections:
+        packets.extend((1699999999.0, packet) for _, packet in connection.packets)
+        connection.packets = []
+    for time, connection, unique_id, call in sorted(events, key=lambda event: event[0]):
+        if call:
+            connection.call(unique_id, 'MeterValues', {'connectorId': 1}, time=time)
+        else:
+            connection.result(unique_id, {}, time=time)
+        packets.extend(connection.packets)
+        connection.packets = []
+    return packets
+
+
+def test_sharded_decoding_comes_back_in_capture_order(busy_site):
+    records = list(read_mapped_records(pcap(busy_site)))
+    decoder = OcppStreamDecoder()
+    expected = [message for linktype, record in records for message in decoder.feed(linktype, record)]
+
+    decoded = list(decode_parallel(iter(records), workers=3))
+
+    assert len(decoded) == 600
+    assert decoded == expected
+    assert [m.timestamp for m in decoded] == sorted(m.timestamp for m in decoded)
+
+
+def test_sharded_decoding_raises_the_read_errors():
+    with pytest.raises(ValueError):
+        list(decode_parallel(read_mapped_records(b'not a capture' * 4), workers=2))
@@ -0,0 +1,195 @@
+from captures import Connection, pcap
+from charging_stations_status import ChargingStationsStatus
+from cmd_dispatcher import CmdDispatcher
+from data_sources import CgwSnapshot, DataSources
+from dnmasq_leases import DnsmasqLeases
+from io import StringIO
+from output_format import CSV, JSON, NDJSON, TEXT, RecordWriter, format_records, parse_option, write_records
+from site_status import SiteStatus
+import csv
+import importlib
+import json
+import os
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RECORDS = [
+    {'record': 'charger', 'id': 'ACE1', 'leased_until': 1711014315},
+    {'record': 'charger', 'id': 'ACE2, "quoted"', 'leased_until': None},
+    {'record': 'ev', 'id': 'EV1', 'charge_current': [16.0, 0.0]},
+]
+
+
+def test_the_format_option_is_taken_out_anywhere():
+    assert parse_option(['show', '--format', 'json', 'history']) == (['show', 'history'], JSON)
+    assert parse_option(['show', 'site-status', '--format=csv']) == (['show', 'site-status'], CSV)
+    assert parse_option(['show'], NDJSON) == (['show'], NDJSON)
+    with pytest.raises(ValueError, match="needs one of"):
+        parse_option(['show', '--format'])
+    with pytest.raises(ValueError, match="Unknown format xml"):
+        parse_option(['show', '--format', 'xml'])
+
+
+def test_json_is_one_array():
+    assert json.loads(format_records(RECORDS, JSON)) == RECORDS
+    assert json.loads(format_records([], JSON)) == []
+
+
+def test_ndjson_is_one_record_per_line():
+    lines = format_records(RECORDS, NDJSON).splitlines()
+
+    assert [json.loads(line) for line in lines] == RECORDS
+    assert format_records([], NDJSON) == ""
+
+
+def test_csv_repeats_the_header_when_the_kind_changes():
+    tables = format_records(RECORDS, CSV).split('\n\n')
+
+    chargers = list(csv.reader(StringIO(tables[0])))
+    assert chargers == [['record', 'id', 'leased_until'], ['charger', 'ACE1', '1711014315'],
+                        ['charger', 'ACE2, "quoted"', '']]
+    assert list(csv.reader(StringIO(tables[1])))[0] == ['record', 'id', 'charge_current']
+
+
+def test_several_writes_form_one_output():
+    output = StringIO()
+    writer = RecordWriter(JSON, output)
+
+    assert writer.write(RECORDS[:1]) == 1
+    assert writer.write([]) == 0
+    assert writer.write(RECORDS[1:]) == 2
+    writer.close()
+
+    assert json.loads(output.getvalue()) == RECORDS
+
+
+def test_records_are_written_as_they_are_produced():
+    output = StringIO()
+    seen = []
+
+    def records():
+        for record in RECORDS:
+            yield record
+            seen.append(output.getvalue().count('\n'))
+
+    assert write_records(records(), NDJSON, output) == 3
+    assert seen == [1, 2, 3]
+
+
+def test_text_is_not_a_record_format():
+    with pytest.raises(ValueError):
+        RecordWriter(TEXT, StringIO())
+
+
+@pytest.fixture
+def site(tmp_path):
+    with open(os.path.join(ROOT, 'site_status.json')) as file:
+        site_status = SiteStatus.from_json(json.load(file))
+    with open(os.path.join(ROOT, 'charging_stations_status.json')) as file:
+        charging_stations_status = ChargingStationsStatus.from_json(json.load(file))
+    leases = DnsmasqLeases(os.path.join(ROOT, 'dnsmasq.leases'))
+    leases.read_leases()
+    return site_status, leases, charging_stations_status
+
+
+def test_site_status_records_keep_the_raw_values(site):
+    site_status, leases, charging_stations_status = site
+
+    records = list(site_status.records(leases, charging_stations_status))
+
+    assert records[0] == {'record': 'site', 'action': site_status.action, 'datetime': site_status.datetime}
+    chargers = [record for record in records if record['record'] == 'charger']
+    assert chargers and all(isinstance(record['leased_until'], (int, type(None))) for record in chargers)
+    assert chargers[0]['leased_until'] == leases.entries_by_ip[chargers[0]['ip_address']]['lease_time']
+    connections = [record for record in records if record['record'] == 'connection']
+    assert len(connections) == sum(len(charger.connectors) for charger in charging_stations_status.chargers)
+    assert connections[0]['ocpp_error_timestamp'].startswith('20')  # ISO 8601 as received
+    assert [record['record'] for record in records[-len(site_status.evs):]] == ['ev'] * len(site_status.evs)
+    assert json.loads(format_records(records, JSON)) == records
+
+
+class Sources:
+    redis_handler = None
+
+    def __init__(self, snapshot, leases) -> None:
+        self.values = {'cgw': snapshot, 'dnsmasq.leases': leases}
+
+    def get(self, name):
+        return self.values[name]
+
+
+def test_show_site_status_reads_one_snapshot(site, monkeypatch):
+    site_status, leases, charging_stations_status = site
+    snapshot = CgwSnapshot(('digest',), site_status, charging_stations_status, (None, None))
+    sources = Sources(snapshot, leases)  # Only the snapshot, not the sources derived from it
+    monkeypatch.setattr(DataSources, 'get_shared', classmethod(lambda cls: sources))
+    command = importlib.import_module('commands.show.site-status.command').Command(['show', 'site-status'])
+
+    assert command.execute() == site_status.display(leases, charging_stations_status)
+    assert list(command.records()) == list(site_status.records(leases, charging_stations_status))
+
+
+def test_site_status_watch_appends_one_line_per_change(site, tmp_path, monkeypatch):
+    site_status, leases, charging_stations_status = site
+    snapshot = CgwSnapshot(('digest',), site_status, charging_stations_status, (None, None))
+    sources = Sources(snapshot, leases)
+    monkeypatch.setattr(DataSources, 'get_shared', classmethod(lambda cls: sources))
+    module = importlib.import_module('commands.watch.site-status.command')
+    filename = str(tmp_path / 'changes.ndjson')
+    command = module.Command(['watch', 'site-status', '2', filename], None)
+    command.output_format = NDJSON
+
+    first = command.render()
+    assert command.render() == first  # Unchanged, nothing appended
+    sources.values['cgw'] = snapshot._replace(digest=('changed',))
+    second = command.render()
+
+    with open(filename) as file:
+        lines = [json.loads(line) for line in file]
+    assert len(lines) == 2
+    assert lines[0]['records'] == list(site_status.records(leases, charging_stations_status))
+    assert first.startswith(f"Changes appended to {filename}: 1")
+    assert second.startswith(f"Changes appended to {filename}: 2")
+
+
+def test_watches_are_given_the_format_of_their_records(site, tmp_path, monkeypatch):
+    site_status, leases, charging_stations_status = site
+    snapshot = CgwSnapshot(('digest',), site_status, charging_stations_status, (None, None))
+    monkeypatch.setattr(DataSources, 'get_shared', classmethod(lambda cls: Sources(snapshot, leases)))
+    monkeypatch.chdir(ROOT)
+
+    class Terminal:
+        def start_event_process(self, **kwargs):
+            return 7
+
+    filename = str(tmp_path / 'changes.ndjson')
+    output = CmdDispatcher('commands/').dispatch(f"watch site-status 2 {filename} --format ndjson", "commands",
+                                                 Terminal())
+
+    assert output == f"Started watch 7, appending to {filename}"
+
+
+def test_pcap_analysis_records(tmp_path, monkeypatch):
+    packets = []
+    connection = Connection('172.22.0.10', 40000, packets)
+    connection.handshake()
+    connection.call('1', 'Heartbeat', {}, time=1700000000.0)
+    connection.result('1', {}, time=1700000000.5)
+    connection.call('2', 'Authorize', {}, time=1700000001.0)
+    connection.error('2', 'InternalError', time=1700000001.25)
+    filename = tmp_path / 'capture.pcap'
+    filename.write_bytes(pcap(packets))
+    monkeypatch.chdir(ROOT)
+
+    output = CmdDispatcher('commands/').dispatch(f"show pcap {filename} --format json", "commands", None)
+
+    records = json.loads(output)
+    assert records[0] == {'record': 'capture', 'file': str(filename), 'packets': 6, 'messages': 4}
+    assert records[1]['record'] == 'charger' and records[1]['first_seen'] == 1700000000.0
+    actions = {record['action']: record for record in records if record['record'] == 'action'}
+    assert actions['Heartbeat']['latency_max'] == pytest.approx(0.5)
+    assert records[-1] == {'record': 'error', 'charger': '172.22.0.10', 'action': 'Authorize',
+                           'error_code': 'InternalError', 'count': 1}
+    missing = CmdDispatcher('commands/').dispatch("show pcap missing.pcap --format json", "commands", None)
+    assert missing.startswith("Error: [Errno 2]")
@@ -0,0 +1,98 @@
+from captures import Connection, pcap, pcapng
+from io import BytesIO
+from ocpp_stream import LINKTYPE_ETHERNET, read_mapped_records, read_pcap_records
+from pcap_analysis import PcapAnalysis
+import pytest
+
+
+@pytest.fixture
+def packets():
+    """
+    Two chargers: Heartbeats answered after 0.5 seconds, one MeterValues failing.
+    """
+    packets = []
+    first = Connection('172.22.0.10', 40000, packets)
+    second = Connection('172.22.0.11', 40001, packets)
+    first.handshake()
+    second.handshake()
+    for i in range(3):
+        first.call(f'h{i}', 'Heartbeat', {}, time=1700000000.0 + 10 * i)
+        first.result(f'h{i}', {'currentTime': 'now'}, time=1700000000.5 + 10 * i)
+    second.call('m1', 'MeterValues', {'connectorId': 1}, time=1700000001.0)
+    second.error('m1', 'InternalError', time=1700000001.25)
+    return packets
+
+
+def write(tmp_path, name: str, data: bytes) -> str:
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+@pytest.mark.parametrize('name, build', [
+    ('capture.pcap', lambda packets: pcap(packets)),
+    ('capture-ns.pcap', lambda packets: pcap(packets, nanoseconds=True)),
+    ('capture.pcapng', lambda packets: pcapng(packets)),
+    ('capture-ns.pcapng', lambda packets: pcapng(packets, tsresol=9)),
+])
+def test_captures_are_indexed_per_charger_and_action(tmp_path, packets, name, build):
+    analysis = PcapAnalysis.from_file(write(tmp_path, name, build(packets)))
+
+    assert analysis.packets == len(packets)
+    assert analysis.messages == 8
+    first = analysis.chargers['172.22.0.10']
+    assert list(first.call_times['Heartbeat']) == pytest.approx([1700000000.0, 1700000010.0, 1700000020.0])
+    assert list(first.latencies['Heartbeat']) == pytest.approx([0.5] * 3)
+    assert first.results == 3
+    second = analysis.chargers['172.22.0.11']
+    assert second.errors == {('MeterValues', 'InternalError'): 1}
+    assert list(second.latencies['MeterValues']) == pytest.approx([0.25])
+
+
+@pytest.mark.parametrize('build', [pcap, pcapng])
+def test_decoder_processes_give_the_same_analysis(tmp_path, packets, build):
+    filename = write(tmp_path, 'capture', build(packets))
+    single = PcapAnalysis.from_file(filename)
+
+    sharded = PcapAnalysis.from_file(filename, workers=3)
+
+    assert (sharded.packets, sharded.messages) == (single.packets, single.messages)
+    assert sharded.display() == single.display()
+
+
+def test_calls_are_counted_in_a_time_range(tmp_path, packets):
+    analysis = PcapAnalysis.from_file(write(tmp_path, 'capture.pcap', pcap(packets)))
+
+    assert analysis.count_calls('172.22.0.10', 'Heartbeat', 1700000000.0, 1700000010.0) == 2
+    assert analysis.count_calls('172.22.0.10', 'Heartbeat', 1700000011.0, 1700000019.0) == 0
+    assert analysis.count_calls('172.22.0.10', 'Authorize', 0, 2e9) == 0
+    assert analysis.count_calls('10.0.0.1', 'Heartbeat', 0, 2e9) == 0
+
+
+def test_mapped_records_match_the_streamed_records(packets):
+    data = pcap(packets)
+    linktype, streamed = read_pcap_records(BytesIO(data))
+
+    mapped = [(linktype, record.timestamp, bytes(record.data)) for linktype, record in read_mapped_records(data)]
+
+    assert mapped == [(LINKTYPE_ETHERNET, record.timestamp, record.data) for record in streamed]
+    assert [record for _, record in read_mapped_records(pcapng(packets))] == \
+        [(record[1], record[2]) for record in mapped]
+
+
+@pytest.mark.parametrize('build', [pcap, pcapng])
+def test_truncated_captures_keep_the_complete_records(tmp_path, packets, build):
+    data = build(packets)
+
+    analysis = PcapAnalysis.from_file(write(tmp_path, 'truncated', data[:-10]))
+
+    assert analysis.packets == len(packets) - 1
+    assert analysis.messages == 7
+
+
+def test_the_display_lists_chargers_and_errors(tmp_path, packets):
+    text = PcapAnalysis.from_file(write(tmp_path, 'capture.pcap', pcap(packets))).display()
+
+    assert '172.22.0.10' in text
+    assert 'Heartbeat' in text
+    assert 'InternalError' in text
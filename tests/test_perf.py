@@ -0,0 +1,120 @@
+from perf import NULL_TIMER, SAMPLES, Perf, Timings, timed
+from terminal_screen import TerminalScreen
+import asyncio
+import importlib
+import os
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def perf(monkeypatch):
+    perf = Perf()
+    monkeypatch.setattr(Perf, '_shared', perf)
+    return perf
+
+
+def show_perf(*args: str) -> str:
+    command = importlib.import_module('commands.show.perf.command')
+    return command.Command(['show', 'perf', *args], None).execute()
+
+
+def test_timings_aggregate_the_durations_of_a_stage():
+    timings = Timings()
+    for duration in [0.003, 0.001, 0.002, 0.010]:
+        timings.add(duration)
+
+    assert (timings.count, timings.max) == (4, 0.010)
+    assert timings.total == pytest.approx(0.016)
+    assert timings.percentile(0.5) == 0.003
+    assert timings.percentile(0.95) == 0.010
+    assert Timings().percentile(0.5) == 0.0
+
+
+def test_the_percentiles_are_taken_from_the_recent_durations():
+    timings = Timings()
+    for _ in range(SAMPLES):
+        timings.add(1.0)
+    for _ in range(SAMPLES):
+        timings.add(0.001)  # Overwrite the ring buffer
+
+    assert len(timings.samples) == SAMPLES
+    assert timings.percentile(0.95) == 0.001
+    assert (timings.count, timings.max) == (2 * SAMPLES, 1.0)
+
+
+def test_timers_and_counters_add_up_per_name(perf):
+    @timed('decode')
+    def decode():
+        pass
+
+    for _ in range(3):
+        decode()
+    with perf.timer('render'):
+        pass
+    perf.count('frames.skipped')
+    perf.count('frames.skipped', 2)
+
+    assert {name: stage.count for name, stage in perf.timings.items()} == {'decode': 3, 'render': 1}
+    assert perf.counters == {'frames.skipped': 3}
+
+
+def test_nothing_is_recorded_while_disabled(perf):
+    perf.enabled = False
+
+    assert perf.timer('render') is NULL_TIMER
+    perf.count('frames.skipped')
+    timed('decode')(lambda: None)()
+
+    assert perf.timings == {} and perf.counters == {}
+
+
+def test_show_perf_reports_the_stages_counters_and_caches(perf):
+    with perf.timer('redis.get'):
+        pass
+    perf.count('snapshot.parsed')
+
+    output = show_perf()
+
+    assert output.startswith("Instrumentation: on")
+    assert "| redis.get " in output and "| snapshot.parsed " in output
+    assert "Timestamp caches: iso " in output
+    assert [record['record'] for record in perf.records()] == ['stage', 'counter']
+
+
+def test_show_perf_switches_and_resets_the_instrumentation(perf):
+    perf.count('snapshot.parsed')
+
+    assert show_perf('off') == "Instrumentation off" and not perf.enabled
+    assert show_perf('on') == "Instrumentation on" and perf.enabled
+    assert show_perf('reset') == "Instrumentation reset"
+    assert perf.counters == {}
+    assert show_perf('profile', 'stop') == "No calls were profiled"
+    assert show_perf('everything').startswith("Usage: show perf")
+
+
+def test_profiled_calls_are_reported(perf):
+    show_perf('profile', 'start')
+    perf.call(sorted, [3, 1, 2])
+
+    assert "sorted" in show_perf('profile', 'stop')
+    assert not perf.profiling
+
+
+def test_watches_of_one_kind_share_a_stage(perf, monkeypatch):
+    monkeypatch.chdir(ROOT)
+    screen = TerminalScreen('commands')
+
+    async def scenario():
+        for rendered in range(1, 4):  # Watches started and killed, as by a user, each with a new ID
+            watch_id = screen.start_interval_process(3600, lambda: "site", title="site-status")
+            while 'watch site-status' not in perf.timings or perf.timings['watch site-status'].count < rendered:
+                await asyncio.sleep(0.01)
+            screen.kill_watch(watch_id)
+            await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+
+    assert [name for name in perf.timings if name.startswith('watch')] == ['watch site-status']
+    assert perf.timings['watch site-status'].count == 3
@@ -0,0 +1,125 @@
+from charging_stations_status import ChargingStationsStatus
+from site_history import NO_DATA, OFFLINE, ConnectorHistory, SiteHistory
+from site_status import SiteStatus
+import copy
+import importlib
+import json
+import math
+import os
+import time
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def history_of(times) -> ConnectorHistory:
+    history = ConnectorHistory(capacity=5)
+    for timestamp in times:
+        history.append(timestamp, 0, timestamp, math.nan, 0.0)
+    return history
+
+
+def test_the_ring_buffer_keeps_the_latest_samples():
+    history = history_of([1.0, 2.0, 3.0])
+    assert [history.times[i] for i in history.window(0.0)] == [1.0, 2.0, 3.0]
+
+    history = history_of([float(t) for t in range(1, 9)])  # Wraps around
+
+    assert history.count == 5
+    assert [history.times[i] for i in history.window(0.0)] == [4.0, 5.0, 6.0, 7.0, 8.0]
+    assert [history.currents[i] for i in history.window(0.0)] == [4.0, 5.0, 6.0, 7.0, 8.0]
+
+
+@pytest.mark.parametrize('samples', [3, 5, 8, 13])
+def test_windows_start_at_the_first_sample_at_or_after_the_time(samples):
+    history = history_of([float(t) for t in range(1, samples + 1)])
+    kept = [float(t) for t in range(max(1, samples - 4), samples + 1)]
+
+    for since in [0.0, 2.0, 2.5, 6.0, samples, samples + 0.5]:
+        assert [history.times[i] for i in history.window(since)] == [t for t in kept if t >= since]
+
+
+def test_an_empty_history_has_empty_windows():
+    assert ConnectorHistory(capacity=3).window(0.0) == []
+
+
+@pytest.fixture
+def site():
+    with open(os.path.join(ROOT, 'site_status.json')) as file:
+        site_status = json.load(file)
+    with open(os.path.join(ROOT, 'charging_stations_status.json')) as file:
+        charging_stations_status = json.load(file)
+    return site_status, charging_stations_status
+
+
+def record(history: SiteHistory, site, timestamp: float, status: str = None, offline: bool = False) -> str:
+    site_status, charging_stations_status = copy.deepcopy(site)
+    ev = site_status['evs'][0]
+    charger_id = ev['charger_id']
+    charger = next(charger for charger in charging_stations_status['chargers'] if charger['id'] == charger_id)
+    if status is not None:
+        charger['connectors'][0]['status'] = status
+    if offline:
+        site_status['offline_chargers'] = [{'id': charger_id}]
+    history.record(SiteStatus.from_json(site_status), ChargingStationsStatus.from_json(charging_stations_status),
+                   timestamp)
+    return charger_id
+
+
+def test_records_hold_the_samples_of_the_window(site):
+    history = SiteHistory(capacity=4)
+    now = time.time()
+    for i, status in enumerate(['charging', 'charging', 'suspendedev', 'charging', 'finishing']):
+        charger_id = record(history, site, now - 300 + 60 * i, status)
+
+    samples = list(history.records(charger_id, minutes=10))
+
+    assert [sample['status'] for sample in samples] == ['charging', 'suspendedev', 'charging', 'finishing']
+    assert samples[0] == {'record': 'sample', 'charger_id': charger_id, 'connector_id': 1, 'time': now - 240,
+                          'status': 'charging', 'current': 16.097, 'offer': 16.0, 'power': 3720.9}
+    assert [sample['time'] for sample in history.records(charger_id, minutes=2.5)] == [now - 120, now - 60]
+    assert list(history.records('nothing')) == []
+
+
+def test_offline_chargers_and_missing_evs_are_sampled(site):
+    history = SiteHistory()
+    now = time.time()
+    charger_id = record(history, site, now - 10, offline=True)
+    other = next(charger['id'] for charger in site[1]['chargers'] if charger['id'] != charger_id)
+
+    assert [sample['status'] for sample in history.records(charger_id)] == [OFFLINE]
+    sample = next(history.records(other))  # No EV plugged in
+    assert (sample['current'], sample['offer'], sample['power']) == (None, None, None)
+
+
+def test_the_display_shows_the_changes_and_trends(site, monkeypatch):
+    history = SiteHistory()
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now)  # Samples fall in fixed buckets
+    for i, status in enumerate(['charging', 'charging', 'finishing']):
+        charger_id = record(history, site, now - 30 + 10 * i, status)
+
+    text = history.display(charger_id, minutes=1, width=6)
+
+    assert f"History of {charger_id}:" in text
+    assert "1 changes: charging, finishing" in text
+    assert f"| {NO_DATA * 3}CCF" in text
+    assert "No history for charger nothing" in history.display('nothing')
+
+
+def test_show_history_samples_the_current_status(monkeypatch):
+    history = SiteHistory()
+    fetched = []
+
+    class Sources:
+        def get(self, name):
+            fetched.append(name)
+
+    monkeypatch.setattr(SiteHistory, 'get_shared', classmethod(lambda cls: history))
+    module = importlib.import_module('commands.show.history.command')
+    monkeypatch.setattr(module.DataSources, 'get_shared', classmethod(lambda cls: Sources()))
+
+    output = module.Command(['show', 'history', 'ACE1'], None).execute()
+
+    assert fetched == ['cgw']
+    assert "keep 'watch site-status' running" in output
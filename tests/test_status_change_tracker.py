@@ -0,0 +1,115 @@
+from charging_stations_status import ChargingStationsStatus
+from status_change_tracker import StatusChangeTracker
+import atexit
+import copy
+import csv
+import json
+import os
+import time
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def document():
+    with open(os.path.join(ROOT, 'charging_stations_status.json')) as file:
+        return json.load(file)
+
+
+@pytest.fixture
+def tracker(tmp_path, monkeypatch):
+    exit_handlers = []
+    monkeypatch.setattr(atexit, 'register', exit_handlers.append)
+    tracker = StatusChangeTracker(str(tmp_path / 'tabledata.json'), str(tmp_path / 'status_changes.csv'),
+                                  flush_interval=3600)
+    tracker.exit_handlers = exit_handlers
+    yield tracker
+    tracker.stop_event.set()
+
+
+def with_status(document: dict, *statuses: str) -> ChargingStationsStatus:
+    """
+    The status of the connectors of the first chargers changed to the given ones.
+    """
+    document = copy.deepcopy(document)
+    for charger, status in zip(document['chargers'], statuses):
+        charger['connectors'][0]['status'] = status
+    return ChargingStationsStatus.from_json(document)
+
+
+def changes(tracker: StatusChangeTracker) -> list:
+    with open(tracker.changes_file, newline='') as file:
+        return [row[1:] for row in csv.reader(file)]
+
+
+def test_only_transitions_are_changes(tracker, document):
+    first, second = (charger['id'] for charger in document['chargers'][:2])
+
+    assert tracker.update(with_status(document)) == []  # Nothing known yet
+    assert tracker.update(with_status(document)) == []
+    detected = tracker.update(with_status(document, 'charging'))
+    assert [row[1:] for row in detected] == [[first, 'charging']]
+    detected = tracker.update(with_status(document, 'charging', 'faulted'))
+    assert [row[1:] for row in detected] == [[second, 'faulted']]
+    assert tracker.update(with_status(document, 'charging', 'faulted')) == []
+
+
+def test_changes_are_written_in_batches(tracker, document):
+    first = document['chargers'][0]['id']
+    tracker.update(with_status(document))
+    tracker.update(with_status(document, 'charging'))
+    tracker.update(with_status(document, 'finishing'))
+    assert not os.path.exists(tracker.changes_file)  # Nothing written before the flush
+
+    tracker.flush()
+
+    assert changes(tracker) == [[first, 'charging'], [first, 'finishing']]
+    with open(tracker.snapshot_file) as file:
+        snapshot = json.load(file)
+    assert [first, 1, 'finishing'] in snapshot
+    assert len(snapshot) == len(document['chargers'])
+
+    tracker.flush()  # Nothing pending, nothing appended
+    assert len(changes(tracker)) == 2
+
+
+def test_a_new_tracker_continues_from_the_snapshot(tracker, document):
+    first = document['chargers'][0]['id']
+    tracker.update(with_status(document))
+    tracker.flush()
+
+    restarted = StatusChangeTracker(tracker.snapshot_file, tracker.changes_file, flush_interval=3600)
+    detected = restarted.update(with_status(document, 'charging'))
+    restarted.stop()
+
+    assert [row[1:] for row in detected] == [[first, 'charging']]
+    assert changes(restarted) == [[first, 'charging']]
+
+
+def test_one_thread_flushes_periodically(tracker, document):
+    tracker.flush_interval = 0.01
+    tracker.update(with_status(document))
+    thread = tracker.flush_thread
+
+    tracker.update(with_status(document, 'charging'))
+    deadline = time.monotonic() + 5
+    while not (os.path.exists(tracker.changes_file) and changes(tracker)) and time.monotonic() < deadline:
+        time.sleep(0.01)  # Polled until the rows are written, not only the file created
+
+    assert tracker.flush_thread is thread and thread.is_alive()
+    assert changes(tracker) == [[document['chargers'][0]['id'], 'charging']]
+    tracker.stop()
+    thread.join(1)
+    assert not thread.is_alive()
+
+
+def test_the_pending_changes_are_written_at_exit(tracker, document):
+    tracker.update(with_status(document))
+    tracker.update(with_status(document, 'charging'))
+    assert tracker.exit_handlers == [tracker.stop]
+
+    for handler in tracker.exit_handlers:
+        handler()
+
+    assert changes(tracker) == [[document['chargers'][0]['id'], 'charging']]
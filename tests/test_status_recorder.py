@@ -0,0 +1,181 @@
+from status_recorder import MAGIC, StatusLog, StatusRecorder, diff, patch
+import copy
+import importlib
+import json
+import os
+import random
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def random_document(rng: random.Random, depth: int = 0):
+    kind = rng.randrange(7 if depth < 4 else 4)
+    if kind == 0:
+        return rng.randrange(-3, 3)
+    if kind == 1:
+        return rng.choice([0.5, 1.0, -2.25])
+    if kind == 2:
+        return rng.choice(["", "a", "Available", None, True, False])
+    if kind == 3:
+        return rng.choice([1, 1.0, True, "1"])  # Equal values of different types
+    if kind in (4, 5):
+        return {rng.choice("abcdef"): random_document(rng, depth + 1) for _ in range(rng.randrange(4))}
+    return [random_document(rng, depth + 1) for _ in range(rng.randrange(4))]
+
+
+def mutate(rng: random.Random, document):
+    if isinstance(document, dict) and document and rng.random() < 0.7:
+        document = dict(document)
+        key = rng.choice(list(document))
+        if rng.random() < 0.2:
+            del document[key]
+        else:
+            document[key] = mutate(rng, document[key])
+        return document
+    if isinstance(document, list) and document and rng.random() < 0.7:
+        document = list(document)
+        i = rng.randrange(len(document))
+        if rng.random() < 0.2:
+            del document[i:]
+        else:
+            document[i] = mutate(rng, document[i])
+        return document
+    return random_document(rng)
+
+
+def same(a, b) -> bool:
+    """
+    Equal including the types, 1, 1.0 and True are different snapshots.
+    """
+    return json.dumps(a, sort_keys=True) == json.dumps(b, sort_keys=True)
+
+
+def test_patch_applies_diff_on_random_documents():
+    rng = random.Random(19)
+    for _ in range(2000):
+        old = random_document(rng)
+        new = mutate(rng, old)
+        before = copy.deepcopy(old)
+
+        delta = diff(old, new)
+
+        assert same(patch(old, json.loads(json.dumps(delta))), new)
+        assert same(old, before)  # Neither diff nor patch modify the old document
+        if same(old, new):
+            assert delta is None
+
+
+def test_changes_of_type_are_changes():
+    assert diff({'a': 1}, {'a': 1}) is None
+    assert patch({'a': 1}, diff({'a': 1}, {'a': 1.0}))['a'] == 1.0
+    assert type(patch({'a': 1}, diff({'a': 1}, {'a': True}))['a']) is bool
+    assert patch([1, 2, 3], diff([1, 2, 3], [1])) == [1]
+
+
+@pytest.fixture
+def snapshots():
+    with open(os.path.join(ROOT, 'charging_stations_status.json')) as file:
+        document = json.load(file)
+    rng = random.Random(3)
+    documents = [document]
+    for _ in range(25):
+        document = copy.deepcopy(document)
+        charger = rng.choice(document['chargers'])
+        connector = rng.choice(charger['connectors'])
+        connector['status'] = rng.choice(['available', 'charging', 'faulted', 'suspended_ev'])
+        documents.append(document)
+    return documents
+
+
+def record(filename: str, documents, start: float = 1000.0, keyframe_interval: int = 4) -> list:
+    recorder = StatusRecorder(filename, keyframe_interval)
+    written = []
+    for i, document in enumerate(documents):
+        if recorder.write(start + i, document):
+            written.append((start + i, document))
+    recorder.close()
+    return written
+
+
+def test_recordings_replay_the_distinct_snapshots(tmp_path, snapshots):
+    filename = str(tmp_path / 'status.rec')
+    documents = [snapshots[0], snapshots[0]] + snapshots[1:]
+
+    written = record(filename, documents)
+
+    assert len(written) < len(documents)  # The repeated snapshot was skipped
+    assert [(t, d) for t, d in StatusLog(filename).frames()] == written
+
+
+def test_replay_starts_at_the_nearest_keyframe(tmp_path, snapshots):
+    filename = str(tmp_path / 'status.rec')
+    written = record(filename, snapshots)
+    log = StatusLog(filename)
+    start = written[10][0]
+
+    assert log.seek_offset(start) > len(MAGIC)
+    assert list(log.frames(start)) == written[10:]
+    assert list(log.frames(written[-1][0] + 1)) == []
+
+
+def test_sessions_append_and_start_with_a_keyframe(tmp_path, snapshots):
+    filename = str(tmp_path / 'status.rec')
+    first = record(filename, snapshots[:10])
+    second = record(filename, snapshots[10:], start=2000.0)
+
+    assert list(StatusLog(filename).frames()) == first + second
+    keyframes = [timestamp for timestamp, _ in StatusLog(filename).index]
+    assert first[0][0] in keyframes and second[0][0] in keyframes
+    assert keyframes[1] == first[5][0]  # After 4 deltas
+
+
+def test_torn_records_are_skipped_and_truncated(tmp_path, snapshots):
+    filename = str(tmp_path / 'status.rec')
+    written = record(filename, snapshots[:5])
+    with open(filename, 'ab') as file:
+        file.write(b'\x00' * 7)  # An interrupted write
+
+    assert list(StatusLog(filename).frames()) == written
+
+    more = record(filename, snapshots[5:8], start=2000.0)
+
+    assert list(StatusLog(filename).frames()) == written + more
+
+
+def test_other_files_are_refused(tmp_path):
+    path = tmp_path / 'other'
+    path.write_bytes(b'not a recording')
+
+    with pytest.raises(ValueError):
+        StatusLog(str(path))
+    with pytest.raises(ValueError):
+        StatusRecorder(str(path))
+
+
+def test_refused_files_are_not_left_open(tmp_path, monkeypatch):
+    path = tmp_path / 'other'
+    path.write_bytes(b'not a recording')
+    opened = []
+    builtin_open = open
+
+    def recorded_open(*args, **kwargs):
+        opened.append(builtin_open(*args, **kwargs))
+        return opened[-1]
+
+    monkeypatch.setattr('builtins.open', recorded_open)
+
+    with pytest.raises(ValueError):
+        StatusRecorder(str(path))
+
+    assert all(file.closed for file in opened)
+    assert path.read_bytes() == b'not a recording'
+
+
+@pytest.mark.parametrize('options, error', [(['--speed'], "Error: --speed needs a value"),
+                                            (['--speed', '2', '--start'], "Error: --start needs a value"),
+                                            (['--loop', '1'], "Error: unknown option --loop")])
+def test_replay_refuses_incomplete_options(tmp_path, options, error):
+    command = importlib.import_module('commands.replay.command')
+
+    assert command.Command(['replay', str(tmp_path / 'recording'), *options], None).execute() == error
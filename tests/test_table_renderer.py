@@ -0,0 +1,71 @@
+from table_renderer import Column, LEFT, PSQL, RIGHT, SIMPLE, TableRenderer
+from tabulate import tabulate
+import random
+import pytest
+
+VALUES = [None, "", 0, 1, -7, 12345, 1.5, 0.25, -3.125, 1e-05, 123456789.0, float('nan'),
+          "UNKNOWN", "240101_1230", "1.50", "12", "1,000", "1,000.5", "1e3", "1.", "inf", "nan", "1e23456",
+          "True", True, False, "Available", " padded "]
+
+
+def random_table(rng: random.Random):
+    columns = [rng.sample(VALUES, rng.randint(1, 4)) for _ in range(rng.randint(1, 4))]
+    rows = [[rng.choice(column) for column in columns] for _ in range(rng.randint(0, 5))]
+    headers = [f"h{i}" * rng.randint(1, 3) for i in range(len(columns))]
+    return headers, rows
+
+
+@pytest.mark.parametrize('style', [PSQL, SIMPLE])
+def test_random_tables_render_like_tabulate(style):
+    rng = random.Random(22)
+    for _ in range(3000):
+        headers, rows = random_table(rng)
+        renderer = TableRenderer([Column(header) for header in headers], style)
+
+        expected = tabulate(rows, headers=headers, tablefmt=style)
+
+        assert renderer.render(rows) == expected, rows
+        assert renderer.render(rows) == expected, rows  # From the caches
+
+
+def test_timestamps_mixed_with_unknown_are_left_aligned_like_tabulate():
+    headers = ["Chg ID", "Conn ID", "OCPP Err Ts"]
+    renderer = TableRenderer([Column(header) for header in headers])
+    dated = [["ACE1", 1, "240311_1502"], ["ACE2", 2, "240312_0900"]]
+    mixed = dated + [["ACE3", 1, "UNKNOWN"]]
+
+    assert renderer.render(dated) == tabulate(dated, headers=headers, tablefmt=PSQL)
+    assert renderer.render(mixed) == tabulate(mixed, headers=headers, tablefmt=PSQL)
+    assert "| 240311_1502   |" in renderer.render(mixed)
+
+
+def test_incremental_renders_match_fresh_renders():
+    rng = random.Random(7)
+    headers = ["ID", "Status", "Energy", "Since"]
+    rows = [[f"ACE{i}", "Available", float(i), "240101_1230"] for i in range(20)]
+    renderer = TableRenderer([Column(header) for header in headers])
+    for _ in range(200):
+        row = rng.choice(rows)
+        row[rng.randrange(1, 4)] = rng.choice(["Charging", "UNKNOWN", 12.25, 3, None, "240102_0800"])
+        if rng.random() < 0.1:
+            rows.append([f"ACE{len(rows)}", "Faulted", None, "UNKNOWN"])
+
+        assert renderer.render(rows) == TableRenderer([Column(header) for header in headers]).render(rows)
+
+
+def test_declared_alignments_override_the_inferred_ones():
+    renderer = TableRenderer([Column("Name", RIGHT), Column("Count", LEFT)])
+
+    assert renderer.render([["a", 1], ["bbb", 22]]).splitlines()[3:5] == [
+        "|      a | 1       |",
+        "|    bbb | 22      |",
+    ]
+
+
+def test_equal_values_of_other_types_are_not_mixed_up():
+    renderer = TableRenderer([Column("Value")])
+
+    renderer.render([[1]])
+
+    assert renderer.render([[True]]) == tabulate([[True]], headers=["Value"], tablefmt=PSQL)
+    assert renderer.render([[1.0], [0.5]]) == tabulate([[1.0], [0.5]], headers=["Value"], tablefmt=PSQL)
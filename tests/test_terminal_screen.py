@@ -0,0 +1,143 @@
+from terminal_screen import TerminalScreen, WatchPane, parse_interval
+import asyncio
+import os
+import threading
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Subscription:
+    """
+    The subscribe function of an event watch, holding the callback it is given.
+    """
+
+    def __init__(self) -> None:
+        self.notify = None
+        self.unsubscribed = False
+
+    def __call__(self, notify):
+        self.notify = notify
+        return self.unsubscribe
+
+    def unsubscribe(self) -> None:
+        self.unsubscribed = True
+
+
+class Renders:
+    """
+    The function of a watch, counting its calls.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __call__(self) -> str:
+        self.count += 1
+        return f"render {self.count}"
+
+
+@pytest.fixture
+def screen(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    return TerminalScreen('commands')
+
+
+async def until(condition) -> None:
+    for _ in range(500):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("timed out")
+
+
+def pane_text(screen: TerminalScreen, watch_id: int) -> str:
+    return screen.panes[watch_id].text_area.text
+
+
+def test_event_watches_render_on_each_notification(screen):
+    subscription, renders = Subscription(), Renders()
+
+    async def scenario():
+        watch_id = screen.start_event_process(subscription, renders, "site", poll_seconds=3600, refresh_seconds=3600)
+        await until(lambda: renders.count == 1)
+        assert pane_text(screen, watch_id) == "render 1"
+
+        threading.Thread(target=subscription.notify, args=({'SiteStatus'},)).start()  # From the subscriber thread
+        await until(lambda: renders.count == 2)
+        await until(lambda: pane_text(screen, watch_id) == "render 2")
+        await asyncio.sleep(0.05)
+        assert renders.count == 2  # Nothing else until the next notification
+        screen.kill_watch(watch_id)
+
+    asyncio.run(scenario())
+
+
+def test_event_watches_poll_while_events_do_not_arrive(screen):
+    subscription, renders = Subscription(), Renders()
+
+    async def scenario():
+        watch_id = screen.start_event_process(subscription, renders, "site", poll_seconds=0.01, refresh_seconds=3600)
+        await until(lambda: renders.count >= 3)  # Polled
+
+        subscription.notify(set())  # Events arrive
+        await asyncio.sleep(0.05)
+        count = renders.count
+        await asyncio.sleep(0.05)
+        assert renders.count == count  # No more polling
+
+        subscription.notify(None)  # Events stop arriving
+        await until(lambda: renders.count >= count + 2)
+        screen.kill_watch(watch_id)
+
+    asyncio.run(scenario())
+
+
+def test_killed_watches_unsubscribe_and_close_their_pane(screen):
+    subscription = Subscription()
+
+    async def scenario():
+        watch_id = screen.start_event_process(subscription, Renders(), "site", poll_seconds=3600)
+        await until(lambda: subscription.notify is not None)
+
+        assert screen.kill_watch(watch_id)
+        await until(lambda: subscription.unsubscribed)
+        assert watch_id not in screen.panes and watch_id not in screen.watches
+        assert not screen.kill_watch(watch_id)
+
+    asyncio.run(scenario())
+
+
+def test_text_displayed_from_other_threads_is_handed_to_the_event_loop(screen, monkeypatch):
+    async def scenario():
+        monkeypatch.setattr(screen.application, 'loop', asyncio.get_running_loop())  # As while the UI runs
+        watch_id = screen.start_watch(lambda watch_id: asyncio.sleep(3600), "idle")
+        displayed_on = []
+        update = screen.panes[watch_id].update
+        screen.panes[watch_id].update = lambda text: displayed_on.append(threading.current_thread()) or update(text)
+
+        await asyncio.get_running_loop().run_in_executor(None, screen.display, "from a thread", watch_id)
+        await until(lambda: displayed_on)
+
+        assert displayed_on == [threading.main_thread()]
+        assert pane_text(screen, watch_id) == "from a thread"
+        screen.kill_watches()
+
+    asyncio.run(scenario())
+
+
+def test_panes_highlight_the_changed_lines_and_skip_unchanged_text():
+    pane = WatchPane(1, "site")
+
+    assert pane.update("a\nb\nc")
+    assert pane.lexer.changed_lines == frozenset()  # Nothing to compare the first text with
+    assert pane.update("a\nB\nc")
+    assert pane.lexer.changed_lines == {1}
+    assert not pane.update("a\nB\nc")
+    assert WatchPane.changed_lines(["a", "b"], ["a", "x", "b", "y"]) == {1, 3}
+
+
+@pytest.mark.parametrize('value', ["0", "-1", "nan", "inf", "two"])
+def test_invalid_intervals_are_refused(value):
+    with pytest.raises(ValueError, match=f"Invalid interval: {value}"):
+        parse_interval(value)
@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta, timezone
+from timestamps import MINUTES, SECONDS, UNKNOWN, _format_epoch, _format_iso, format_epoch, format_iso, parse_iso
+import random
+import pytest
+
+
+@pytest.mark.parametrize('value', [
+    "2024-03-11T15:02:07.1+01:00",
+    "2024-03-11T15:02:07.12+01:00",
+    "2024-03-11T15:02:07.123+01:00",
+    "2024-03-11T15:02:07.1234567+01:00",
+    "2024-03-11T15:02:07.123456789+01:00",
+])
+def test_fractions_of_any_precision_are_parsed(value):
+    parsed = parse_iso(value)
+
+    assert parsed.replace(microsecond=0) == datetime(2024, 3, 11, 15, 2, 7, tzinfo=timezone(timedelta(hours=1)))
+    assert format_iso(value, SECONDS) == "240311_150207"
+
+
+def test_the_z_suffix_is_utc():
+    assert parse_iso("2024-03-11T15:02:07Z").utcoffset() == timedelta(0)
+    assert parse_iso("2024-03-11T15:02:07.123456789z").utcoffset() == timedelta(0)
+    assert format_iso("2024-03-11T15:02:07.5Z") == "240311_1502"  # In its own offset, not converted
+
+
+def test_missing_timestamps_are_unknown():
+    assert format_iso(None) == UNKNOWN
+    assert format_iso("") == UNKNOWN
+    assert format_epoch(None) == UNKNOWN
+    assert format_epoch("") == UNKNOWN
+    assert format_epoch(None, default="-") == "-"
+
+
+@pytest.mark.parametrize('value', ["UNKNOWN", "240311_1502", "2024-13-45T00:00:00", "not a time"])
+def test_malformed_iso_timestamps_are_shown_as_received(value):
+    assert format_iso(value) == value
+    with pytest.raises(ValueError):
+        parse_iso(value)
+
+
+@pytest.mark.parametrize('value', ["abc", "1e400", 10 ** 30, [1]])
+def test_malformed_epochs_are_shown_as_received(value):
+    assert format_epoch(value) == str(value)
+
+
+def test_epoch_fractions_and_strings_share_the_formatting():
+    seconds = 1711014315
+    expected = datetime.fromtimestamp(seconds).strftime(SECONDS)
+
+    assert format_epoch(seconds, SECONDS) == expected
+    assert format_epoch(seconds + 0.9, SECONDS) == expected
+    assert format_epoch(str(seconds), SECONDS) == expected
+
+
+def test_cached_results_match_uncached_ones():
+    rng = random.Random(23)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    values = [(start + timedelta(seconds=rng.randrange(10 ** 8))).isoformat() for _ in range(200)]
+    epochs = [rng.randrange(10 ** 9, 2 * 10 ** 9) for _ in range(200)]
+    _format_iso.cache_clear()
+    _format_epoch.cache_clear()
+
+    for _ in range(2):  # Formatted, then taken from the caches
+        for value in values:
+            assert format_iso(value, SECONDS) == datetime.fromisoformat(value).strftime(SECONDS)
+        for epoch in epochs:
+            assert format_epoch(epoch, MINUTES) == datetime.fromtimestamp(epoch).strftime(MINUTES)
+
+    assert _format_iso.cache_info().hits == len(set(values))
+    assert _format_epoch.cache_info().hits == len(set(epochs))
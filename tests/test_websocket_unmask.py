@@ -0,0 +1,50 @@
+from scapy_websocket_schema import WebSocket, unmask
+import random
+import scapy_websocket_schema
+import pytest
+
+MASKS = [0x00000000, 0x12345678, 0xffffffff, 0x80000001]
+
+
+def bytewise(data: bytes, mask: int) -> bytes:
+    key = mask.to_bytes(4, 'big')
+    return bytes(byte ^ key[i % 4] for i, byte in enumerate(data))
+
+
+@pytest.fixture(params=['big-int', 'numpy'])
+def path(request, monkeypatch):
+    if request.param == 'numpy':
+        if scapy_websocket_schema.numpy is None:
+            pytest.skip("numpy is not installed")
+        monkeypatch.setattr(scapy_websocket_schema, '_NUMPY_UNMASK_THRESHOLD', 0)
+    else:
+        monkeypatch.setattr(scapy_websocket_schema, 'numpy', None)
+    return request.param
+
+
+@pytest.mark.parametrize('length', range(10))
+@pytest.mark.parametrize('mask', MASKS)
+def test_short_payloads_match_the_bytewise_xor(path, length, mask):
+    data = bytes(range(200, 200 + length))
+
+    assert unmask(data, mask) == bytewise(data, mask)
+
+
+@pytest.mark.parametrize('length', [4095, 4096, 4097, 4099, 65537])
+def test_long_payloads_with_unaligned_tails_match_the_bytewise_xor(path, length):
+    data = random.Random(length).randbytes(length)
+
+    assert unmask(data, 0x12345678) == bytewise(data, 0x12345678)
+
+
+def test_unaligned_views_are_unmasked(path):
+    data = random.Random(7).randbytes(5003)
+
+    assert unmask(memoryview(data)[3:], 0xdeadbeef) == bytewise(data[3:], 0xdeadbeef)
+
+
+def test_masked_frames_are_unmasked_on_dissection():
+    payload = b'[2,"1","Heartbeat",{}]'
+    frame = bytes([0x81, 0x80 | len(payload)]) + (0x12345678).to_bytes(4, 'big') + bytewise(payload, 0x12345678)
+
+    assert WebSocket(frame).frame_data == payload
@@ -0,0 +1,96 @@
+"""
+Cached formatting of the timestamps shown in the status tables.
+
+The same OCPP error, EV session and lease timestamps are shown on every tick
+of a watch, so each distinct timestamp is parsed and formatted once and kept in
+a bounded LRU cache keyed by the raw value.
+"""
+from datetime import datetime
+from typing import Optional, Union
+import functools
+import re
+
+CACHE_SIZE = 4096  # Distinct timestamps kept, a few per connector, EV and lease
+UNKNOWN = "UNKNOWN"
+MINUTES = "%y%m%d_%H%M"
+SECONDS = "%y%m%d_%H%M%S"
+
+# Fractions of any precision, for Python versions whose fromisoformat only accepts 3 or 6 digits
+FRACTION = re.compile(r'\.(\d+)')
+
+
+def parse_iso(value: str) -> datetime:
+    """
+    Parse an ISO 8601 timestamp, with or without a fraction, offset or 'Z' suffix.
+
+    Raises:
+        ValueError: If the value is not an ISO 8601 timestamp.
+    """
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        normalized = FRACTION.sub(lambda match: '.' + match.group(1)[:6].ljust(6, '0'), value.strip(), count=1)
+        if normalized.endswith(('Z', 'z')):
+            normalized = normalized[:-1] + '+00:00'
+        return datetime.fromisoformat(normalized)
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _format_iso(value: str, fmt: str) -> str:
+    try:
+        return parse_iso(value).strftime(fmt)
+    except ValueError:
+        return value  # Shown as received rather than failing the whole table
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _format_epoch(seconds: int, fmt: str) -> str:
+    return datetime.fromtimestamp(seconds).strftime(fmt)
+
+
+def format_iso(value: Optional[str], fmt: str = MINUTES, default: str = UNKNOWN) -> str:
+    """
+    Format an ISO 8601 timestamp as sent by the CGW, in its own offset.
+
+    Args:
+        value (Optional[str]): The timestamp, any fraction precision.
+        fmt (str): The strftime format.
+        default (str): Returned for a missing timestamp.
+
+    Returns:
+        str: The formatted timestamp, the raw value if it cannot be parsed.
+    """
+    if not value:
+        return default
+    return _format_iso(value, fmt)
+
+
+def format_epoch(value: Union[int, float, str, None], fmt: str = MINUTES, default: str = UNKNOWN) -> str:
+    """
+    Format an epoch timestamp in local time, to the second.
+
+    Args:
+        value (Union[int, float, str, None]): Epoch seconds, as a number or a string.
+        fmt (str): The strftime format, without sub-second fields.
+        default (str): Returned for a missing timestamp.
+
+    Returns:
+        str: The formatted timestamp, the raw value if it is not a number.
+    """
+    if value is None or value == "":
+        return default
+    try:
+        seconds = int(float(value))  # Fractions are dropped so that they share the cache entry
+    except (TypeError, ValueError, OverflowError):
+        return str(value)
+    try:
+        return _format_epoch(seconds, fmt)
+    except (ValueError, OverflowError, OSError):
+        return str(value)
+
+
+def cache_info() -> dict:
+    """
+    Get the hits and misses of the caches, for show perf.
+    """
+    return {'iso': _format_iso.cache_info(), 'epoch': _format_epoch.cache_info()}